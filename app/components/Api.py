@@ -0,0 +1,110 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from app.utils.cache import LastValueCache, Value
+
+
+# Upper bound of the long-poll waiting time requested by a client, seconds
+MAX_TIMEOUT: float = 60
+
+
+class Api:
+    """
+    Serves the last-value caches of the collectors over local HTTP/JSON.
+
+    Endpoints (``<table>`` is the collector table name):
+
+    * ``GET /`` - list of tables;
+    * ``GET /<table>/values?tags=A,B`` - last values of the tags (all if omitted);
+    * ``GET /<table>/changes?since=N&tags=A,B&timeout=S`` - tags changed after
+      update ``N``, waiting up to ``S`` seconds for a change (long poll).
+
+    :param caches: Last-value caches keyed by table name.
+    :type caches: Dict[str, LastValueCache]
+    :param host: Address to bind, local only by default.
+    :type host: str
+    :param port: Port to bind.
+    :type port: int
+    """
+    def __init__(self, caches: Dict[str, LastValueCache],
+                 host: str = '127.0.0.1', port: int = 8080) -> None:
+        self._caches: Dict[str, LastValueCache] = caches
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def _handler(self) -> type:
+        caches: Dict[str, LastValueCache] = self._caches
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # pylint: disable=invalid-name
+                url = urlparse(self.path)
+                query: Dict[str, List[str]] = parse_qs(url.query)
+                parts: List[str] = [part for part in url.path.split('/') if part]
+                if not parts:
+                    return self._send(200, {'tables': sorted(caches)})
+                if len(parts) != 2 or parts[0] not in caches:
+                    return self._send(404, {'error': f'Unknown path {url.path}'})
+                cache: LastValueCache = caches[parts[0]]
+                tags: Optional[List[str]] = query['tags'][0].split(',') if 'tags' in query else None
+                try:
+                    if parts[1] == 'values':
+                        return self._send(200, {'sequence': cache.sequence,
+                                                'values': self._values(cache.get(tags))})
+                    if parts[1] == 'changes':
+                        since: int = int(query.get('since', ['0'])[0])
+                        timeout: float = min(float(query.get('timeout', ['0'])[0]), MAX_TIMEOUT)
+                        sequence, values = cache.changed(since=since, names=tags, timeout=timeout)
+                        return self._send(200, {'sequence': sequence,
+                                                'values': self._values(values)})
+                except ValueError as e:
+                    return self._send(400, {'error': str(e)})
+                return self._send(404, {'error': f'Unknown path {url.path}'})
+
+            @staticmethod
+            def _values(values: Dict[str, Value]) -> Dict[str, Dict]:
+                return {name: value._asdict() for name, value in values.items()}
+
+            def _send(self, status: int, body: Dict) -> None:
+                content: bytes = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+                pass
+
+        return Handler
+
+    @property
+    def address(self):
+        return self._server.server_address
+
+    def start(self) -> None:
+        """
+        Starts serving requests in a background thread.
+
+        :return: nothing
+        :rtype: None
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        name='mbir-api', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops serving requests.
+
+        :return: nothing
+        :rtype: None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+        self._thread = None
@@ -1,48 +1,266 @@
-from typing import Dict
+import threading
+import time
+from typing import Dict, List, Optional
 
 import psycopg2
-import yaml
 
-from app.config import POSTGRES_USER, POSTGRES_PASSWORD
+from app.config import POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+from app.components.Scheduler import Scheduler
+from app.utils.adaptive import ScanGovernor
+from app.utils.alarms import AlarmEngine, Event
+from app.utils.cache import LastValueCache
+from app.utils.loader import load_config
 from app.utils.modbus import Poller
+from app.utils.profiling import profiler
 from app.utils.pydantic.models import Config
+from app.utils.storage.base import Writer
+from app.utils.storage.factory import create_writer, create_publisher
+from app.utils.utils import epochTime
 
 
 class DataCollector:
-    def __init__(self):
-        self.__config = Config(**self.__config_data)
-        self.__poller = Poller(self.__config)
+    """
+    Polls a single device configuration and stores every scan.
 
-    @property
-    def __config_data(self) -> Dict:
-        with open('config.yml', "r", encoding='utf8') as stream:
-            try:
-                return yaml.safe_load(stream)
-            except yaml.YAMLError as e:
-                print(e)
+    The collector owns its ``Poller``, storage ``Writer`` (which also manages the
+    table schema), ``LastValueCache`` and ``AlarmEngine`` and is scanned by a
+    ``Scheduler``. Several collectors may share one scheduler, so many devices are
+    served by one process and one worker pool.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param scheduler: A shared scheduler; a private one is created if omitted.
+    :type scheduler: Optional[Scheduler]
+    :param writer: A storage writer; the one selected by ``config.storage`` is created
+                   on start if omitted.
+    :type writer: Optional[Writer]
+    """
+    def __init__(self, config: Config, scheduler: Optional[Scheduler] = None,
+                 writer: Optional[Writer] = None) -> None:
+        self.__config: Config = config
+        self.__poller: Poller = Poller(self.__config)
+        self.__writer: Optional[Writer] = writer
+        self.__publisher: Optional[Writer] = None
+        self.__cache: LastValueCache = LastValueCache()
+        self.__alarms: AlarmEngine = AlarmEngine(self.__poller.tags)
+        self.__governor: Optional[ScanGovernor] = None
+        if config.adaptive.enabled:
+            self.__governor = ScanGovernor(settings=config.adaptive, scan_rate=config.scan_rate,
+                                           priorities=[request['priority']
+                                                       for requests in self.__poller.plan.values()
+                                                       for request in requests.values()])
+        self.__scheduler: Scheduler = scheduler or Scheduler(workers=1)
+        self.__owns_scheduler: bool = scheduler is None
+        self.__lock = threading.Lock()
+        self.__stats: Dict = {'scans': 0, 'errors': 0, 'rows': 0,
+                              'last_scan': None, 'last_duration': None, 'last_error': None}
+
+    @staticmethod
+    def load(path: str) -> Config:
+        """
+        Loads the configuration from a YAML file and the files it includes.
+
+        :param path: Path to the configuration file.
+        :type path: str
+        :raises ValueError: If the files hold no valid configuration.
+        :return: The collector configuration.
+        :rtype: Config
+        """
+        return load_config(path)
+
+    @classmethod
+    def from_file(cls, path: str, scheduler: Optional[Scheduler] = None) -> 'DataCollector':
+        """
+        Creates the collector from a YAML configuration file.
+
+        :param path: Path to the configuration file.
+        :type path: str
+        :param scheduler: A shared scheduler; a private one is created if omitted.
+        :type scheduler: Optional[Scheduler]
+        :raises ValueError: If the file holds no configuration.
+        :return: A new collector.
+        :rtype: DataCollector
+        """
+        return cls(config=cls.load(path), scheduler=scheduler)
 
     @property
-    def config(self):
+    def config(self) -> Config:
         return self.__config
 
+    @property
+    def poller(self) -> Poller:
+        return self.__poller
+
+    @property
+    def cache(self) -> LastValueCache:
+        return self.__cache
+
+    @property
+    def alarms(self) -> AlarmEngine:
+        return self.__alarms
+
+    @property
+    def interval(self) -> float:
+        """
+        Returns the scan period of the collector.
+
+        :return: Scan period in seconds.
+        :rtype: float
+        """
+        if self.__governor:
+            return self.__governor.interval
+        return self.__poller.scan_rate / 1000
+
     @property
     def connection(self):
         try:
-            db_conf = {'host': 'localhost',
-                       # 'host': 'postgres',
-                       'port': 54320,
-                       'database': 'postgres',
+            db_conf = {'host': POSTGRES_HOST,
+                       'database': POSTGRES_DB,
                        'user': POSTGRES_USER,
                        'password': POSTGRES_PASSWORD, }
             return psycopg2.connect(**db_conf)
         except Exception as e:
             print(f'Failed to connect to database: {e}')
 
-    def serve(self, connection):
-        if connection:
-            query = f"""SELECT EXISTS (
-                        SELECT 1 
-                        FROM information_schema.tables 
-                        WHERE table_name = '{self.__config.table}'
-                        )
-                    """
+    def start(self) -> None:
+        """
+        Connects to the device and the storage, prepares the schema and starts scanning.
+
+        :raises ConnectionError: If the database connection cannot be established.
+        :return: nothing
+        :rtype: None
+        """
+        if self.__writer is None:
+            connection = None
+            if self.__config.storage.type == 'postgres':
+                connection = self.connection
+                if connection is None:
+                    raise ConnectionError('Error@DataCollector.start.',
+                                          'Failed to connect to database.')
+            self.__writer = create_writer(config=self.__config, tags=self.__poller.tags,
+                                          connection=connection)
+        self.__writer.prepare()
+        if self.__config.publish.enabled and self.__config.storage.type != 'mqtt':
+            self.__publisher = create_publisher(config=self.__config, tags=self.__poller.tags)
+            self.__publisher.prepare()
+        self.__poller.connect()
+        self.__scheduler.add(self)
+        if self.__owns_scheduler:
+            self.__scheduler.start()
+
+    def scan(self) -> None:
+        """
+        Polls the device once and stores the scan.
+
+        :return: nothing
+        :rtype: None
+        """
+        with profiler.profiled():
+            self.__scan()
+
+    def __scan(self) -> None:
+        started: float = time.monotonic()
+        registers: Optional[List] = None
+        failed: float = 1.0
+        try:
+            registers = self.__poller.scan(priority=self.__governor.priority
+                                           if self.__governor else None)
+            # Derived tags have no address, skipped blocks were not polled
+            polled: List[Dict] = [register for register in registers or []
+                                  if register['address'] is not None
+                                  and not register.get('skipped')]
+            if polled:
+                failed = sum(1 for register in polled if register.get('failed')) / len(polled)
+            if failed == 1.0:
+                # Nothing was read, the scan is lost rather than stored as missing values
+                registers = None
+            # The row is stamped with the receipt of the first block of the scan
+            stamps: List[float] = [register['timestamp'] for register in registers or []
+                                   if 'timestamp' in register]
+            timestamp: float = min(stamps) if stamps else epochTime()
+            events: List[Event] = []
+            if registers:
+                self.__cache.update(registers, timestamp)
+                if self.__alarms:
+                    with profiler.span('alarms'):
+                        events = self.__alarms.evaluate(registers, timestamp)
+            else:
+                self.__cache.invalidate(timestamp)
+            for event in events:
+                print(f'{self}: {event.tag} {event.kind} alarm '
+                      f'{"raised" if event.active else "cleared"}, '
+                      f'value {event.value:.2f}, limit {event.threshold}')
+            with self.__lock:
+                if self.__writer is None:
+                    return
+                if registers:
+                    values: List = [register['value'] for register in registers]
+                    with profiler.span('write'):
+                        self.__writer.write(values, timestamp)
+                    if self.__publisher:
+                        with profiler.span('publish'):
+                            self.__publisher.write(values, timestamp)
+                    if events:
+                        self.__writer.write_events(events)
+                    self.__stats['rows'] += 1
+                else:
+                    self.__stats['errors'] += 1
+        except Exception as e:
+            with self.__lock:
+                self.__stats['errors'] += 1
+                self.__stats['last_error'] = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            duration: float = time.monotonic() - started
+            if self.__governor:
+                self.__governor.record(duration=duration, failed=failed)
+            with self.__lock:
+                self.__stats['scans'] += 1
+                self.__stats['last_scan'] = time.time()
+                self.__stats['last_duration'] = duration
+
+    def stop(self) -> None:
+        """
+        Stops scanning and closes the device and storage connections.
+
+        :return: nothing
+        :rtype: None
+        """
+        self.__scheduler.remove(self)
+        if self.__owns_scheduler:
+            self.__scheduler.stop()
+        with self.__lock:
+            if self.__writer:
+                self.__writer.close()
+            self.__writer = None
+            if self.__publisher:
+                self.__publisher.close()
+            self.__publisher = None
+        self.__poller.disconnect()
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of the collector.
+
+        :return: Number of scans, errors and stored rows, time and duration of the last
+                 scan, the last error, the adaptive mode, the alarm state and the
+                 request latencies.
+        :rtype: Dict
+        """
+        with self.__lock:
+            stats: Dict = {'table': self.__config.table, **self.__stats}
+        if self.__governor:
+            stats['adaptive'] = self.__governor.stats()
+        if self.__alarms:
+            stats['alarms'] = self.__alarms.stats()
+        if self.__publisher:
+            stats['publish'] = self.__publisher.stats()
+        requests: Optional[Dict] = self.__poller.stats()
+        if requests:
+            stats['requests'] = requests
+        if self.__config.cache_age and self.__poller.gateway:
+            stats['cache'] = self.__poller.gateway.stats()
+        return stats
+
+    def __repr__(self) -> str:
+        return f'DataCollector({self.__config.ip}, {self.__config.table})'
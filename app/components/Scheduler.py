@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Dict, List, Optional, Tuple
+
+
+class Scheduler:
+    """
+    Runs periodic scans of several collectors on a shared worker pool.
+
+    Every collector is scanned at its own ``scan_rate``; a collector is never scanned
+    concurrently with itself, and a scan that overruns its period is followed by the
+    next one immediately instead of queueing up missed scans.
+
+    :param workers: Number of worker threads shared by all collectors.
+    :type workers: int
+    """
+    def __init__(self, workers: int = 4) -> None:
+        self._workers: int = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: List[Tuple[float, int, object]] = []
+        self._counter = itertools.count()
+        self._collectors: Dict[int, object] = {}
+        self._condition = threading.Condition()
+        self._running: bool = False
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns a boolean indicating whether the scheduler is running.
+
+        :return: True if the scheduler is running, False otherwise.
+        :rtype: bool
+        """
+        return self._running
+
+    def add(self, collector) -> None:
+        """
+        Schedules the collector to be scanned as soon as possible.
+
+        :param collector: An object with ``scan()`` method and ``interval`` property
+                          in seconds.
+        :return: nothing
+        :rtype: None
+        """
+        with self._condition:
+            self._collectors[id(collector)] = collector
+            heapq.heappush(self._queue, (time.monotonic(), next(self._counter), collector))
+            self._condition.notify()
+
+    def remove(self, collector) -> None:
+        """
+        Stops scheduling the collector; a scan already in progress is completed.
+
+        :param collector: A previously added collector.
+        :return: nothing
+        :rtype: None
+        """
+        with self._condition:
+            self._collectors.pop(id(collector), None)
+            self._queue = [item for item in self._queue if item[2] is not collector]
+            heapq.heapify(self._queue)
+
+    def start(self) -> None:
+        """
+        Starts the worker pool and the dispatching thread.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._running:
+            return
+        self._running = True
+        self._executor = ThreadPoolExecutor(max_workers=self._workers,
+                                            thread_name_prefix='mbir-scan')
+        self._thread = threading.Thread(target=self._dispatch, name='mbir-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops dispatching and waits for the scans in progress.
+
+        :return: nothing
+        :rtype: None
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+        self._thread = None
+        self._executor = None
+
+    def _dispatch(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and (not self._queue or
+                                         self._queue[0][0] > time.monotonic()):
+                    timeout: Optional[float] = self._queue[0][0] - time.monotonic() \
+                        if self._queue else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    return
+                due, _, collector = heapq.heappop(self._queue)
+            future: Future = self._executor.submit(collector.scan)
+            future.add_done_callback(lambda result, collector=collector, due=due:
+                                     self._reschedule(collector, due, result))
+
+    def _reschedule(self, collector, due: float, result: Future) -> None:
+        if result.exception() is not None:
+            error: BaseException = result.exception()
+            print(f'Exception was thrown while scanning {collector}: {error}')
+            print(''.join(traceback.format_exception(error)))
+        with self._condition:
+            if id(collector) not in self._collectors:
+                return
+            due = max(due + collector.interval, time.monotonic())
+            heapq.heappush(self._queue, (due, next(self._counter), collector))
+            self._condition.notify()
@@ -0,0 +1,290 @@
+import multiprocessing
+import signal
+import threading
+import time
+import traceback
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional, Tuple
+
+from app.components.DataCollector import DataCollector
+from app.components.Scheduler import Scheduler
+from app.config import PROFILE, PROFILE_MEMORY, PROFILE_TOP, PROFILE_DIR
+from app.utils.cache import LastValueCache
+from app.utils.modbus import Poller
+from app.utils.profiling import profiler
+from app.utils.pydantic.models import Config
+from app.utils.storage.base import Writer
+from app.utils.storage.factory import create_writer
+from app.utils.storage.pipe import PipeWriter
+
+
+# Maximal number of scans received from one worker before they are stored
+BATCH_SIZE: int = 500
+
+
+def _terminate(signum, frame) -> None:
+    raise SystemExit(0)
+
+
+def _work(paths: List[str], connection) -> None:
+    """
+    Entry point of a worker process: polls the devices of its shard and sends
+    the scans to the supervisor until it receives SIGTERM.
+
+    :param paths: Paths to the configurations of the shard.
+    :type paths: List[str]
+    :param connection: The sending end of the pipe to the supervisor.
+    :return: nothing
+    :rtype: None
+    """
+    # Ctrl+C reaches the whole process group; shutdown is driven by the supervisor
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, _terminate)
+    # Workers are profiled on their own, signal the worker process to capture it
+    profiler.configure(enabled=PROFILE, memory_interval=PROFILE_MEMORY,
+                       top=PROFILE_TOP, directory=PROFILE_DIR)
+    profiler.install()
+    scheduler = Scheduler(workers=len(paths))
+    collectors: List[DataCollector] = []
+    lock = threading.Lock()
+    try:
+        for path in paths:
+            config: Config = DataCollector.load(path)
+            writer = PipeWriter(connection=connection, lock=lock,
+                                config=config, tags=Poller(config).tags)
+            collector = DataCollector(config=config, scheduler=scheduler, writer=writer)
+            collector.start()
+            collectors.append(collector)
+        scheduler.start()
+        while True:
+            time.sleep(60)
+            if PROFILE:
+                print(f'{multiprocessing.current_process().name}: {profiler.spans(reset=True)}')
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        scheduler.stop()
+        for collector in collectors:
+            collector.stop()
+        connection.close()
+
+
+class Supervisor:
+    """
+    Shards device configurations across a pool of worker processes.
+
+    Workers poll and decode their devices and send the scans through a pipe of
+    their own, so a crashed worker never blocks the others; the supervisor stores
+    the scans with one writer per table, batching whatever is pending in a pipe,
+    and restarts the workers that died.
+
+    The stored scans also update a ``LastValueCache`` per table, so the API is served
+    by the supervisor. Registers skipped by a scan arrive as missing values and are
+    marked bad, and the caches of a shard are invalidated when its worker dies.
+
+    A worker that keeps dying is restarted after a delay doubling from
+    ``RESTART_DELAY`` up to ``MAX_RESTART_DELAY`` seconds, and is given up after
+    ``MAX_RESTARTS`` restarts in a row. A worker that ran for ``STABLE_AFTER``
+    seconds before it died starts the count again.
+
+    :param paths: Paths to the device configurations.
+    :type paths: List[str]
+    :param processes: Number of worker processes.
+    :type processes: int
+    """
+    RESTART_DELAY: float = 1.0
+    MAX_RESTART_DELAY: float = 60.0
+    MAX_RESTARTS: int = 10
+    STABLE_AFTER: float = 300.0
+
+    def __init__(self, paths: List[str], processes: int) -> None:
+        self._context = multiprocessing.get_context('spawn')
+        self._shards: List[List[str]] = [paths[index::processes]
+                                         for index in range(min(processes, len(paths)))]
+        self._processes: List[Optional[multiprocessing.Process]] = [None] * len(self._shards)
+        self._readers: Dict = {}
+        self._restarts: List[int] = [0] * len(self._shards)
+        # restarts in a row, start time and pending restart time of every worker
+        self._failures: List[int] = [0] * len(self._shards)
+        self._started: List[float] = [0.0] * len(self._shards)
+        self._restart_at: List[Optional[float]] = [None] * len(self._shards)
+        self._writers: Dict[str, Writer] = {}
+        self._caches: Dict[str, LastValueCache] = {}
+        self._names: Dict[str, List[str]] = {}
+        self._tables: List[List[str]] = [[] for _ in self._shards]
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._running: bool = False
+        self._receiving: bool = False
+
+    def _spawn(self, index: int) -> None:
+        reader, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(target=_work, name=f'mbir-worker-{index}',
+                                        args=(self._shards[index], sender),
+                                        daemon=True)
+        process.start()
+        sender.close()
+        with self._lock:
+            self._readers[reader] = index
+        self._processes[index] = process
+        self._started[index] = time.monotonic()
+
+    def start(self) -> None:
+        """
+        Prepares the storage of every configuration and starts the workers.
+
+        :return: nothing
+        :rtype: None
+        """
+        for index, shard in enumerate(self._shards):
+            for path in shard:
+                config: Config = DataCollector.load(path)
+                tags = Poller(config).tags
+                writer: Writer = create_writer(config=config, tags=tags)
+                writer.prepare()
+                self._add(config.table, writer, [tag.name for tag in tags])
+                self._tables[index].append(config.table)
+        self._running = True
+        self._receiving = True
+        for index in range(len(self._shards)):
+            self._spawn(index)
+        self._threads = [threading.Thread(target=self._receive, name='mbir-store', daemon=True),
+                         threading.Thread(target=self._monitor, name='mbir-monitor', daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def _add(self, table: str, writer: Writer, names: List[str]) -> None:
+        self._writers[table] = writer
+        self._caches[table] = LastValueCache()
+        self._names[table] = names
+        self._rows[table] = 0
+
+    @property
+    def caches(self) -> Dict[str, LastValueCache]:
+        """
+        Returns the last-value caches fed by the stored scans.
+
+        :return: Last-value caches keyed by table name.
+        :rtype: Dict[str, LastValueCache]
+        """
+        return self._caches
+
+    def _receive(self) -> None:
+        while True:
+            with self._lock:
+                readers: List = list(self._readers)
+            if not readers:
+                if not self._receiving:
+                    return
+                time.sleep(0.1)
+                continue
+            for reader in wait(readers, timeout=1):
+                items: List[Tuple] = []
+                try:
+                    while len(items) < BATCH_SIZE and reader.poll():
+                        items.append(reader.recv())
+                except (EOFError, OSError):
+                    with self._lock:
+                        self._readers.pop(reader, None)
+                    reader.close()
+                self._store(items)
+
+    def _store(self, items: List[Tuple]) -> None:
+        batches: Dict[str, Tuple[List[List], List[float]]] = {}
+        for item in items:
+            if len(item) == 2:
+                # Alarm events are stored at once, in the order they were raised
+                self._store_events(*item)
+                continue
+            table, timestamp, values = item
+            self._caches[table].update([{'name': name, 'value': value}
+                                        for name, value in zip(self._names[table], values)],
+                                       timestamp)
+            scans, timestamps = batches.setdefault(table, ([], []))
+            scans.append(values)
+            timestamps.append(timestamp)
+        for table, (scans, timestamps) in batches.items():
+            try:
+                self._writers[table].write_many(scans, timestamps)
+                self._rows[table] += len(scans)
+            except Exception as e:
+                print(f'Exception was thrown while storing {table}: {e}')
+                print(f'{type(e).__name__} occurred, args={str(e.args)}\n'
+                      f'{traceback.format_exc()}')
+
+    def _store_events(self, table: str, events: List) -> None:
+        try:
+            self._writers[table].write_events(events)
+        except Exception as e:
+            print(f'Exception was thrown while storing events of {table}: {e}')
+            print(f'{type(e).__name__} occurred, args={str(e.args)}\n'
+                  f'{traceback.format_exc()}')
+
+    def _monitor(self) -> None:
+        while self._running:
+            for index, process in enumerate(self._processes):
+                if self._running and process is not None and not process.is_alive():
+                    self._restart(index, process)
+            time.sleep(1)
+
+    def _restart(self, index: int, process: multiprocessing.Process) -> None:
+        now: float = time.monotonic()
+        if self._restart_at[index] is None:
+            for table in self._tables[index]:
+                self._caches[table].invalidate()
+            if now - self._started[index] >= self.STABLE_AFTER:
+                self._failures[index] = 0
+            if self._failures[index] >= self.MAX_RESTARTS:
+                print(f'Worker {process.name} exited with code {process.exitcode} after '
+                      f'{self._failures[index]} restarts in a row, giving up.')
+                self._processes[index] = None
+                return
+            delay: float = min(self.MAX_RESTART_DELAY,
+                               self.RESTART_DELAY * 2 ** self._failures[index])
+            print(f'Worker {process.name} exited with code {process.exitcode}, '
+                  f'restarting in {delay:g} s.')
+            self._restart_at[index] = now + delay
+        if now >= self._restart_at[index]:
+            self._restart_at[index] = None
+            self._failures[index] += 1
+            self._restarts[index] += 1
+            self._spawn(index)
+
+    def stop(self) -> None:
+        """
+        Stops the workers, stores the remaining scans and closes the writers.
+
+        :return: nothing
+        :rtype: None
+        """
+        self._running = False
+        if len(self._threads) > 1:
+            self._threads[1].join()
+        for process in self._processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self._processes:
+            if process is not None:
+                process.join(timeout=10)
+                if process.is_alive():
+                    process.kill()
+        self._receiving = False
+        if self._threads:
+            self._threads[0].join()
+        for writer in self._writers.values():
+            writer.close()
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of the supervisor.
+
+        :return: Shards with their worker state and restarts, and stored rows per table.
+        :rtype: Dict
+        """
+        return {'shards': [{'paths': shard,
+                            'alive': process is not None and process.is_alive(),
+                            'restarts': restarts}
+                           for shard, process, restarts in zip(self._shards, self._processes,
+                                                               self._restarts)],
+                'rows': dict(self._rows)}
@@ -5,3 +5,19 @@ load_dotenv()
 
 POSTGRES_USER = os.getenv('POSTGRES_USER')
 POSTGRES_PASSWORD = os.getenv('POSTGRES_PASSWORD')
+POSTGRES_HOST = os.getenv('POSTGRES_HOST', 'mbir-postgres')
+POSTGRES_DB = os.getenv('POSTGRES_DB', 'postgres')
+
+# Local last-value API, disabled unless the port is set
+API_HOST = os.getenv('API_HOST', '127.0.0.1')
+API_PORT = os.getenv('API_PORT')
+
+# Number of worker processes polling the devices, 1 polls everything in-process
+PROCESSES = int(os.getenv('PROCESSES', '1'))
+
+# Profiling: stage timing spans, seconds between tracemalloc snapshots (0 disables them),
+# number of reported allocation sites and the directory of the CPU profiles dumped on SIGUSR1
+PROFILE = os.getenv('PROFILE', '0') == '1'
+PROFILE_MEMORY = float(os.getenv('PROFILE_MEMORY', '0'))
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '10'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
@@ -0,0 +1,113 @@
+"""
+This module provides with adaptive scan rate control of a single device.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+from typing import Dict, List, Optional
+
+from app.utils.pydantic.models import Adaptive
+
+
+class ScanGovernor:
+    """
+    Stretches the scan period of a device that falls behind and sheds its least
+    important register blocks, then recovers gradually.
+
+    The governor keeps exponentially weighted averages of the scan duration and of
+    the share of failed scans. While the device is overloaded the scan period is
+    doubled up to ``max factor``; once it is stretched to the limit, blocks are shed
+    one priority level at a time (never the levels up to ``keep priority`` nor the most
+    important level, so every scan still polls the device and can fail). Healthy
+    scans first restore shed levels (one per ``RESTORE_AFTER`` healthy scans) and then
+    shrink the period by ``recovery`` per scan.
+
+    :param settings: Adaptive mode settings of the device.
+    :type settings: Adaptive
+    :param scan_rate: Configured scan period in milliseconds.
+    :type scan_rate: int
+    :param priorities: Priority numbers of the register blocks of the device.
+    :type priorities: List[int]
+    """
+    ALPHA: float = 0.3
+    RESTORE_AFTER: int = 10
+
+    def __init__(self, settings: Adaptive, scan_rate: int, priorities: List[int]) -> None:
+        self._settings: Adaptive = settings
+        self._base: float = scan_rate / 1000
+        self._levels: List[int] = sorted(set(priorities))
+        self._sheddable: int = min(len(self._levels) - 1,
+                                   len([level for level in self._levels
+                                        if level > settings.keep_priority]))
+        self._factor: float = 1.0
+        self._shed: int = 0
+        self._healthy: int = 0
+        self._duration: Optional[float] = None
+        self._errors: float = 0.0
+
+    @property
+    def interval(self) -> float:
+        """
+        Returns the current scan period.
+
+        :return: Scan period in seconds.
+        :rtype: float
+        """
+        return self._base * self._factor
+
+    @property
+    def priority(self) -> Optional[int]:
+        """
+        Returns the largest priority number of the blocks to read.
+
+        :return: Priority limit, or None if all blocks are read.
+        :rtype: Optional[int]
+        """
+        if not self._shed:
+            return None
+        return self._levels[len(self._levels) - self._shed - 1]
+
+    def record(self, duration: float, failed: float) -> None:
+        """
+        Accounts a finished scan and adjusts the scan period and shed levels.
+
+        :param duration: Duration of the scan in seconds.
+        :type duration: float
+        :param failed: Share of the polled registers that failed, 1 for a lost scan.
+        :type failed: float
+        :return: nothing
+        :rtype: None
+        """
+        self._duration = duration if self._duration is None else \
+            self.ALPHA * duration + (1 - self.ALPHA) * self._duration
+        self._errors = self.ALPHA * float(failed) + (1 - self.ALPHA) * self._errors
+        if self._duration > self._settings.load * self.interval \
+                or self._errors > self._settings.errors:
+            self._healthy = 0
+            if self._factor < self._settings.max_factor:
+                self._factor = min(self._settings.max_factor, self._factor * 2)
+            elif self._shed < self._sheddable:
+                self._shed += 1
+            return
+        self._healthy += 1
+        if self._shed:
+            if self._healthy >= self.RESTORE_AFTER:
+                self._shed -= 1
+                self._healthy = 0
+        else:
+            self._factor = max(1.0, self._factor * self._settings.recovery)
+
+    def stats(self) -> Dict:
+        """
+        Returns the state of the governor.
+
+        :return: Current scan period, stretch factor, priority limit and averages.
+        :rtype: Dict
+        """
+        return {'interval': self.interval, 'factor': self._factor, 'priority': self.priority,
+                'duration': self._duration, 'errors': self._errors}
@@ -0,0 +1,163 @@
+"""
+This module provides with alarm engine evaluating the limits of the scanned registers.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.utils.coders import Format, parse_format
+from app.utils.pydantic.models import Alarm, Register
+
+
+class Event(NamedTuple):
+    """
+    A raised or cleared alarm.
+
+    :ivar timestamp: Acquisition time of the value as epoch seconds.
+    :ivar tag: Name of the register.
+    :ivar kind: 'hi', 'lo' or 'rate'.
+    :ivar active: True if the alarm was raised, False if it was cleared.
+    :ivar value: The value (change per second for 'rate') that raised or cleared the alarm.
+    :ivar threshold: The configured limit.
+    """
+    timestamp: float
+    tag: str
+    kind: str
+    active: bool
+    value: float
+    threshold: float
+
+
+class _Condition:
+    """
+    State of a single limit of a register.
+    """
+    __slots__ = ('kind', 'threshold', 'active', 'since')
+
+    def __init__(self, kind: str, threshold: float) -> None:
+        self.kind: str = kind
+        self.threshold: float = threshold
+        self.active: bool = False
+        # time the condition started to differ from the alarm state
+        self.since: Optional[float] = None
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        return None if value is None else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class AlarmEngine:
+    """
+    Evaluates the hi, lo and rate-of-change limits declared in the register map.
+
+    Only the registers with an ``alarm`` are visited on every scan. A hi (lo) alarm is
+    raised when the value rises above (falls below) the limit; a rate alarm compares the
+    change per second since the previous read value. An alarm is cleared once the value
+    (the change per second) is back within the limit by the ``deadband``. A condition
+    must hold for ``delay`` seconds (``clear delay`` to clear) of acquisition time before
+    the alarm changes. Registers that were not read in the scan keep their alarms and
+    pending delays.
+
+    :param tags: Registers in the order of the scanned values.
+    :type tags: List[Register]
+    :raises ValueError: If an alarm is declared on a string or array register.
+    """
+    def __init__(self, tags: List[Register]) -> None:
+        self._alarms: List[Tuple[int, str, Alarm, List[_Condition]]] = []
+        for index, tag in enumerate(tags):
+            if tag.alarm is None:
+                continue
+            parsed: Format = parse_format(tag.format)
+            if parsed.array or parsed.base in ('String', 'Hex - ASCII', 'Binary'):
+                raise ValueError('Error@AlarmEngine.',
+                                 f'Alarms of {tag.name} need a numeric format, not {tag.format}')
+            conditions: List[_Condition] = [_Condition(kind, getattr(tag.alarm, kind))
+                                            for kind in ('hi', 'lo', 'rate')
+                                            if getattr(tag.alarm, kind) is not None]
+            if conditions:
+                self._alarms.append((index, tag.name, tag.alarm, conditions))
+        self._previous: Dict[int, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._events: int = 0
+
+    def __bool__(self) -> bool:
+        return bool(self._alarms)
+
+    def evaluate(self, registers: List[Dict], timestamp: float) -> List[Event]:
+        """
+        Evaluates the limits against a decoded scan.
+
+        :param registers: The scan result of the poller in the order of the tags.
+        :type registers: List[Dict]
+        :param timestamp: Acquisition time of the scan, used for registers without
+                          their own ``timestamp``.
+        :type timestamp: float
+        :return: Alarms raised or cleared by the scan.
+        :rtype: List[Event]
+        """
+        events: List[Event] = []
+        with self._lock:
+            for index, name, alarm, conditions in self._alarms:
+                register: Dict = registers[index]
+                value: Optional[float] = _number(register.get('value'))
+                if value is None:
+                    continue
+                moment: float = register.get('timestamp', timestamp)
+                previous: Optional[Tuple[float, float]] = self._previous.get(index)
+                self._previous[index] = (value, moment)
+                for condition in conditions:
+                    # The limit is moved by the deadband while the alarm is active
+                    band: float = alarm.deadband if condition.active else 0
+                    if condition.kind == 'rate':
+                        if previous is None or moment <= previous[1]:
+                            continue
+                        measured: float = (value - previous[0]) / (moment - previous[1])
+                        breach: bool = abs(measured) > condition.threshold - band
+                    else:
+                        measured = value
+                        breach = value > condition.threshold - band if condition.kind == 'hi' \
+                            else value < condition.threshold + band
+                    if breach == condition.active:
+                        condition.since = None
+                        continue
+                    if condition.since is None:
+                        condition.since = moment
+                    if moment - condition.since >= (alarm.delay if breach else alarm.clear_delay):
+                        condition.active = breach
+                        condition.since = None
+                        events.append(Event(moment, name, condition.kind, breach,
+                                            measured, condition.threshold))
+            self._events += len(events)
+        return events
+
+    def active(self) -> List[Dict]:
+        """
+        Returns the alarms currently raised.
+
+        :return: Tag name, kind and limit of every raised alarm.
+        :rtype: List[Dict]
+        """
+        with self._lock:
+            return [{'tag': name, 'kind': condition.kind, 'threshold': condition.threshold}
+                    for _, name, _, conditions in self._alarms
+                    for condition in conditions if condition.active]
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of the engine.
+
+        :return: Number of alarmed registers, raised alarms and events so far.
+        :rtype: Dict
+        """
+        active: List[Dict] = self.active()
+        return {'registers': len(self._alarms), 'active': len(active), 'events': self._events}
@@ -0,0 +1,149 @@
+"""
+This module provides with in-memory cache of the last scanned register values.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.utils.utils import epochTime
+
+
+class Value(NamedTuple):
+    """
+    Immutable last value of a register.
+
+    :ivar value: Decoded and adjusted value, None if the register could not be read.
+    :ivar quality: 'good' if the value was read in the last scan, 'bad' otherwise.
+    :ivar timestamp: Acquisition time as epoch seconds.
+    :ivar sequence: Number of the cache update in which the value last changed.
+    """
+    value: Any
+    quality: str
+    timestamp: float
+    sequence: int
+
+
+class LastValueCache:
+    """
+    Keeps the last value, quality and timestamp of every register.
+
+    Entries are immutable tuples and the map is only ever replaced by the single
+    writing thread (the collector scan), so readers never take a lock. Readers
+    waiting for changes are woken up by a condition notified after each update.
+    """
+    def __init__(self) -> None:
+        self._values: Dict[str, Value] = {}
+        self._sequence: int = 0
+        self._condition = threading.Condition()
+
+    @property
+    def sequence(self) -> int:
+        """
+        Returns the number of the last update.
+
+        :return: Sequence number of the last update.
+        :rtype: int
+        """
+        return self._sequence
+
+    def update(self, registers: List[Dict], timestamp: Optional[float] = None) -> None:
+        """
+        Stores the values of a scan; only changed registers get a new sequence number
+        and registers skipped by the scan keep their previous values.
+
+        :param registers: Register dictionaries as returned by ``Poller.registers``.
+        :type registers: List[Dict]
+        :param timestamp: Acquisition time as epoch seconds of the registers without
+                          a ``timestamp`` of their own, now if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        timestamp = epochTime() if timestamp is None else timestamp
+        sequence: int = self._sequence + 1
+        values: Dict[str, Value] = dict(self._values)
+        for register in registers:
+            if register.get('skipped'):
+                continue
+            name: str = register['name']
+            value: Any = register['value']
+            quality: str = 'bad' if value is None else 'good'
+            acquired: float = register.get('timestamp', timestamp)
+            previous: Optional[Value] = values.get(name)
+            if previous is not None and previous.value == value and previous.quality == quality:
+                values[name] = previous._replace(timestamp=acquired)
+            else:
+                values[name] = Value(value, quality, acquired, sequence)
+        self._publish(values, sequence)
+
+    def invalidate(self, timestamp: Optional[float] = None) -> None:
+        """
+        Marks all registers as bad, e.g. after a failed scan.
+
+        :param timestamp: Time of the failed scan as epoch seconds, now if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        timestamp = epochTime() if timestamp is None else timestamp
+        sequence: int = self._sequence + 1
+        values: Dict[str, Value] = {name: value if value.quality == 'bad'
+                                    else value._replace(quality='bad', timestamp=timestamp,
+                                                        sequence=sequence)
+                                    for name, value in self._values.items()}
+        self._publish(values, sequence)
+
+    def _publish(self, values: Dict[str, Value], sequence: int) -> None:
+        self._values = values
+        with self._condition:
+            self._sequence = sequence
+            self._condition.notify_all()
+
+    def get(self, names: Optional[List[str]] = None) -> Dict[str, Value]:
+        """
+        Returns the last values of the registers.
+
+        :param names: Register names to read, all registers if omitted.
+        :type names: Optional[List[str]]
+        :return: Last values keyed by register name; unknown names are skipped.
+        :rtype: Dict[str, Value]
+        """
+        values: Dict[str, Value] = self._values
+        if names is None:
+            return dict(values)
+        return {name: values[name] for name in names if name in values}
+
+    def changed(self, since: int, names: Optional[List[str]] = None,
+                timeout: float = 0) -> Tuple[int, Dict[str, Value]]:
+        """
+        Returns the registers changed after the given update, waiting up to ``timeout``
+        seconds for a change if there is none yet.
+
+        :param since: Sequence number returned by a previous call.
+        :type since: int
+        :param names: Register names to watch, all registers if omitted.
+        :type names: Optional[List[str]]
+        :param timeout: Maximal waiting time in seconds.
+        :type timeout: float
+        :return: The current sequence number and the changed values.
+        :rtype: Tuple[int, Dict[str, Value]]
+        """
+        deadline: float = time.monotonic() + timeout
+        while True:
+            sequence: int = self._sequence
+            changes: Dict[str, Value] = {name: value for name, value in self.get(names).items()
+                                         if value.sequence > since}
+            remaining: float = deadline - time.monotonic()
+            if changes or remaining <= 0:
+                return sequence, changes
+            with self._condition:
+                if self._sequence == sequence:
+                    self._condition.wait(remaining)
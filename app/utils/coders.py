@@ -9,20 +9,204 @@ __version__ = "1.0"
 __license__ = "MIT License"
 
 
-from typing import Dict, List
 import re
+import struct
+from functools import lru_cache
+from string import hexdigits
+from struct import Struct
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+
+# Number of registers of the scalar formats
+LENGTHS: Dict[str, int] = {'Signed': 1, 'Unsigned': 1,
+                           'Hex - ASCII': 1, 'Binary': 1,
+                           'Long AB CD': 2, 'Long CD AB': 2,
+                           'Long BA DC': 2, 'Long DC BA': 2,
+                           'Float AB CD': 2, 'Float CD AB': 2,
+                           'Float BA DC': 2, 'Float DC BA': 2,
+                           'Double AB CD EF GH': 4, 'Double GH EF CD AB': 4,
+                           'Double BA DC FE HG': 4, 'Double HG FE DC BA': 4, }
+
+# Numeric formats compiled into a pair of structs: the value is packed with the byte
+# order of the format and unpacked into 16-bit words with the order giving the requested
+# byte/word swapping (and the other way round when decoding).
+# format: (value struct, words struct, value type, (min, max) or None)
+FORMATS: Dict[str, Tuple[Struct, Struct, type, Optional[Tuple[int, int]]]] = {
+    'Signed': (Struct('>h'), Struct('>H'), int, (-32768, 32767)),
+    'Unsigned': (Struct('>H'), Struct('>H'), int, (0, 65535)),
+    'Long AB CD': (Struct('>i'), Struct('>2H'), int, None),
+    'Long CD AB': (Struct('<i'), Struct('<2H'), int, None),
+    'Long BA DC': (Struct('>i'), Struct('<2H'), int, None),
+    'Long DC BA': (Struct('<i'), Struct('>2H'), int, None),
+    'Float AB CD': (Struct('>f'), Struct('>2H'), float, None),
+    'Float CD AB': (Struct('<f'), Struct('<2H'), float, None),
+    'Float BA DC': (Struct('>f'), Struct('<2H'), float, None),
+    'Float DC BA': (Struct('<f'), Struct('>2H'), float, None),
+    'Double AB CD EF GH': (Struct('>d'), Struct('>4H'), float, None),
+    'Double GH EF CD AB': (Struct('<d'), Struct('<4H'), float, None),
+    'Double BA DC FE HG': (Struct('>d'), Struct('<4H'), float, None),
+    'Double HG FE DC BA': (Struct('<d'), Struct('>4H'), float, None),
+}
+
+_STRING = re.compile(r'String (\d+)')
+_ARRAY = re.compile(r'(.+)\[(\d+)\]')
+
+
+class Format(NamedTuple):
+    """
+    A parsed register format.
+
+    :ivar base: The scalar format, 'Bit' or 'String'.
+    :ivar count: Number of array items or string registers, 1 for scalars.
+    :ivar length: Number of registers.
+    :ivar array: True if the format is an array of ``count`` items of ``base``.
+    """
+    base: str
+    count: int
+    length: int
+    array: bool
+
+
+@lru_cache(maxsize=None)
+def parse_format(data_format: str) -> Format:
+    """
+    Parses a register format.
+
+    Besides the scalar formats of :data:`LENGTHS`, 'Bit' is a single bit of a register
+    (addressed as '<register>.<bit>' in the register map), 'String N' is an ASCII string
+    of N registers (two characters each, high byte first) and '<numeric format>[N]' is
+    an array of N values, e.g. 'Float AB CD[8]'.
+
+    :param data_format: The format of a register.
+    :type data_format: str
+    :raises ValueError: If the format is unknown.
+    :return: The parsed format.
+    :rtype: Format
+    """
+    if data_format in LENGTHS:
+        return Format(data_format, 1, LENGTHS[data_format], False)
+    if data_format == 'Bit':
+        return Format('Bit', 1, 1, False)
+    match = _STRING.fullmatch(data_format)
+    if match and int(match.group(1)) > 0:
+        return Format('String', int(match.group(1)), int(match.group(1)), False)
+    match = _ARRAY.fullmatch(data_format)
+    if match and match.group(1) in FORMATS and int(match.group(2)) > 0:
+        count: int = int(match.group(2))
+        return Format(match.group(1), count, count * LENGTHS[match.group(1)], True)
+    raise ValueError('Error@parse_format.', f'Unknown format {data_format}')
+
+
+def format_length(data_format: str) -> int:
+    """
+    Returns the number of registers of a format.
+
+    :param data_format: The format of a register.
+    :type data_format: str
+    :raises ValueError: If the format is unknown.
+    :return: Number of registers.
+    :rtype: int
+    """
+    return parse_format(data_format).length
+
 
-from pymodbus.constants import Endian
-from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
+class Block:
+    """
+    Words of a block response, packed into bytes once for all of its registers.
+
+    :param words: Registers (or coils) of the response.
+    :type words: List
+    """
+    __slots__ = ('words', '_big', '_little')
+
+    def __init__(self, words: List) -> None:
+        self.words: List = words
+        self._big: Optional[bytes] = None
+        self._little: Optional[bytes] = None
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def buffer(self, little: bool = False) -> bytes:
+        """
+        Returns the words as bytes, every word big-endian or little-endian.
+
+        :param little: True for little-endian words.
+        :type little: bool
+        :return: Two bytes per word.
+        :rtype: bytes
+        """
+        if little:
+            if self._little is None:
+                self._little = struct.pack(f'<{len(self.words)}H', *self.words)
+            return self._little
+        if self._big is None:
+            self._big = struct.pack(f'>{len(self.words)}H', *self.words)
+        return self._big
 
 
 class Decoder:
     """
     Decodes binary data using various formats.
-    
+
+    .. note::
+        Numeric formats are decoded with the structs of :data:`FORMATS`. A block is
+        packed into bytes once (see :class:`Block`) and every register is unpacked from
+        it at its offset, so byte/word swapping costs no per-value copies: a format is
+        read from the big-endian or the little-endian words of the block with the byte
+        order of its value struct.
     """
     def __init__(self) -> None:
-        pass
+        self._compiled: Dict[str, Tuple[bool, Struct, bool]] = {}
+        self._methods: Dict[str, Callable] = {'Hex - ASCII': self.hex_ascii,
+                                              'Binary': self.binary, }
+
+    def _compile(self, data_format: str) -> Tuple[bool, Struct, bool]:
+        compiled: Optional[Tuple[bool, Struct, bool]] = self._compiled.get(data_format)
+        if compiled is None:
+            parsed: Format = parse_format(data_format)
+            value, words = FORMATS[parsed.base][:2]
+            compiled = (words.format[0] == '<',
+                        Struct(f'{value.format[0]}{parsed.count}{value.format[1:]}'),
+                        parsed.array)
+            self._compiled[data_format] = compiled
+        return compiled
+
+    def _decode(self, data_format: str, value: List) -> Any:
+        return self.decode_at(Block(list(value)), 0, data_format)
+
+    def decode_at(self, block: Block, offset: int, data_format: str,
+                  bit: Optional[int] = None) -> Any:
+        """
+        Decodes a register of a block response.
+
+        :param block: The block response.
+        :type block: Block
+        :param offset: Offset of the register in the block, in words.
+        :type offset: int
+        :param data_format: The format of the register, see :func:`parse_format`.
+        :type data_format: str
+        :param bit: The bit of a 'Bit' register, 0 is the least significant one.
+        :type bit: Optional[int]
+        :raises ValueError: If the format is unknown or the block is too short.
+        :return: int or float for numeric formats, a list of them for arrays,
+                 bool for bits and str for the others.
+        :rtype: Any
+        """
+        if data_format not in self._methods:
+            parsed: Format = parse_format(data_format)
+            if offset + parsed.length > len(block):
+                raise ValueError('Error@Decoder.decode_at.',
+                                 f'{data_format} at {offset} exceeds the block of {len(block)}')
+            if parsed.base == 'Bit':
+                return bool((int(block.words[offset]) >> (bit or 0)) & 1)
+            if parsed.base == 'String':
+                return block.buffer()[2 * offset:2 * (offset + parsed.count)] \
+                    .rstrip(b'\x00 ').decode('ascii', errors='replace')
+            little, unpacker, array = self._compile(data_format)
+            result: Tuple = unpacker.unpack_from(block.buffer(little), 2 * offset)
+            return list(result) if array else result[0]
+        return self._methods[data_format](value=block.words[offset:offset + 1])
 
     def signed(self, value: List) -> int:
         """
@@ -33,7 +217,7 @@ class Decoder:
         :return: Decoded data in signed integer format.
         :rtype: int
         """
-        return int(value[0]) - 65536 if int(value[0]) > 32767 else int(value[0])
+        return self._decode('Signed', value)
     
     def unsigned(self, value: List) -> int:
         """
@@ -44,7 +228,7 @@ class Decoder:
         :return: Decoded data in unsigned integer format.
         :rtype: int
         """
-        return int(value[0])
+        return self._decode('Unsigned', value)
     
     def hex_ascii(self, value: List) -> str:
         """
@@ -78,9 +262,7 @@ class Decoder:
         :return: Decoded data in 32-bit integer format.
         :rtype: int
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Big).decode_32bit_int()
+        return self._decode('Long AB CD', value)
     
     def long_cd_ab(self, value: List) -> int:
         """
@@ -92,9 +274,7 @@ class Decoder:
         :return: Decoded data in 32-bit integer format.
         :rtype: int
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Little).decode_32bit_int()
+        return self._decode('Long CD AB', value)
     
     def long_ba_dc(self, value: List) -> int:
         """
@@ -106,9 +286,7 @@ class Decoder:
         :return: Decoded data in 32-bit integer format.
         :rtype: int
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Big).decode_32bit_int()
+        return self._decode('Long BA DC', value)
     
     def long_dc_ba(self, value: List) -> int:
         """
@@ -120,9 +298,7 @@ class Decoder:
         :return: Decoded data in 32-bit integer format.
         :rtype: int
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Little).decode_32bit_int()
+        return self._decode('Long DC BA', value)
     
     def float_ab_cd(self, value: List) -> float:
         """
@@ -134,9 +310,7 @@ class Decoder:
         :return: Decoded data in 32-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Big).decode_32bit_float()
+        return self._decode('Float AB CD', value)
     
     def float_cd_ab(self, value: List) -> float:
         """
@@ -148,9 +322,7 @@ class Decoder:
         :return: Decoded data in 32-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Little).decode_32bit_float()
+        return self._decode('Float CD AB', value)
     
     def float_ba_dc(self, value: List) -> float:
         """
@@ -162,9 +334,7 @@ class Decoder:
         :return: Decoded data in 32-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Big).decode_32bit_float()
+        return self._decode('Float BA DC', value)
     
     def float_dc_ba(self, value: List) -> float:
         """
@@ -176,9 +346,7 @@ class Decoder:
         :return: Decoded data in 32-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Little).decode_32bit_float()
+        return self._decode('Float DC BA', value)
     
     def double_ab_cd_ef_gh(self, value: List) -> float:
         """
@@ -190,9 +358,7 @@ class Decoder:
         :return: Decoded data in 64-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Big).decode_64bit_float()
+        return self._decode('Double AB CD EF GH', value)
     
     def double_gh_ef_cd_ab(self, value: List) -> float:
         """
@@ -204,9 +370,7 @@ class Decoder:
         :return: Decoded data in 64-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Big,
-                                                  wordorder=Endian.Little).decode_64bit_float()
+        return self._decode('Double GH EF CD AB', value)
     
     def double_ba_dc_fe_hg(self, value: List) -> float:
         """
@@ -218,9 +382,7 @@ class Decoder:
         :return: Decoded data in 64-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Big).decode_64bit_float()
+        return self._decode('Double BA DC FE HG', value)
     
     def double_hg_fe_dc_ba(self, value: List) -> float:
         """
@@ -232,46 +394,76 @@ class Decoder:
         :return: Decoded data in 64-bit float format.
         :rtype: float
         """
-        return BinaryPayloadDecoder.fromRegisters(registers=value,
-                                                  byteorder=Endian.Little,
-                                                  wordorder=Endian.Little).decode_64bit_float()
+        return self._decode('Double HG FE DC BA', value)
+
 
 class Encoder:
     """
     A class for encoding various numerical data types as a list of pymodbus registers.
 
     .. note::
-        This class uses the `pymodbus` library to build the register list 
-        for the given numerical value.
+        Every format is compiled once into a pair of ``struct.Struct`` objects (see
+        :data:`FORMATS`): the value is packed with the byte order of the format and
+        unpacked into 16-bit words with the order giving the requested byte/word
+        swapping. This produces the same registers as
+        ``pymodbus.payload.BinaryPayloadBuilder`` without building a payload per value.
     """
+    _formats: Dict[str, Tuple[Struct, Struct, type, Optional[Tuple[int, int]]]] = FORMATS
+
     def __init__(self) -> None:
-        self._hex_ascii_pattern = re.compile(r'^0x[0-9a-fA-F]{1,4}$')
-        self._binary_pattern = re.compile(r'^[01]{4} [01]{4} [01]{4} [01]{4}$')
-
-    def _16bit_int(self, value: str, data_format: Dict) -> List[int]:
-        builder = BinaryPayloadBuilder(**data_format)
-        builder.add_16bit_int(int(value))
-        return builder.to_registers()
-
-    def _16bit_uint(self, value: str, data_format: Dict) -> List[int]:
-        builder = BinaryPayloadBuilder(**data_format)
-        builder.add_16bit_uint(int(value))
-        return builder.to_registers()
-
-    def _32bit_int(self, value: str, data_format: Dict) -> List[int]:
-        builder = BinaryPayloadBuilder(**data_format)
-        builder.add_32bit_int(int(value))
-        return builder.to_registers()
-
-    def _32bit_float(self, value: str, data_format: Dict) -> List[int]:
-        builder = BinaryPayloadBuilder(**data_format)
-        builder.add_32bit_float(float(value))
-        return builder.to_registers()
-
-    def _64bit_float(self, value: str, data_format: Dict) -> List[int]:
-        builder = BinaryPayloadBuilder(**data_format)
-        builder.add_64bit_float(float(value))
-        return builder.to_registers()
+        self._methods: Dict[str, Callable] = {'Hex - ASCII': self.hex_ascii,
+                                              'Binary': self.binary, }
+
+    def _encode(self, data_format: str, value: Any) -> Optional[List[int]]:
+        pack, unpack, cast, limits = self._formats[data_format]
+        try:
+            # Non-finite values pass as floats but can not be cast to integers
+            value = cast(value)
+            if limits is not None and not limits[0] <= value <= limits[1]:
+                return None
+            return list(unpack.unpack(pack.pack(value)))
+        except (struct.error, ValueError, OverflowError):
+            return None
+
+    def encode(self, data_format: str, value: Any) -> Optional[List[int]]:
+        """
+        Encodes a single value in the given format as a list of registers.
+
+        :param data_format: The format to encode the value in.
+        :type data_format: str
+        :param value: The value to encode.
+        :type value: Any
+        :raises ValueError: If the specified data format is not supported.
+        :return: list of registers, or None if the value does not fit the format.
+        :rtype: Optional[List[int]]
+        """
+        if data_format in self._formats:
+            return self._encode(data_format, value)
+        if data_format in self._methods:
+            return self._methods[data_format](value=value)
+        raise ValueError('Error@Encoder.encode.',
+                         f'data_format {data_format} is not supported.')
+
+    def encode_many(self, data_formats: List[str], values: List[Any]) -> Optional[List[int]]:
+        """
+        Encodes a batch of values into one contiguous list of registers.
+
+        :param data_formats: Formats of the values.
+        :type data_formats: List[str]
+        :param values: Values to encode, in the order of ``data_formats``.
+        :type values: List[Any]
+        :raises ValueError: If some of the data formats are not supported.
+        :return: list of registers, or None if some of the values do not fit their format.
+        :rtype: Optional[List[int]]
+        """
+        result: List[int] = []
+        for data_format, value in zip(data_formats, values):
+            words: Optional[List[int]] = self._encode(data_format, value) \
+                if data_format in self._formats else self.encode(data_format, value)
+            if words is None:
+                return None
+            result.extend(words)
+        return result
 
     def signed(self, value: str) -> List[int]:
         """
@@ -282,10 +474,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        if -32768 <= value <= 32767:
-            data_format: Dict = {'byteorder': Endian.Big, }
-            return self._16bit_int(value=value, data_format=data_format)
-        return None
+        return self._encode('Signed', value)
 
     def unsigned(self, value: str) -> List[int]:
         """
@@ -296,10 +485,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        if 0 <= value <= 65535:
-            data_format: Dict = {'byteorder': Endian.Big, }
-            return self._16bit_uint(value=value, data_format=data_format)
-        return None
+        return self._encode('Unsigned', value)
 
     def hex_ascii(self, value: str) -> List[int]:
         """
@@ -310,9 +496,9 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        if self._hex_ascii_pattern.match(value):
-            data_format: Dict = {'byteorder': Endian.Big, }
-            return self._16bit_uint(value=int(value, 16), data_format=data_format)
+        if isinstance(value, str) and 3 <= len(value) <= 6 and value[:2] == '0x' \
+                and not value[2:].strip(hexdigits):
+            return [int(value[2:], 16)]
         return None
 
     def binary(self, value: str) -> List[int]:
@@ -324,9 +510,11 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        if self._binary_pattern.match(value):
-            data_format: Dict = {'byteorder': Endian.Big, }
-            return self._16bit_uint(value=int(value.replace(' ', ''), 2), data_format=data_format)
+        if isinstance(value, str) and len(value) == 19 and \
+                value[4] == value[9] == value[14] == ' ':
+            digits: str = value.replace(' ', '')
+            if len(digits) == 16 and not digits.strip('01'):
+                return [int(digits, 2)]
         return None
 
     def long_ab_cd(self, value: str) -> List[int]:
@@ -339,9 +527,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Big, }
-        return self._32bit_int(value=value, data_format=data_format)
+        return self._encode('Long AB CD', value)
 
     def long_cd_ab(self, value: str) -> List[int]:
         """
@@ -353,9 +539,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Little, }
-        return self._32bit_int(value=value, data_format=data_format)
+        return self._encode('Long CD AB', value)
 
     def long_ba_dc(self, value: str) -> List[int]:
         """
@@ -367,9 +551,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Big, }
-        return self._32bit_int(value=value, data_format=data_format)
+        return self._encode('Long BA DC', value)
 
     def long_dc_ba(self, value: str) -> List[int]:
         """
@@ -381,9 +563,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Little, }
-        return self._32bit_int(value=value, data_format=data_format)
+        return self._encode('Long DC BA', value)
 
     def float_ab_cd(self, value: str) -> List[int]:
         """
@@ -395,9 +575,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Big, }
-        return self._32bit_float(value=value, data_format=data_format)
+        return self._encode('Float AB CD', value)
 
     def float_cd_ab(self, value: str) -> List[int]:
         """
@@ -409,9 +587,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Little, }
-        return self._32bit_float(value=value, data_format=data_format)
+        return self._encode('Float CD AB', value)
 
     def float_ba_dc(self, value: str) -> List[int]:
         """
@@ -423,9 +599,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Big, }
-        return self._32bit_float(value=value, data_format=data_format)
+        return self._encode('Float BA DC', value)
 
     def float_dc_ba(self, value: str) -> List[int]:
         """
@@ -437,9 +611,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Little, }
-        return self._32bit_float(value=value, data_format=data_format)
+        return self._encode('Float DC BA', value)
 
     def double_ab_cd_ef_gh(self, value: str) -> List[int]:
         """
@@ -451,9 +623,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Big, }
-        return self._64bit_float(value=value, data_format=data_format)
+        return self._encode('Double AB CD EF GH', value)
 
     def double_gh_ef_cd_ab(self, value: str) -> List[int]:
         """
@@ -465,9 +635,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Big,
-                             'wordorder': Endian.Little, }
-        return self._64bit_float(value=value, data_format=data_format)
+        return self._encode('Double GH EF CD AB', value)
 
     def double_ba_dc_fe_hg(self, value: str) -> List[int]:
         """
@@ -479,9 +647,7 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Big, }
-        return self._64bit_float(value=value, data_format=data_format)
+        return self._encode('Double BA DC FE HG', value)
 
     def double_hg_fe_dc_ba(self, value: str) -> List[int]:
         """
@@ -493,6 +659,4 @@ class Encoder:
         :return: list of registers.
         :rtype: List[int]
         """
-        data_format: Dict = {'byteorder': Endian.Little,
-                             'wordorder': Endian.Little, }
-        return self._64bit_float(value=value, data_format=data_format)
+        return self._encode('Double HG FE DC BA', value)
@@ -0,0 +1,396 @@
+"""
+This module provides with compressed columnar encoding of scan batches.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import json
+import math
+import struct
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# Magic number of a block file
+MAGIC: bytes = b'MBC1'
+
+# Column codecs
+DELTA: int = 1      # integers: zigzag varint deltas
+RLE: int = 2        # coils, discrete inputs, strings and arrays: runs of equal values
+XOR: int = 3        # floats: XOR with the previous value, zero bytes trimmed
+DECIMAL: int = 4    # floats with few decimals: varint deltas of the scaled values
+
+# Maximal number of decimals of the floats stored as scaled integers
+MAX_DECIMALS: int = 4
+
+
+def _put_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _get_varint(data: bytes, position: int) -> Tuple[int, int]:
+    result: int = 0
+    shift: int = 0
+    while True:
+        byte: int = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _encode_validity(buffer: bytearray, column: List) -> List:
+    # Alternating run lengths of present and missing values, starting with present ones
+    runs: List[int] = []
+    present: bool = True
+    length: int = 0
+    for value in column:
+        if (value is not None) != present:
+            runs.append(length)
+            present = not present
+            length = 0
+        length += 1
+    runs.append(length)
+    _put_varint(buffer, len(runs))
+    for length in runs:
+        _put_varint(buffer, length)
+    return column if len(runs) == 1 else [value for value in column if value is not None]
+
+
+def _decode_validity(data: bytes, position: int) -> Tuple[List[bool], int]:
+    count, position = _get_varint(data, position)
+    mask: List[bool] = []
+    present: bool = True
+    for _ in range(count):
+        length, position = _get_varint(data, position)
+        mask.extend([present] * length)
+        present = not present
+    return mask, position
+
+
+def _encode_delta(buffer: bytearray, values: List[int]) -> None:
+    previous: int = 0
+    for value in values:
+        _put_varint(buffer, _zigzag(value - previous))
+        previous = value
+
+
+def _decode_delta(data: bytes, position: int, count: int) -> Tuple[List[int], int]:
+    values: List[int] = []
+    previous: int = 0
+    for _ in range(count):
+        delta, position = _get_varint(data, position)
+        previous += _unzigzag(delta)
+        values.append(previous)
+    return values, position
+
+
+def _encode_rle(buffer: bytearray, values: List, put: Callable[[bytearray, Any], None]) -> None:
+    index: int = 0
+    while index < len(values):
+        end: int = index + 1
+        while end < len(values) and values[end] == values[index]:
+            end += 1
+        put(buffer, values[index])
+        _put_varint(buffer, end - index)
+        index = end
+
+
+def _decode_rle(data: bytes, position: int, count: int,
+                get: Callable[[bytes, int], Tuple[Any, int]]) -> Tuple[List, int]:
+    values: List = []
+    while len(values) < count:
+        value, position = get(data, position)
+        length, position = _get_varint(data, position)
+        values.extend([value] * length)
+    return values, position
+
+
+def _put_int(buffer: bytearray, value: int) -> None:
+    _put_varint(buffer, _zigzag(value))
+
+
+def _get_int(data: bytes, position: int) -> Tuple[int, int]:
+    value, position = _get_varint(data, position)
+    return _unzigzag(value), position
+
+
+def _put_str(buffer: bytearray, value: str) -> None:
+    encoded: bytes = value.encode()
+    _put_varint(buffer, len(encoded))
+    buffer.extend(encoded)
+
+
+def _get_str(data: bytes, position: int) -> Tuple[str, int]:
+    length, position = _get_varint(data, position)
+    return bytes(data[position:position + length]).decode(), position + length
+
+
+def _encode_xor(buffer: bytearray, values: List[float]) -> None:
+    # Gorilla-style: a value equal to the previous one costs a zero byte, otherwise
+    # a header with the leading zero bytes and the length of the meaningful bytes
+    # of the XOR with the previous value is followed by the meaningful bytes
+    raw: bytes = struct.pack(f'>{len(values)}d', *values)
+    previous: int = 0
+    for offset in range(0, len(raw), 8):
+        bits: int = int.from_bytes(raw[offset:offset + 8], 'big')
+        xor: int = bits ^ previous
+        previous = bits
+        if not xor:
+            buffer.append(0)
+            continue
+        leading: int = (64 - xor.bit_length()) // 8
+        trailing: int = ((xor & -xor).bit_length() - 1) // 8
+        length: int = 8 - leading - trailing
+        buffer.append(0x80 | (leading << 3) | (length - 1))
+        buffer.extend((xor >> (trailing * 8)).to_bytes(length, 'big'))
+
+
+def _decode_xor(data: bytes, position: int, count: int) -> Tuple[List[float], int]:
+    words: List[int] = []
+    previous: int = 0
+    for _ in range(count):
+        header: int = data[position]
+        position += 1
+        if header:
+            leading: int = (header >> 3) & 0x07
+            length: int = (header & 0x07) + 1
+            xor: int = int.from_bytes(data[position:position + length], 'big')
+            previous ^= xor << ((8 - leading - length) * 8)
+            position += length
+        words.append(previous)
+    return list(struct.unpack(f'>{count}d', struct.pack(f'>{count}Q', *words))), position
+
+
+def _put_list(buffer: bytearray, value: List) -> None:
+    _put_str(buffer, json.dumps(value, separators=(',', ':')))
+
+
+def _get_list(data: bytes, position: int) -> Tuple[List, int]:
+    value, position = _get_str(data, position)
+    return json.loads(value), position
+
+
+def _is_binary(values: List) -> bool:
+    return all(value in (0, 1) for value in values)
+
+
+def _decimals(values: List[float]) -> Optional[int]:
+    # The least number of decimals representing every value exactly, if any
+    for decimals in range(MAX_DECIMALS + 1):
+        scale: int = 10 ** decimals
+        if all(math.isfinite(value) and round(value * scale) / scale == value
+               and (value or math.copysign(1, value) > 0) for value in values):
+            return decimals
+    return None
+
+
+def encode_block(timestamps: List[int], columns: List[List], kinds: List[str]) -> bytes:
+    """
+    Encodes a batch of scans column by column.
+
+    Timestamps are stored as delta-of-delta varints, integer columns holding 0 and 1
+    only (coils and discrete inputs) and string columns as runs of equal values, the
+    other integer columns as varint deltas and arrays as runs of equal JSON strings.
+    Float columns whose values have at most ``MAX_DECIMALS`` decimals (adjusted values
+    are rounded to two) are stored as varint deltas of the scaled values, the other
+    ones as XOR with the previous value.
+    Missing values are stored as runs in a validity section of the column.
+
+    :param timestamps: Acquisition times of the scans as epoch microseconds.
+    :type timestamps: List[int]
+    :param columns: Values of every column in the order of the scans.
+    :type columns: List[List]
+    :param kinds: Kind of every column: 'int', 'bool', 'float', 'str' or 'list'.
+    :type kinds: List[str]
+    :raises ValueError: If the kind of a column is unknown.
+    :return: The encoded block.
+    :rtype: bytes
+    """
+    buffer: bytearray = bytearray()
+    _put_varint(buffer, len(timestamps))
+    _put_varint(buffer, len(columns))
+    previous: int = 0
+    delta: int = 0
+    for index, timestamp in enumerate(timestamps):
+        if index == 0:
+            _put_int(buffer, timestamp)
+        else:
+            _put_int(buffer, (timestamp - previous) - delta)
+            delta = timestamp - previous
+        previous = timestamp
+    for column, kind in zip(columns, kinds):
+        section: bytearray = bytearray()
+        values: List = _encode_validity(section, column)
+        if kind in ('int', 'bool'):
+            codec: int = RLE if _is_binary(values) else DELTA
+            if codec == RLE:
+                _encode_rle(section, values, _put_int)
+            else:
+                _encode_delta(section, values)
+        elif kind == 'float':
+            decimals: Optional[int] = _decimals(values)
+            if decimals is None:
+                codec = XOR
+                _encode_xor(section, values)
+            else:
+                codec = DECIMAL
+                section.append(decimals)
+                scale: int = 10 ** decimals
+                _encode_delta(section, [round(value * scale) for value in values])
+        elif kind == 'str':
+            codec = RLE
+            _encode_rle(section, values, _put_str)
+        elif kind == 'list':
+            codec = RLE
+            _encode_rle(section, values, _put_list)
+        else:
+            raise ValueError('Error@encode_block.', f'Unknown column kind {kind}')
+        buffer.append(codec)
+        _put_varint(buffer, len(section))
+        buffer.extend(section)
+    return bytes(buffer)
+
+
+def decode_block(data: bytes, kinds: List[str]) -> Tuple[List[int], List[List]]:
+    """
+    Decodes a block encoded by :func:`encode_block`.
+
+    :param data: The encoded block.
+    :type data: bytes
+    :param kinds: Kind of every column: 'int', 'bool', 'float', 'str' or 'list'.
+    :type kinds: List[str]
+    :return: Acquisition times as epoch microseconds and the values of every column.
+    :rtype: Tuple[List[int], List[List]]
+    """
+    count, position = _get_varint(data, 0)
+    width, position = _get_varint(data, position)
+    timestamps: List[int] = []
+    previous: int = 0
+    delta: int = 0
+    for index in range(count):
+        value, position = _get_int(data, position)
+        if index:
+            delta += value
+            previous += delta
+        else:
+            previous = value
+        timestamps.append(previous)
+    columns: List[List] = []
+    for kind in kinds[:width]:
+        codec: int = data[position]
+        length, position = _get_varint(data, position + 1)
+        end: int = position + length
+        mask, position = _decode_validity(data, position)
+        present: int = sum(mask)
+        if codec == DELTA:
+            values, position = _decode_delta(data, position, present)
+        elif codec == DECIMAL:
+            scale: int = 10 ** data[position]
+            values, position = _decode_delta(data, position + 1, present)
+            values = [value / scale for value in values]
+        elif codec == XOR:
+            values, position = _decode_xor(data, position, present)
+        else:
+            values, position = _decode_rle(data, position, present,
+                                           {'str': _get_str, 'list': _get_list}.get(kind, _get_int))
+            if kind == 'bool':
+                values = [bool(value) for value in values]
+        if present < count:
+            iterator: Iterator = iter(values)
+            values = [next(iterator) if valid else None for valid in mask]
+        columns.append(values)
+        position = end
+    return timestamps, columns
+
+
+def write_header(stream: IO[bytes], header: Dict) -> None:
+    """
+    Writes the magic number and the JSON header of a block file.
+
+    :param stream: A binary stream positioned at the start of the file.
+    :type stream: IO[bytes]
+    :param header: Description of the columns, at least ``columns`` and ``kinds``.
+    :type header: Dict
+    :return: nothing
+    :rtype: None
+    """
+    encoded: bytes = json.dumps(header, separators=(',', ':')).encode()
+    buffer: bytearray = bytearray(MAGIC)
+    _put_varint(buffer, len(encoded))
+    stream.write(bytes(buffer) + encoded)
+
+
+def write_block(stream: IO[bytes], block: bytes) -> None:
+    """
+    Appends a length-prefixed block to a block file.
+
+    :param stream: A binary stream positioned after the header or the last block.
+    :type stream: IO[bytes]
+    :param block: A block encoded by :func:`encode_block`.
+    :type block: bytes
+    :return: nothing
+    :rtype: None
+    """
+    buffer: bytearray = bytearray()
+    _put_varint(buffer, len(block))
+    stream.write(bytes(buffer) + block)
+
+
+def read_blocks(stream: IO[bytes]) -> Tuple[Dict, Iterator[Tuple[List[int], List[List]]]]:
+    """
+    Reads the header of a block file and returns an iterator over its decoded blocks.
+
+    A block truncated by an interrupted write ends the iteration.
+
+    :param stream: A binary stream positioned at the start of the file.
+    :type stream: IO[bytes]
+    :raises ValueError: If the stream is not a block file.
+    :return: The header and an iterator over the decoded blocks.
+    :rtype: Tuple[Dict, Iterator[Tuple[List[int], List[List]]]]
+    """
+    if stream.read(len(MAGIC)) != MAGIC:
+        raise ValueError('Error@read_blocks.', 'Not a block file.')
+    header: Dict = json.loads(stream.read(_read_varint(stream)))
+    kinds: List[str] = header['kinds']
+
+    def blocks() -> Iterator[Tuple[List[int], List[List]]]:
+        while True:
+            length: Optional[int] = _read_varint(stream)
+            if not length:
+                return
+            data: bytes = stream.read(length)
+            if len(data) < length:
+                return
+            yield decode_block(data, kinds)
+
+    return header, blocks()
+
+
+def _read_varint(stream: IO[bytes]) -> Optional[int]:
+    result: int = 0
+    shift: int = 0
+    while True:
+        byte: bytes = stream.read(1)
+        if not byte:
+            return None
+        result |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return result
+        shift += 7
@@ -0,0 +1,200 @@
+"""
+This module provides with derived tags computed from expressions over other tags.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import ast
+import math
+from types import CodeType
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from app.utils.pydantic.models import Derived
+
+
+def _bit(value: Any, index: int) -> int:
+    return (int(value) >> int(index)) & 1
+
+
+def _word(*bits: Any) -> int:
+    return sum(int(bool(bit)) << index for index, bit in enumerate(bits))
+
+
+# Functions available in expressions
+FUNCTIONS: Dict[str, Callable] = {'abs': abs, 'min': min, 'max': max, 'round': round,
+                                  'sqrt': math.sqrt, 'log': math.log, 'log10': math.log10,
+                                  'exp': math.exp, 'floor': math.floor, 'ceil': math.ceil,
+                                  'bit': _bit, 'word': _word}
+
+# Syntax allowed in expressions: arithmetic, bitwise, comparison and boolean operators,
+# conditional expressions, numbers, tag names (not dunder ones) and calls of FUNCTIONS
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp,
+          ast.Call, ast.Name, ast.Load, ast.Constant,
+          ast.operator, ast.unaryop, ast.boolop, ast.cmpop)
+
+
+class _Expression:
+    """
+    A compiled expression of a derived tag.
+    """
+    __slots__ = ('tag', 'code', 'inputs')
+
+    def __init__(self, tag: Derived, code: CodeType, inputs: Set[str]) -> None:
+        self.tag: Derived = tag
+        self.code: CodeType = code
+        self.inputs: Set[str] = inputs
+
+
+def compile_expression(tag: Derived) -> _Expression:
+    """
+    Parses and compiles the expression of a derived tag.
+
+    :param tag: The derived tag.
+    :type tag: Derived
+    :raises ValueError: If the expression is invalid or uses forbidden syntax.
+    :return: The compiled expression and the names of the tags it reads.
+    :rtype: _Expression
+    """
+    try:
+        tree: ast.Expression = ast.parse(tag.expression, mode='eval')
+    except SyntaxError as e:
+        raise ValueError('Error@compile_expression.',
+                         f'Invalid expression of {tag.name}: {e.msg}') from e
+    inputs: Set[str] = set()
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise ValueError('Error@compile_expression.',
+                             f'{type(node).__name__} is not allowed in the expression of {tag.name}')
+        if isinstance(node, ast.Call) and not (isinstance(node.func, ast.Name)
+                                               and node.func.id in FUNCTIONS and not node.keywords):
+            raise ValueError('Error@compile_expression.',
+                             f'Only calls of {", ".join(FUNCTIONS)} are allowed '
+                             f'in the expression of {tag.name}')
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError('Error@compile_expression.',
+                             f'Only numbers are allowed in the expression of {tag.name}')
+        if isinstance(node, ast.Name) and node.id.startswith('__'):
+            raise ValueError('Error@compile_expression.',
+                             f'Name {node.id} is not allowed in the expression of {tag.name}')
+        if isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            inputs.add(node.id)
+    return _Expression(tag, compile(tree, f'<{tag.name}>', 'eval'), inputs)
+
+
+def _number(value: Any) -> Any:
+    # Decoded values are strings; integral values become int so bitwise operators work
+    if value is None or not isinstance(value, str):
+        return value
+    try:
+        number: float = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+
+class DerivedTags:
+    """
+    Evaluates derived tags incrementally.
+
+    The expressions are compiled once and ordered by their dependencies, so a derived
+    tag may read registers and other derived tags. On every scan only the tags whose
+    inputs changed are evaluated again; registers of skipped blocks count as unchanged.
+    A tag with a missing input or failing evaluation has None value.
+
+    :param tags: The derived tags of the configuration.
+    :type tags: List[Derived]
+    :param registers: Names of the registers available to the expressions.
+    :type registers: List[str]
+    :raises ValueError: If an expression is invalid, reads an unknown tag, a name is
+                        taken or the derived tags depend on each other in a cycle.
+    """
+    def __init__(self, tags: List[Derived], registers: List[str]) -> None:
+        expressions: Dict[str, _Expression] = {tag.name: compile_expression(tag) for tag in tags}
+        duplicates: Set[str] = set(registers) & set(expressions)
+        if duplicates or len(expressions) < len(tags):
+            raise ValueError('Error@DerivedTags.',
+                             f'Derived tag names must be unique: {", ".join(sorted(duplicates))}')
+        known: Set[str] = set(registers) | set(expressions)
+        for name, expression in expressions.items():
+            unknown: Set[str] = expression.inputs - known
+            if unknown:
+                raise ValueError('Error@DerivedTags.',
+                                 f'{name} reads unknown tags {", ".join(sorted(unknown))}')
+        self._order: List[_Expression] = self.__sort(expressions)
+        self._inputs: Dict[str, Any] = {}
+        self._values: Dict[str, Any] = {}
+        self._globals: Dict = {'__builtins__': {}, **FUNCTIONS}
+
+    @staticmethod
+    def __sort(expressions: Dict[str, _Expression]) -> List[_Expression]:
+        order: List[_Expression] = []
+        state: Dict[str, int] = {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise ValueError('Error@DerivedTags.',
+                                 f'Cyclic derived tags {" -> ".join(path + [name])}')
+            state[name] = 1
+            for dependency in sorted(expressions[name].inputs & set(expressions)):
+                visit(dependency, path + [name])
+            state[name] = 2
+            order.append(expressions[name])
+
+        for name in expressions:
+            visit(name, [])
+        return order
+
+    @property
+    def tags(self) -> List[Derived]:
+        """
+        Returns the derived tags in the order of evaluation.
+
+        :return: A list of derived tags.
+        :rtype: List[Derived]
+        """
+        return [expression.tag for expression in self._order]
+
+    def evaluate(self, values: Dict[str, Any], adjust: Callable[[Any, List], Any]) -> List[Any]:
+        """
+        Evaluates the derived tags whose inputs changed since the previous scan.
+
+        :param values: Decoded values of the scanned registers keyed by name, registers
+                       of skipped blocks are left out.
+        :type values: Dict[str, Any]
+        :param adjust: Applies the adjustments of a derived tag to its computed value.
+        :type adjust: Callable[[Any, List], Any]
+        :return: Values of the derived tags in the order of :attr:`tags`.
+        :rtype: List[Any]
+        """
+        changed: Set[str] = set()
+        for name, value in values.items():
+            value = _number(value)
+            if name not in self._inputs or self._inputs[name] != value:
+                self._inputs[name] = value
+                changed.add(name)
+        result: List[Any] = []
+        for expression in self._order:
+            name: str = expression.tag.name
+            if name not in self._values or expression.inputs & changed:
+                value: Optional[Any] = None
+                arguments: Dict[str, Any] = {input_name: self._inputs.get(input_name)
+                                             for input_name in expression.inputs}
+                if None not in arguments.values():
+                    try:
+                        value = adjust(eval(expression.code, self._globals, arguments),  # pylint: disable=eval-used
+                                       expression.tag.adjustments or [])
+                    except (ArithmeticError, ValueError, TypeError):
+                        value = None
+                if name not in self._values or self._values[name] != value:
+                    changed.add(name)
+                self._values[name] = value
+                self._inputs[name] = _number(value)
+            result.append(self._values[name])
+        return result
@@ -0,0 +1,255 @@
+"""
+This module provides with discovery of the register map of a Modbus device.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from pymodbus.exceptions import ModbusException
+from pymodbus.pdu import ModbusResponse
+
+from app.utils.coders import format_length
+from app.utils.enums import FN
+from app.utils.gateway import Gateway
+from app.utils.pydantic.models import Registers
+
+
+# Maximal quantity of a single read request per function code
+MAX_READ: Dict[int, int] = {FN.DO.value: 2000, FN.DI.value: 2000,
+                            FN.AO.value: 125, FN.AI.value: 125}
+# Size of the address space of every function code
+ADDRESS_SPACE: int = 65536
+# Modbus exception code of a function the device does not support
+ILLEGAL_FUNCTION: int = 1
+
+
+class Span(NamedTuple):
+    """
+    A range of addresses sharing the probe outcome.
+
+    :ivar start: First address of the range.
+    :ivar end: Address following the last one of the range.
+    :ivar code: None if the range is readable, the Modbus exception code if the device
+                refused it, or 0 if the device did not respond.
+    """
+    start: int
+    end: int
+    code: Optional[int]
+
+
+class RateLimiter:
+    """
+    Spaces requests of all threads evenly at no more than ``rate`` per second.
+
+    :param rate: Maximal number of requests per second, 0 disables the limit.
+    :type rate: float
+    """
+    def __init__(self, rate: float) -> None:
+        self._period: float = 1 / rate if rate > 0 else 0
+        self._next: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if not self._period:
+            return
+        with self._lock:
+            now: float = time.monotonic()
+            slot: float = max(now, self._next)
+            self._next = slot + self._period
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class Discovery:
+    """
+    Maps the readable addresses of a device by bulk probing.
+
+    Every function code is probed with maximal blocks; a refused block is split in
+    halves down to ``resolution`` addresses, so a contiguous map costs one request per
+    block and every boundary ``log2(block)`` requests more. Refused regions cost about
+    two requests per ``resolution`` addresses: a coarser resolution maps sparse devices
+    much faster but may miss readable addresses isolated within refused ones. Probes run
+    on ``concurrency`` connections at no more than ``rate`` requests per second.
+
+    :param ip: IP address of the device.
+    :type ip: str
+    :param port: TCP port of the device.
+    :type port: int
+    :param unit: Unit id of the device.
+    :type unit: int
+    :param concurrency: Number of concurrent probes.
+    :type concurrency: int
+    :param rate: Maximal number of probes per second, 0 disables the limit.
+    :type rate: float
+    :param timeout: Response timeout of a probe in seconds.
+    :type timeout: float
+    :param resolution: Size of the smallest refused block that is not split further.
+    :type resolution: int
+    """
+    def __init__(self, ip: str, port: int = 502, unit: int = 1, concurrency: int = 4,
+                 rate: float = 100, timeout: float = 1, resolution: int = 1) -> None:
+        self._ip: str = ip
+        self._port: int = port
+        self._unit: int = unit
+        self._concurrency: int = max(1, concurrency)
+        self._timeout: float = timeout
+        self._resolution: int = max(1, resolution)
+        self._limiter: RateLimiter = RateLimiter(rate)
+        self._gateway: Optional[Gateway] = None
+        self.probes: int = 0
+
+    def __enter__(self) -> 'Discovery':
+        self._gateway = Gateway.get(ip=self._ip, port=self._port,
+                                    concurrency=self._concurrency,
+                                    timeout=self._timeout, retries=0)
+        self._gateway.connect()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._gateway.release()
+        self._gateway = None
+
+    def probe(self, fn: int, address: int, count: int) -> Optional[int]:
+        """
+        Reads a block once.
+
+        :param fn: Function code, 1 to 4.
+        :type fn: int
+        :param address: First address of the block.
+        :type address: int
+        :param count: Number of addresses of the block.
+        :type count: int
+        :return: None if the block is readable, the Modbus exception code if the device
+                 refused it, or 0 if the device did not respond.
+        :rtype: Optional[int]
+        """
+        self._limiter.acquire()
+        self.probes += 1
+        params: Dict = {'address': address, 'count': count, 'slave': self._unit}
+        try:
+            with self._gateway.client() as client:
+                read = {FN.DO.value: client.read_coils,
+                        FN.DI.value: client.read_discrete_inputs,
+                        FN.AO.value: client.read_holding_registers,
+                        FN.AI.value: client.read_input_registers}[fn]
+                response: ModbusResponse = read(**params)
+        except ModbusException:
+            return 0
+        if response is None:
+            return 0
+        if response.isError():
+            return getattr(response, 'exception_code', 0) or 0
+        return None
+
+    def scan(self, fn: int, start: int = 0, end: int = ADDRESS_SPACE) -> List[Span]:
+        """
+        Maps an address range of a single function code.
+
+        :param fn: Function code, 1 to 4.
+        :type fn: int
+        :param start: First address of the range.
+        :type start: int
+        :param end: Address following the last one of the range.
+        :type end: int
+        :return: Consecutive spans covering the range, merged by outcome.
+        :rtype: List[Span]
+        """
+        size: int = MAX_READ[fn]
+        spans: List[Span] = []
+        with ThreadPoolExecutor(max_workers=self._concurrency,
+                                thread_name_prefix='mbir-discovery') as executor:
+            pending: Dict[Future, Tuple[int, int]] = {}
+
+            def submit(first: int, last: int) -> None:
+                pending[executor.submit(self.probe, fn, first, last - first)] = (first, last)
+
+            for first in range(start, end, size):
+                submit(first, min(first + size, end))
+            while pending:
+                done: Set[Future] = wait(pending, return_when=FIRST_COMPLETED).done
+                for future in done:
+                    first, last = pending.pop(future)
+                    code: Optional[int] = future.result()
+                    if code == ILLEGAL_FUNCTION:
+                        # The whole function is unsupported, splitting would not help
+                        for waiting in pending:
+                            waiting.cancel()
+                        return [Span(start, end, code)]
+                    if code is None or last - first <= self._resolution:
+                        spans.append(Span(first, last, code))
+                        continue
+                    middle: int = (first + last) // 2
+                    submit(first, middle)
+                    submit(middle, last)
+        return self.__merge(spans)
+
+    @staticmethod
+    def __merge(spans: List[Span]) -> List[Span]:
+        merged: List[Span] = []
+        for span in sorted(spans):
+            if merged and merged[-1].end == span.start and merged[-1].code == span.code:
+                merged[-1] = merged[-1]._replace(end=span.end)
+            else:
+                merged.append(span)
+        return merged
+
+    def discover(self, functions: Iterable[int] = (1, 2, 3, 4), start: int = 0,
+                 end: int = ADDRESS_SPACE) -> Dict[int, List[Span]]:
+        """
+        Maps an address range of several function codes.
+
+        :param functions: Function codes to probe.
+        :type functions: Iterable[int]
+        :param start: First address of the range.
+        :type start: int
+        :param end: Address following the last one of the range.
+        :type end: int
+        :return: Spans keyed by function code.
+        :rtype: Dict[int, List[Span]]
+        """
+        return {fn: self.scan(fn, start=start, end=end) for fn in functions}
+
+
+def draft(spans: Dict[int, List[Span]], data_format: str = 'Signed',
+          data_type: str = 'SMALLINT') -> Dict:
+    """
+    Builds the draft ``registers`` section of a configuration from discovered spans,
+    one register per readable address (per word of a multi-register format; trailing
+    addresses of a span too short for a whole value are left out).
+
+    :param spans: Spans keyed by function code, as returned by :meth:`Discovery.discover`.
+    :type spans: Dict[int, List[Span]]
+    :param data_format: Modbus format assigned to holding and input registers.
+    :type data_format: str
+    :param data_type: Database type assigned to holding and input registers.
+    :type data_type: str
+    :raises ValueError: If the format is unknown.
+    :return: A dictionary loadable as :class:`Registers`.
+    :rtype: Dict
+    """
+    length: int = format_length(data_format)
+    result: Dict = {}
+    for fn in FN:
+        bits: bool = fn in (FN.DO, FN.DI)
+        step: int = 1 if bits else length
+        registers: Dict = {}
+        for span in spans.get(fn.value, []):
+            if span.code is not None:
+                continue
+            for address in range(span.start, span.end - step + 1, step):
+                registers[str(address)] = {'name': f'{fn.name}_{address}',
+                                           'active': True,
+                                           'format': 'Signed' if bits else data_format,
+                                           'type': 'SMALLINT' if bits else data_type,
+                                           'adjustments': None}
+        result[Registers.model_fields[fn.name].alias] = registers
+    return result
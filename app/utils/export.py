@@ -0,0 +1,296 @@
+"""
+This module provides with functions streaming the collected data out of the database
+and replaying the exported files back through a storage writer.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import csv
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.utils import columnar
+from app.utils.pydantic.models import Register
+from app.utils.storage.base import Writer, column_name
+
+
+def select_query(table: str, columns: List[str],
+                 start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Tuple[str, List]:
+    """
+    Builds the query selecting the given columns of the time range ordered by time.
+
+    :param table: The table name.
+    :type table: str
+    :param columns: Column names to select besides ``datetime``.
+    :type columns: List[str]
+    :param start: Inclusive start of the time range.
+    :type start: Optional[datetime]
+    :param end: Exclusive end of the time range.
+    :type end: Optional[datetime]
+    :return: The query and its parameters.
+    :rtype: Tuple[str, List]
+    """
+    conditions: List[str] = []
+    params: List = []
+    if start is not None:
+        conditions.append('datetime >= %s')
+        params.append(start)
+    if end is not None:
+        conditions.append('datetime < %s')
+        params.append(end)
+    where: str = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+    return f'SELECT {", ".join(["datetime"] + columns)} FROM {table}{where} ORDER BY datetime', params
+
+
+def export_columns(tags: List[Register], names: Optional[List[str]] = None) -> List[str]:
+    """
+    Returns the column names of the registers selected by name.
+
+    :param tags: Registers of the configuration.
+    :type tags: List[Register]
+    :param names: Register names to export, all registers if omitted.
+    :type names: Optional[List[str]]
+    :raises ValueError: If some of the names are not found in the configuration.
+    :return: Column names in the order of ``tags``.
+    :rtype: List[str]
+    """
+    selected: Set[str] = set(names or [])
+    if selected:
+        unknown: List[str] = sorted(selected - {tag.name for tag in tags})
+        if unknown:
+            raise ValueError('Error@export_columns.',
+                             f'Unknown tags {", ".join(unknown)}')
+    return [column_name(tag) for tag in tags if not selected or tag.name in selected]
+
+
+def export_csv(connection, table: str, columns: List[str], path: str,
+               start: Optional[datetime] = None, end: Optional[datetime] = None) -> None:
+    """
+    Streams the selected rows into a CSV file with ``COPY ... TO STDOUT``,
+    the server sends the data in chunks and nothing is buffered on the client.
+
+    :param connection: An open psycopg2 connection.
+    :param table: The table name.
+    :type table: str
+    :param columns: Column names to export besides ``datetime``.
+    :type columns: List[str]
+    :param path: Path to the output file.
+    :type path: str
+    :param start: Inclusive start of the time range.
+    :type start: Optional[datetime]
+    :param end: Exclusive end of the time range.
+    :type end: Optional[datetime]
+    :return: nothing
+    :rtype: None
+    """
+    query, params = select_query(table, columns, start, end)
+    with connection.cursor() as cursor:
+        query = cursor.mogrify(query, params).decode()
+        with open(path, 'w', encoding='utf8', newline='') as stream:
+            cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH CSV HEADER', stream)
+
+
+def iter_chunks(connection, table: str, columns: List[str],
+                start: Optional[datetime] = None, end: Optional[datetime] = None,
+                chunk: int = 10000) -> Iterator[List[Tuple]]:
+    """
+    Yields the selected rows in chunks fetched through a server-side named cursor.
+
+    :param connection: An open psycopg2 connection.
+    :param table: The table name.
+    :type table: str
+    :param columns: Column names to select besides ``datetime``.
+    :type columns: List[str]
+    :param start: Inclusive start of the time range.
+    :type start: Optional[datetime]
+    :param end: Exclusive end of the time range.
+    :type end: Optional[datetime]
+    :param chunk: Number of rows fetched at once.
+    :type chunk: int
+    :return: An iterator over lists of rows.
+    :rtype: Iterator[List[Tuple]]
+    """
+    query, params = select_query(table, columns, start, end)
+    with connection.cursor(name=f'mbir_export_{table}') as cursor:
+        cursor.itersize = chunk
+        cursor.execute(query, params)
+        while True:
+            rows: List[Tuple] = cursor.fetchmany(chunk)
+            if not rows:
+                break
+            yield rows
+
+
+def export_parquet(connection, table: str, tags: List[Register], names: Optional[List[str]],
+                   path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   chunk: int = 10000) -> int:
+    """
+    Streams the selected rows into a Parquet file, one row group per chunk.
+
+    :param connection: An open psycopg2 connection.
+    :param table: The table name.
+    :type table: str
+    :param tags: Registers of the configuration.
+    :type tags: List[Register]
+    :param names: Register names to export, all registers if omitted.
+    :type names: Optional[List[str]]
+    :param path: Path to the output file.
+    :type path: str
+    :param start: Inclusive start of the time range.
+    :type start: Optional[datetime]
+    :param end: Exclusive end of the time range.
+    :type end: Optional[datetime]
+    :param chunk: Number of rows per row group.
+    :type chunk: int
+    :return: The number of exported rows.
+    :rtype: int
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    from app.utils.storage.parquet import arrow_type
+
+    wanted: Set[str] = set(names or [])
+    selected: List[Register] = [tag for tag in tags if not wanted or tag.name in wanted]
+    columns: List[str] = export_columns(tags, names)
+    schema = pa.schema([pa.field('datetime', pa.timestamp('us', tz='UTC'))] +
+                       [pa.field(column, arrow_type(tag.format))
+                        for column, tag in zip(columns, selected)])
+    total: int = 0
+    with pq.ParquetWriter(path, schema, compression='zstd') as output:
+        for rows in iter_chunks(connection, table, columns, start, end, chunk):
+            output.write_table(pa.Table.from_arrays([list(column) for column in zip(*rows)],
+                                                    schema=schema))
+            total += len(rows)
+    return total
+
+
+def export_blocks(connection, table: str, tags: List[Register], names: Optional[List[str]],
+                  path: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                  chunk: int = 10000) -> int:
+    """
+    Streams the selected rows into a file of compressed columnar blocks,
+    one block per chunk.
+
+    :param connection: An open psycopg2 connection.
+    :param table: The table name.
+    :type table: str
+    :param tags: Registers of the configuration.
+    :type tags: List[Register]
+    :param names: Register names to export, all registers if omitted.
+    :type names: Optional[List[str]]
+    :param path: Path to the output file.
+    :type path: str
+    :param start: Inclusive start of the time range.
+    :type start: Optional[datetime]
+    :param end: Exclusive end of the time range.
+    :type end: Optional[datetime]
+    :param chunk: Number of rows per block.
+    :type chunk: int
+    :return: The number of exported rows.
+    :rtype: int
+    """
+    from app.utils.storage.blocks import column_kinds
+
+    wanted: Set[str] = set(names or [])
+    selected: List[Register] = [tag for tag in tags if not wanted or tag.name in wanted]
+    columns: List[str] = export_columns(tags, names)
+    kinds: List[str] = column_kinds(selected)
+    total: int = 0
+    with open(path, 'wb') as stream:
+        columnar.write_header(stream, {'table': table, 'columns': columns,
+                                       'formats': [tag.format for tag in selected],
+                                       'kinds': kinds})
+        for rows in iter_chunks(connection, table, columns, start, end, chunk):
+            data: List[List] = [list(column) for column in zip(*rows)]
+            timestamps: List[int] = [int(moment.timestamp() * 1e6) for moment in data[0]]
+            columnar.write_block(stream, columnar.encode_block(timestamps, data[1:], kinds))
+            total += len(rows)
+    return total
+
+
+def read_csv(path: str, chunk: int = 10000) -> Iterator[List[Dict]]:
+    """
+    Yields the rows of an exported CSV file in chunks.
+
+    :param path: Path to the exported file.
+    :type path: str
+    :param chunk: Number of rows per chunk.
+    :type chunk: int
+    :return: An iterator over lists of rows keyed by column name.
+    :rtype: Iterator[List[Dict]]
+    """
+    with open(path, 'r', encoding='utf8', newline='') as stream:
+        rows: List[Dict] = []
+        for row in csv.DictReader(stream):
+            row['datetime'] = datetime.fromisoformat(row['datetime'])
+            rows.append({key: (value if value != '' else None) for key, value in row.items()})
+            if len(rows) >= chunk:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+
+
+def read_parquet(path: str, chunk: int = 10000) -> Iterator[List[Dict]]:
+    """
+    Yields the rows of an exported Parquet file in chunks.
+
+    :param path: Path to the exported file.
+    :type path: str
+    :param chunk: Number of rows per chunk.
+    :type chunk: int
+    :return: An iterator over lists of rows keyed by column name.
+    :rtype: Iterator[List[Dict]]
+    """
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk):
+        yield batch.to_pylist()
+
+
+def read_blocks(path: str, chunk: int = 10000) -> Iterator[List[Dict]]:
+    """
+    Yields the rows of an exported or spooled block file, one chunk per block.
+
+    :param path: Path to the block file.
+    :type path: str
+    :param chunk: Unused, the chunks are the blocks of the file.
+    :type chunk: int
+    :return: An iterator over lists of rows keyed by column name.
+    :rtype: Iterator[List[Dict]]
+    """
+    with open(path, 'rb') as stream:
+        header, blocks = columnar.read_blocks(stream)
+        names: List[str] = ['datetime'] + header['columns']
+        for timestamps, columns in blocks:
+            moments: List[datetime] = [datetime.fromtimestamp(timestamp / 1e6, tz=timezone.utc)
+                                       for timestamp in timestamps]
+            yield [dict(zip(names, row)) for row in zip(moments, *columns)]
+
+
+def replay(chunks: Iterator[List[Dict]], writer: Writer) -> int:
+    """
+    Feeds exported rows back through a storage writer, keeping their original time.
+
+    Columns missing in the exported rows are stored as NULL.
+
+    :param chunks: An iterator over lists of rows keyed by column name.
+    :type chunks: Iterator[List[Dict]]
+    :param writer: A prepared storage writer.
+    :type writer: Writer
+    :return: The number of replayed rows.
+    :rtype: int
+    """
+    total: int = 0
+    for rows in chunks:
+        timestamps: List[float] = [row['datetime'].timestamp() for row in rows]
+        scans: List[List] = [[row.get(column) for column in writer.columns] for row in rows]
+        writer.write_many(scans, timestamps)
+        total += len(rows)
+    return total
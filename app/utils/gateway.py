@@ -0,0 +1,254 @@
+"""
+This module provides with connections shared by all pollers of one Modbus endpoint.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from pymodbus import client as modbus
+
+from app.utils.utils import epochTime
+
+
+class _Read:
+    """
+    A block read of a gateway, in flight until its ``event`` is set.
+    """
+    __slots__ = ('start', 'end', 'values', 'timestamp', 'event')
+
+    def __init__(self, start: int, end: int) -> None:
+        self.start: int = start
+        self.end: int = end
+        self.values: Optional[List] = None
+        self.timestamp: float = 0.0
+        self.event = threading.Event()
+
+
+class Gateway:
+    """
+    A pool of Modbus TCP connections to one endpoint (a device or an RTU gateway).
+
+    All pollers talking to the same ``ip:port`` share one gateway, so the endpoint
+    never sees more than ``concurrency`` sockets and outstanding requests. Waiting
+    pollers take the connections in FIFO order.
+
+    Reads made through :meth:`read` are cached per unit and function code: a block
+    covered by a read not older than the caller's ``max_age`` is sliced from it, and a
+    block covered by a read in flight waits for that read instead of sending its own.
+
+    :param ip: IP address of the endpoint.
+    :type ip: str
+    :param port: TCP port of the endpoint.
+    :type port: int
+    :param concurrency: Number of connections, i.e. concurrent requests allowed.
+    :type concurrency: int
+    :param timeout: Response timeout of a request in seconds.
+    :type timeout: float
+    :param retries: Number of retries of a request without response.
+    :type retries: int
+    """
+    _gateways: Dict[Tuple[str, int], 'Gateway'] = {}
+    _lock = threading.Lock()
+    # Maximal number of cached reads per unit and function code
+    CACHED_READS: int = 32
+
+    def __init__(self, ip: str, port: int, concurrency: int,
+                 timeout: float = 3, retries: int = 3) -> None:
+        self.ip: str = ip
+        self.port: int = port
+        self._clients: List[modbus.ModbusTcpClient] = [modbus.ModbusTcpClient(ip, port=port,
+                                                                              timeout=timeout,
+                                                                              retries=retries)
+                                                       for _ in range(max(1, concurrency))]
+        self._free: queue.Queue = queue.Queue()
+        for client in self._clients:
+            self._free.put(client)
+        self._users: int = 0
+        self._reads: Dict[Tuple[int, int], List[_Read]] = {}
+        self._reads_lock = threading.Lock()
+        self._horizon: float = 0.0
+        self._counters: Dict[str, int] = {'hits': 0, 'joins': 0, 'misses': 0}
+
+    @classmethod
+    def get(cls, ip: str, port: int = 502, concurrency: int = 1,
+            timeout: float = 3, retries: int = 3) -> 'Gateway':
+        """
+        Returns the gateway of the endpoint, creating it for the first user.
+
+        :param ip: IP address of the endpoint.
+        :type ip: str
+        :param port: TCP port of the endpoint.
+        :type port: int
+        :param concurrency: Number of connections, used only when the gateway is created.
+        :type concurrency: int
+        :param timeout: Response timeout in seconds, used only when the gateway is created.
+        :type timeout: float
+        :param retries: Number of retries, used only when the gateway is created.
+        :type retries: int
+        :return: The shared gateway.
+        :rtype: Gateway
+        """
+        with cls._lock:
+            gateway: 'Gateway' = cls._gateways.get((ip, port))
+            if gateway is None:
+                gateway = cls(ip=ip, port=port, concurrency=concurrency,
+                              timeout=timeout, retries=retries)
+                cls._gateways[(ip, port)] = gateway
+            gateway._users += 1
+            return gateway
+
+    def release(self) -> None:
+        """
+        Releases the gateway; the connections are closed when the last user leaves.
+
+        :return: nothing
+        :rtype: None
+        """
+        with self._lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            self._gateways.pop((self.ip, self.port), None)
+        for client in self._clients:
+            client.close()
+
+    def connect(self) -> None:
+        """
+        Opens the connections that are not open yet.
+
+        :return: nothing
+        :rtype: None
+        """
+        for client in self._clients:
+            if not client.is_socket_open():
+                client.connect()
+
+    @property
+    def is_connected(self) -> bool:
+        """
+        Returns a boolean indicating whether any connection to the endpoint is open.
+
+        :return: True if a connection is open, False otherwise.
+        :rtype: bool
+        """
+        return any(client.is_socket_open() for client in self._clients)
+
+    @property
+    def concurrency(self) -> int:
+        return len(self._clients)
+
+    @contextmanager
+    def client(self, timeout: Optional[float] = None,
+               wait: bool = True) -> Iterator[Optional[modbus.ModbusTcpClient]]:
+        """
+        Borrows a connection for a single request.
+
+        :param timeout: Response timeout in seconds while the connection is borrowed,
+                        the timeout of the gateway is used if omitted.
+        :type timeout: Optional[float]
+        :param wait: Waits for a free connection if set, otherwise yields None when
+                     all connections are busy.
+        :type wait: bool
+        :return: A context manager yielding the connection or None.
+        :rtype: Iterator[Optional[modbus.ModbusTcpClient]]
+        """
+        try:
+            client: modbus.ModbusTcpClient = self._free.get(block=wait)
+        except queue.Empty:
+            yield None
+            return
+        default: float = client.comm_params.timeout_connect
+        if timeout is not None:
+            client.comm_params.timeout_connect = timeout
+        try:
+            yield client
+        finally:
+            client.comm_params.timeout_connect = default
+            self._free.put(client)
+
+    def read(self, key: Tuple[int, int], address: int, count: int, max_age: float,
+             reader: Callable[[], Optional[List]]) -> Tuple[Optional[List], float]:
+        """
+        Reads a block through the cache.
+
+        :param key: Unit id and function code of the block.
+        :type key: Tuple[int, int]
+        :param address: First address of the block.
+        :type address: int
+        :param count: Number of addresses of the block.
+        :type count: int
+        :param max_age: Maximal age in seconds of a cached read serving the block.
+        :type max_age: float
+        :param reader: Reads the block from the device, returns None on failure.
+        :type reader: Callable[[], Optional[List]]
+        :return: The values, or None if the read failed, and their receipt time
+                 as epoch seconds.
+        :rtype: Tuple[Optional[List], float]
+        """
+        end: int = address + count
+        with self._reads_lock:
+            self._horizon = max(self._horizon, max_age)
+            now: float = epochTime()
+            reads: List[_Read] = self._reads.setdefault(key, [])
+            for cached in reads:
+                if cached.start <= address and end <= cached.end \
+                        and (not cached.event.is_set() or now - cached.timestamp <= max_age):
+                    self._counters['joins' if not cached.event.is_set() else 'hits'] += 1
+                    break
+            else:
+                cached = None
+                self._counters['misses'] += 1
+                own: _Read = _Read(address, end)
+                kept: List[_Read] = [read for read in reads if not read.event.is_set()
+                                     or now - read.timestamp <= self._horizon]
+                reads[:] = [own] + kept[:self.CACHED_READS - 1]
+        if cached is not None:
+            cached.event.wait()
+            if cached.values is None:
+                return None, cached.timestamp
+            return cached.values[address - cached.start:end - cached.start], cached.timestamp
+        try:
+            own.values = reader()
+        finally:
+            own.timestamp = epochTime()
+            own.event.set()
+            if own.values is None:
+                with self._reads_lock:
+                    if own in self._reads.get(key, ()):
+                        self._reads[key].remove(own)
+        return own.values, own.timestamp
+
+    def invalidate(self, key: Tuple[int, int]) -> None:
+        """
+        Drops the cached reads, e.g. after a write; reads in flight are completed
+        for their callers but are not joined by new ones.
+
+        :param key: Unit id and function code of the reads.
+        :type key: Tuple[int, int]
+        :return: nothing
+        :rtype: None
+        """
+        with self._reads_lock:
+            self._reads.pop(key, None)
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of the read cache.
+
+        :return: Numbers of reads served from the cache, joined to a read in flight
+                 and sent to the device.
+        :rtype: Dict
+        """
+        return dict(self._counters)
+
+    def __repr__(self) -> str:
+        return f'Gateway({self.ip}:{self.port}, {self.concurrency} connection(s))'
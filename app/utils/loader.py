@@ -0,0 +1,99 @@
+"""
+This module provides with loading of configurations split across several YAML files.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import os
+from typing import Any, Dict, List, Set
+
+import yaml
+
+from app.utils.pydantic.models import Config
+
+
+# The LibYAML parser is several times faster on large register maps
+_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def _read(path: str) -> Any:
+    with open(path, "r", encoding='utf8') as stream:
+        return yaml.load(stream, Loader=_LOADER)  # nosec B506 - a safe loader
+
+
+def _includes(value: Any) -> List[str]:
+    if value is None:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def _merge(target: Dict, data: Dict, path: str) -> None:
+    for key, value in data.items():
+        if key == 'registers':
+            groups: Dict = target.setdefault('registers', {})
+            for group, registers in (value or {}).items():
+                merged: Dict = groups.setdefault(group, {})
+                for address, register in (registers or {}).items():
+                    if str(address) in merged:
+                        raise ValueError('Error@load_config.',
+                                         f'Register {address} of {group} is declared twice '
+                                         f'({path}).')
+                    merged[str(address)] = register
+        elif key == 'derived':
+            target.setdefault('derived', []).extend(value or [])
+        else:
+            target[key] = value
+
+
+def _load(path: str, loading: Set[str]) -> Dict:
+    path = os.path.abspath(path)
+    if path in loading:
+        raise ValueError('Error@load_config.', f'{path} includes itself.')
+    data: Any = _read(path)
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError('Error@load_config.', f'{path} does not hold a mapping.')
+    directory: str = os.path.dirname(path)
+    loading = loading | {path}
+    result: Dict = {}
+    for include in _includes(data.pop('include', None)):
+        _merge(result, _load(os.path.join(directory, include), loading), include)
+    # A register group may be the path to a file holding the registers of the group
+    registers: Dict = {group: _read(os.path.join(directory, value)) if isinstance(value, str)
+                       else value
+                       for group, value in (data.get('registers') or {}).items()}
+    if registers:
+        data['registers'] = registers
+    _merge(result, data, path)
+    return result
+
+
+def load_config(path: str) -> Config:
+    """
+    Loads and validates a configuration, resolving its includes.
+
+    The ``include`` key lists YAML files (paths relative to the including file, which
+    may include others in turn) merged before the file itself: register groups and
+    derived tags are concatenated, any other setting of the including file overrides
+    the included ones. A register group may also be given as the path to a YAML file
+    holding its registers, so very large maps are split per function code or per
+    device section.
+
+    :param path: Path to the configuration file.
+    :type path: str
+    :raises ValueError: If the files hold no configuration, include each other in a
+                        cycle, declare a register twice or fail validation.
+    :return: The collector configuration.
+    :rtype: Config
+    """
+    data: Dict = _load(path, set())
+    if not data:
+        raise ValueError('Error@load_config.',
+                         f'Configuration data should be provided in {path}')
+    return Config(**data)
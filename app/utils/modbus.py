@@ -11,23 +11,31 @@ __version__ = "1.0"
 __license__ = "MIT License"
 
 import traceback
-from datetime import datetime
-from typing import Optional, Dict, List, Any, Union
-
-# import memory_profiler
-# from guppy import hpy
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Any, Tuple, Union
 
 import pymodbus
 from pymodbus import client as modbus
 from pymodbus.pdu import ModbusResponse
 from pymodbus.exceptions import ModbusException
 
-from app.utils.utils import isNumerical
-from app.utils.coders import Encoder, Decoder
-from app.utils.pydantic.models import Config
+from app.utils.utils import isNumerical, epochTime, resyncEpochTime
+from app.utils.coders import LENGTHS, Block, Encoder, Decoder, format_length
+from app.utils.derived import DerivedTags
+from app.utils.gateway import Gateway
+from app.utils.policy import RequestPolicy
+from app.utils.profiling import profiler
+from app.utils.pydantic.models import (MAX_READ_BITS, MAX_READ_REGISTERS, Config, Register,
+                                       parse_address)
 from app.utils.enums import FN
 
 
+# Maximal number of coils of a single Write Multiple Coils (FC15) request
+MAX_WRITE_COILS: int = 1968
+# Maximal number of registers of a single Write Multiple Registers (FC16) request
+MAX_WRITE_REGISTERS: int = 123
+
+
 class Poller:
     """
     A class for polling data from a Modbus device.
@@ -35,15 +43,16 @@ class Poller:
     :param config: A dictionary of config for the Modbus connection.
     :type config: Dict
 
-    :ivar reg_len: A dictionary of register lengths for various data types.
+    :ivar reg_len: A dictionary of register lengths of the scalar (writable) data types.
     :type reg_len: Dict
     :ivar _modbus: A modbus instance for the Modbus connection.
     :type _modbus: modbus
     :ivar _config: A dictionary of config for the Modbus connection.
     :type _config: Dict
-    :ivar _connection: The Modbus connection object.
-    :type _connection: Optional[Union[self._modbus.ModbusTcpClient, 
-                                      self._modbus.ModbusSerialClient]]
+    :ivar _connection: The gateway shared by all pollers of the same endpoint.
+    :type _connection: Optional[Gateway]
+    :ivar _policy: Timeout, retry and hedging policy of the block requests.
+    :type _policy: Optional[RequestPolicy]
     :ivar _requests: A dictionary of requests sent to the Modbus device.
     :type _requests: Dict 
     :ivar _decoder: A Decoder instance.
@@ -54,19 +63,17 @@ class Poller:
     _modbus = None
 
     def __init__(self, config: Config) -> None:
-        self.reg_len: Dict = {'Signed': 1, 'Unsigned': 1,
-                              'Hex - ASCII': 1, 'Binary': 1,
-                              'Long AB CD': 2, 'Long CD AB': 2,
-                              'Long BA DC': 2, 'Long DC BA': 2,
-                              'Float AB CD': 2, 'Float CD AB': 2,
-                              'Float BA DC': 2, 'Float DC BA': 2,
-                              'Double AB CD EF GH': 4, 'Double GH EF CD AB': 4,
-                              'Double BA DC FE HG': 4, 'Double HG FE DC BA': 4, }
+        self.reg_len: Dict = dict(LENGTHS)
         self._modbus: modbus = modbus
         self._config: Config = config
-        self._connection: Optional[Union[Poller._modbus.ModbusTcpClient,
-                                         Poller._modbus.ModbusSerialClient]] = None
+        self._connection: Optional[Gateway] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._policy: Optional[RequestPolicy] = None
         self._requests: Dict = {}
+        self._plan: Optional[Dict] = None
+        self._derived: Optional[Dict[int, DerivedTags]] = None
+        self._unit_tags: Dict[Tuple[int, str], Register] = {}
+        self._names: Optional[Dict[str, Tuple[int, Register]]] = None
         self._decoder: Decoder = Decoder()
         self._encoder: Encoder = Encoder()
 
@@ -101,38 +108,103 @@ class Poller:
         :return: A list of register values, or None if an error occurred.
         :rtype: Optional[List]
 
+        """
+        return self.scan()
+
+    @property
+    def units(self) -> List[int]:
+        """
+        Get the unit ids polled through the connection.
+
+        :return: A list of unit ids, a single one unless the device is a gateway.
+        :rtype: List[int]
+        """
+        address: Union[int, List[int]] = self._config.address
+        return list(address) if isinstance(address, list) else [address]
+
+    def scan(self, priority: Optional[int] = None) -> Optional[List]:
+        """
+        Get the current values of the requested Modbus registers, skipping the register
+        blocks less important than the given priority.
+
+        Registers of a skipped block are returned with None value and ``skipped`` flag,
+        registers of a block that failed after its retries with None value and ``failed``
+        flag, so the result always follows the order of :attr:`tags`. Read registers carry the
+        ``timestamp`` (epoch seconds) of the receipt of their block, derived tags follow
+        the registers of every unit and carry the latest timestamp of its blocks. When
+        several units are polled, their blocks are requested interleaved, so a slow unit
+        delays the others by a single block, and up to ``concurrency`` blocks are in
+        flight at once.
+
+        :param priority: The largest priority number of the blocks to read
+                         (0 is the most important), all blocks are read if omitted.
+        :type priority: Optional[int]
+        :return: A list of register values, or None if an error occurred or no block
+                 responded.
+        :rtype: Optional[List]
         """
         result: Optional[List] = []
+        # Follow the system clock, stepped by NTP or drifting from the performance counter
+        resyncEpochTime()
+        if self._policy:
+            self._policy.start(self.scan_rate)
         try:
-            # Iterate over each Modbus request in the poller's requests dictionary
-            for fn, requests in self.__requests.items():
-                for request in requests.values():
-                    # Build a parameters dictionary for the Modbus request
-                    params: Dict = {'func': fn,
-                                    'reg_address': int(request['address']),
-                                    'reg_qty': int(request['quantity'])}
-
-                    # Call the Modbus poll method with the parameters and get the response
-                    response = self._poll(**params)
-
-                    # Process each mapped register in the request
-                    # and append its value to the result list
-                    for pos, register in request['map'].items():
-                        content = register['content']
-                        length = int(self.reg_len[content.format])
-                        raw_value: List = response[pos:pos+length] if response else []
-                        value = self.decode_value(raw_value=raw_value,
-                                                  data_format=content.format,
-                                                  adjustments=content.adjustments or [])
-                        result.append({'address': register['address'],
-                                       'name': content.name,
-                                       'format': content.format,
-                                       'value': value,
-                                       'timestamp': datetime.now().strftime('%d-%m-%Y %H:%M:%S')})
-            # Return the result list
-            del response
-            del content
-            return result
+            blocks: List[Tuple] = [(unit, fn, index, request)
+                                   for fn, requests in self.plan.items()
+                                   for index, request in requests.items()
+                                   if priority is None or request['priority'] <= priority
+                                   for unit in self.units]
+            responses: Dict = self._poll_blocks(blocks)
+            received: bool = False
+
+            # Iterate over each Modbus request of every unit in the order of tags
+            for unit in self.units:
+                values: Dict[str, Any] = {}
+                latest: Optional[float] = None
+                for fn, requests in self.plan.items():
+                    for index, request in requests.items():
+                        if (unit, fn, index) not in responses:
+                            result.extend({'address': register['address'],
+                                           'name': self._tag(unit, register['content']).name,
+                                           'format': register['content'].format,
+                                           'value': None,
+                                           'skipped': True}
+                                          for register in request['map'].values())
+                            continue
+                        response, timestamp = responses[(unit, fn, index)]
+                        if not response:
+                            # The block failed after the retries of the policy
+                            for register in request['map'].values():
+                                values[register['content'].name] = None
+                                result.append({'address': register['address'],
+                                               'name': self._tag(unit, register['content']).name,
+                                               'format': register['content'].format,
+                                               'value': None,
+                                               'failed': True,
+                                               'timestamp': timestamp})
+                            continue
+                        received = True
+                        latest = timestamp if latest is None else max(latest, timestamp)
+
+                        # Process each mapped register in the request straight from
+                        # the block buffer and append its value to the result list
+                        block: Block = Block(response)
+                        for register in request['map'].values():
+                            content = register['content']
+                            value = self.decode_value(raw_value=block,
+                                                      data_format=content.format,
+                                                      adjustments=content.adjustments or [],
+                                                      offset=register['offset'],
+                                                      bit=register['bit'])
+                            values[content.name] = value
+                            result.append({'address': register['address'],
+                                           'name': self._tag(unit, content).name,
+                                           'format': content.format,
+                                           'value': value,
+                                           'timestamp': timestamp})
+                result.extend(self.__evaluate(unit, values, latest))
+            # The scan is lost only if no polled block responded
+            return result if received or not responses else None
         except ModbusException as e:
             # Handle exceptions by printing error information and returning None
             print(f'Error: registers@modbus.py, result: {result}, type: {type(result)}')
@@ -142,113 +214,222 @@ class Poller:
         # If an error occurred, return None
         return None
 
+    def __evaluate(self, unit: int, values: Dict[str, Any],
+                   timestamp: Optional[float]) -> List[Dict]:
+        derived: DerivedTags = self.derived[unit]
+        if not derived.tags:
+            return []
+        with profiler.span('derive'):
+            result: List[Dict] = [{'address': None,
+                                   'name': self._tag(unit, tag).name,
+                                   'format': tag.format,
+                                   'value': value}
+                                  for tag, value in zip(derived.tags,
+                                                        derived.evaluate(values, self._adjust))]
+        if timestamp is not None:
+            for entry in result:
+                entry['timestamp'] = timestamp
+        return result
+
+    @property
+    def derived(self) -> Dict[int, DerivedTags]:
+        """
+        Get the evaluators of the derived tags, one per unit as every unit has its own values.
+
+        The expressions are compiled once from the configuration.
+
+        :return: A dictionary of evaluators keyed by unit id.
+        :rtype: Dict[int, DerivedTags]
+        """
+        if self._derived is None:
+            names: List[str] = [register['content'].name
+                                for requests in self.plan.values()
+                                for request in requests.values()
+                                for register in request['map'].values()]
+            self._derived = {unit: DerivedTags(self._config.derived, names)
+                             for unit in self.units}
+        return self._derived
+
+    def _poll_blocks(self, blocks: List[Tuple]) -> Dict:
+        params: List[Dict] = [{'func': fn,
+                               'reg_address': int(request['address']),
+                               'reg_qty': int(request['quantity']),
+                               'slave': unit}
+                              for unit, fn, index, request in blocks]
+        if self._executor is None or len(params) < 2:
+            responses: List = [self._timed_poll(param) for param in params]
+        else:
+            responses = list(self._executor.map(self._timed_poll, params))
+        return {(unit, fn, index): response
+                for (unit, fn, index, request), response in zip(blocks, responses)}
+
+    @property
+    def plan(self) -> Dict:
+        """
+        Get the compiled read plan: contiguous register blocks grouped by function code.
+
+        The plan is compiled once from the configuration and reused by every scan.
+
+        :return: A dictionary of requests keyed by Modbus function code.
+        :rtype: Dict
+        """
+        if self._plan is None:
+            with profiler.span('plan'):
+                self._plan = self.__compile()
+        return self._plan
+
+    def __compile(self) -> Dict:
+        plan: Dict = self.__requests
+        for requests in plan.values():
+            for request in requests.values():
+                # A block is as important as its most important register
+                request['priority'] = min(register['content'].priority
+                                          for register in request['map'].values())
+        return plan
+
+    @property
+    def tags(self) -> List[Register]:
+        """
+        Get the registers in the order their values are returned by :attr:`registers`.
+
+        The derived tags follow the registers of every unit. When several units are
+        polled, the register map is repeated for every unit and the names are prefixed
+        with ``U<unit>_``.
+
+        :return: A list of registers of the compiled read plan and derived tags.
+        :rtype: List[Register]
+        """
+        result: List[Register] = []
+        for unit in self.units:
+            result.extend(self._tag(unit, register['content'])
+                          for requests in self.plan.values()
+                          for request in requests.values()
+                          for register in request['map'].values())
+            result.extend(self._tag(unit, tag) for tag in self.derived[unit].tags)
+        return result
+
+    def tag(self, name: str) -> Optional[Register]:
+        """
+        Get a register or a derived tag by its name as listed in :attr:`tags`.
+
+        :param name: The name, prefixed with ``U<unit>_`` when several units are polled.
+        :type name: str
+        :return: The register or derived tag, or None if not found.
+        :rtype: Optional[Register]
+        """
+        located: Optional[Tuple[int, Register]] = self.__locate(name)
+        return None if located is None else self._tag(*located)
+
+    def __locate(self, name: str) -> Optional[Tuple[int, Register]]:
+        # The unit and the configured register or derived tag of a name of the tags
+        if self._names is None:
+            self._names = {}
+            for unit in self.units:
+                for requests in self.plan.values():
+                    for request in requests.values():
+                        for register in request['map'].values():
+                            self._names[self._tag(unit, register['content']).name] = \
+                                (unit, register['content'])
+                for tag in self.derived[unit].tags:
+                    self._names[self._tag(unit, tag).name] = (unit, tag)
+        return self._names.get(name)
+
+    def _tag(self, unit: int, register: Register) -> Register:
+        if len(self.units) == 1:
+            return register
+        tag: Optional[Register] = self._unit_tags.get((unit, register.id))
+        if tag is None:
+            tag = register.model_copy(update={'name': f'U{unit}_{register.name}'})
+            self._unit_tags[(unit, register.id)] = tag
+        return tag
+
     @property
     def __requests(self) -> Dict:
         result: Dict = {}
+        # The register maps are sorted by numeric address
         for fn, registers in dict(self._config.registers).items():
-            requests: Dict = {}
-            for address, register in registers.items():
-                index = len(requests) - 1
-                if index == -1:
-                    requests[0] = {
-                        'address': address,
-                        'quantity': self.reg_len[register.format],
-                        'map': {
-                            0: {
-                                'address': address,
-                                'length': self.reg_len[register.format],
-                                'content': register
-                            }
-                        }
-                    }
-                elif index > -1:
-                    # Мап - список параметров регистров для конкретной группы регистров,
-                    # создан для упрощения сопоставления полученного списка значений с регистрами,
-                    # к которым эти значения относятся.
-                    # Индекс последнего регистра в мапе
-                    prev_map_index = max(requests[index]['map'].keys())
-
-                    # данные последнего регистра в мапе
-                    prev_map_data = requests[index]['map'][prev_map_index]
-
-                    # Адрес последнего регистра
-                    prev_data_addr = prev_map_data['address']
-
-                    # длина последнего регистра
-                    prev_data_len = prev_map_data['length']
-
-                    # Если у нашего регистра адрес не равен адресу предыдущего + сдвиг по длине,
-                    # то этот регистр - первый регистр следующей группы регистров
-                    if int(address) != int(prev_data_addr) + int(prev_data_len):
-                        requests[index + 1] = {
-                            'address': address,
-                            'quantity': self.reg_len[register.format],
-                            'map': {
-                                0: {
-                                    'address': address,
-                                    'length': self.reg_len[register.format],
-                                    'content': register
-                                }
-                            }
-                        }
-                    # Иначе это регистры из одной группы
-                    elif int(address) == int(prev_data_addr) + int(prev_data_len):
-                        request: Dict = requests[index]
-                        request['quantity'] += self.reg_len[register.format]
-                        map_index: int = prev_map_index + prev_data_len
-                        request['map'][map_index] = {'address': address,
-                                                     'length': self.reg_len[register.format],
-                                                     'content': register}
-
-                else:
-                    raise Exception(f'Invalid index {index}')
             func_id = FN[fn].value
+            limit: int = MAX_READ_BITS if func_id in (FN.DO.value, FN.DI.value) \
+                else MAX_READ_REGISTERS
+            requests: Dict = {}
+            # Адрес, длина и битовый формат последнего регистра группы
+            prev_address: int = 0
+            prev_length: int = 0
+            prev_bit: bool = False
+            for key, register in registers.items():
+                address, bit = parse_address(key)
+                if (bit is None) == (register.format == 'Bit'):
+                    raise ValueError('Error@Poller.plan.',
+                                     f'Register {key} ({register.name}): bits are addressed '
+                                     f'as <register>.<bit> with Bit format.')
+                length: int = format_length(register.format)
+                # Биты одного регистра читаются одним словом,
+                # иначе если у нашего регистра адрес не равен адресу предыдущего + сдвиг по длине,
+                # или группа превысит предел запроса,
+                # то этот регистр - первый регистр следующей группы регистров
+                if not (bit is not None and prev_bit and address == prev_address):
+                    if not requests or address != prev_address + prev_length or \
+                            address + length - requests[len(requests) - 1]['address'] > limit:
+                        requests[len(requests)] = {'address': address, 'quantity': 0, 'map': {}}
+                    prev_address, prev_length = address, length
+                # Мап - список параметров регистров для конкретной группы регистров,
+                # создан для упрощения сопоставления полученного списка значений с регистрами,
+                # к которым эти значения относятся.
+                request: Dict = requests[len(requests) - 1]
+                request['quantity'] = prev_address + prev_length - request['address']
+                request['map'][len(request['map'])] = {'address': key,
+                                                       'offset': address - request['address'],
+                                                       'length': length,
+                                                       'bit': bit,
+                                                       'content': register}
+                prev_bit = bit is not None
             result[func_id] = requests
         return result
 
-    @staticmethod
-    def __format_dict(obj: Union[Decoder, Encoder]) -> Dict:
-        return {'Signed': obj.signed, 'Unsigned': obj.unsigned,
-                'Hex - ASCII': obj.hex_ascii, 'Binary': obj.binary,
-                'Long AB CD': obj.long_ab_cd, 'Long CD AB': obj.long_cd_ab,
-                'Long BA DC': obj.long_ba_dc, 'Long DC BA': obj.long_dc_ba,
-                'Float AB CD': obj.float_ab_cd, 'Float CD AB': obj.float_cd_ab,
-                'Float BA DC': obj.float_ba_dc, 'Float DC BA': obj.float_dc_ba,
-                'Double AB CD EF GH': obj.double_ab_cd_ef_gh,
-                'Double GH EF CD AB': obj.double_gh_ef_cd_ab,
-                'Double BA DC FE HG': obj.double_ba_dc_fe_hg,
-                'Double HG FE DC BA': obj.double_hg_fe_dc_ba, }
-
-    def decode_value(self, raw_value: List, data_format: str, adjustments: List) -> str:
+    def decode_value(self, raw_value: Union[List, Block], data_format: str, adjustments: List,
+                     offset: int = 0, bit: Optional[int] = None) -> Any:
         """
         Decodes a dictionary containing binary data according to the specified data format 
         and applies the given adjustments.
 
-        :param raw_value: A list of raw values to be decoded.
-        :type raw_value: List
+        :param raw_value: A list of raw values to be decoded, or the block response
+                          holding the register.
+        :type raw_value: Union[List, Block]
         :param data_format: The format of the data to be decoded.
                             Valid formats are: 
                             'Signed', 'Unsigned', 'Hex - ASCII', 'Binary', 'Long AB CD', 
                             'Long CD AB', 'Long BA DC', 'Long DC BA', 'Float AB CD', 'Float CD AB',
                             'Float BA DC', 'Float DC BA', 'Double AB CD EF GH', 
-                            'Double GH EF CD AB', 'Double BA DC FE HG', 'Double HG FE DC BA'.
+                            'Double GH EF CD AB', 'Double BA DC FE HG', 'Double HG FE DC BA',
+                            'Bit', 'String N' and arrays of the numeric formats such as
+                            'Float AB CD[N]'.
         :type data_format: str
         :param adjustments: A list of adjustments to be applied to the decoded value.
         :type adjustments: List
-        :raises ValueError: If the specified data format is not found in the format_dict.
+        :param offset: Offset of the register in the raw value, in words.
+        :type offset: int
+        :param bit: The bit of a 'Bit' register.
+        :type bit: Optional[int]
+        :raises ValueError: If the specified data format is unknown.
         :raises ValueError: If the raw value is incorrect.
-        :return: A string representing the decoded value with the applied adjustments.
-        :rtype: str
+        :return: A string representing the decoded value with the applied adjustments,
+                 bool for bits and a list of numbers for arrays.
+        :rtype: Any
         """
-        format_dict: Dict = self.__format_dict(self._decoder)
         if raw_value:
-            if data_format in format_dict:
-                return self._adjust(format_dict[data_format](value=raw_value), adjustments)
-            raise ValueError('Error@Poller.decode_value.',
-                             f'data_format {data_format} not found in format_dict.')
+            block: Block = raw_value if isinstance(raw_value, Block) else Block(raw_value)
+            with profiler.span('decode'):
+                value: Any = self._decoder.decode_at(block, offset, data_format, bit)
+            if isinstance(value, (bool, str)):
+                return value
+            with profiler.span('adjust'):
+                if isinstance(value, list):
+                    return [float(self._adjust(item, adjustments)) for item in value] \
+                        if adjustments else value
+                return self._adjust(value, adjustments)
         raise ValueError('Error@Poller.decode_value.',
                          f'raw_value {raw_value} incorrect.')
-    
+
     def encode_value(self, value: Union[str, float], 
                      data_format: str, 
                      adjustments: List) -> List[int]:
@@ -265,14 +446,13 @@ class Poller:
         :return: The encoded value as a list of pymodbus registers.
         :rtype: List[int]
         """
-        format_dict: Dict = self.__format_dict(self._encoder)
-        if data_format in format_dict:
+        if data_format in self.reg_len:
             if data_format not in ['Hex - ASCII', 'Binary']:
                 if isNumerical(value=value):
                     value = self._adjust_reverse(value=float(value), adjustments=adjustments)
                 else:
                     return None
-            return format_dict[data_format](value=value)
+            return self._encoder.encode(data_format=data_format, value=value)
         raise ValueError('Error@Poller.encode_value.',
                          f'data_format {data_format} not found in format_dict.')
         
@@ -317,27 +497,64 @@ class Poller:
                     value **= (1 / float(operand))
         return value
 
-    def _get_connection(self) -> Union[Poller._modbus.ModbusTcpClient]:
+    def _timed_poll(self, params: Dict) -> Tuple[Optional[List], float]:
+        # The block is stamped once, as soon as its response is received
+        with profiler.span('poll'):
+            if self._config.cache_age:
+                return self._connection.read(key=(params['slave'], params['func']),
+                                             address=params['reg_address'],
+                                             count=params['reg_qty'],
+                                             max_age=self._config.cache_age / 1000,
+                                             reader=lambda: self._request(params))
+            response: Optional[List] = self._request(params)
+        return response, epochTime()
+
+    def _request(self, params: Dict) -> Optional[List]:
+        if self._policy is None:
+            return self._poll(**params)
+        return self._policy.execute(params['func'],
+                                    lambda timeout, wait: self._poll(**params, timeout=timeout,
+                                                                     wait=wait))
+
+    def _get_connection(self) -> Optional[Gateway]:
         # protocol: str = self._get('protocol')
         protocol: str = 'TCP'
         if protocol == 'TCP':
             ip: str = self._config.ip
             if ip:
-                return self._modbus.ModbusTcpClient(ip)
+                # Requests are retried by the policy of the poller, not by the client
+                return Gateway.get(ip=ip, port=self._config.port,
+                                   concurrency=self._config.concurrency,
+                                   timeout=self._config.policy.timeout / 1000, retries=0)
             print('Exception@_get_connection (TCP)')
         print('Exception@_get_connection')
 
     def connect(self) -> None:
         """
-        Connects the instance to a Modbus device.
+        Connects the instance to a Modbus device, sharing the connections with the other
+        pollers of the same endpoint.
 
         :return: nothing
         :rtype: None
         """
-        self._connection: Poller._modbus.ModbusTcpClient = self._get_connection()
+        self._connection: Gateway = self._get_connection()
         self._connection.connect()
+        if self._connection.concurrency > 1:
+            self._executor = ThreadPoolExecutor(max_workers=self._connection.concurrency,
+                                                thread_name_prefix=f'mbir-{self._config.table}')
+        self._policy = RequestPolicy(self._config.policy, self._connection.concurrency)
         print(f'{self} successfully connected to {self._connection}.')
 
+    @property
+    def gateway(self) -> Optional[Gateway]:
+        """
+        Get the gateway shared with the other pollers of the endpoint.
+
+        :return: The gateway, or None if the instance is not connected.
+        :rtype: Optional[Gateway]
+        """
+        return self._connection
+
     @property
     def is_connected(self) -> bool:
         """
@@ -346,26 +563,41 @@ class Poller:
         :return: True if the instance is connected to a Modbus device, False otherwise.
         :rtype: bool
         """
-        return self._connection.is_socket_open()
+        return self._connection is not None and self._connection.is_connected
 
-    def _poll(self, func: int, reg_address: int, reg_qty: int) -> Optional[List]:
-        slave_id: int = self._config.address
+    def stats(self) -> Optional[Dict]:
+        """
+        Get the counters and the block latency percentiles of the requests.
+
+        :return: The statistics of the request policy, or None if the instance
+                 is not connected.
+        :rtype: Optional[Dict]
+        """
+        return self._policy.stats() if self._policy else None
+
+    def _poll(self, func: int, reg_address: int, reg_qty: int, slave: Optional[int] = None,
+              timeout: Optional[float] = None, wait: bool = True) -> Optional[List]:
+        slave_id: int = self.units[0] if slave is None else slave
         poll_params: Dict = {'address': reg_address,
                              'count': reg_qty,
                              'slave': slave_id}
         response: Optional[ModbusResponse] = None
         result: Optional[list] = None
         try:
-            if func == 1:
-                response = self._connection.read_coils(**poll_params)
-            elif func == 2:
-                response = self._connection.read_discrete_inputs(**poll_params)
-            elif func == 3:
-                response = self._connection.read_holding_registers(**poll_params)
-            elif func == 4:
-                response = self._connection.read_input_registers(**poll_params)
-            else:
-                print('Exception')
+            with self._connection.client(timeout=timeout, wait=wait) as client:
+                if client is None:
+                    # No idle connection for a hedged request
+                    return None
+                if func == 1:
+                    response = client.read_coils(**poll_params)
+                elif func == 2:
+                    response = client.read_discrete_inputs(**poll_params)
+                elif func == 3:
+                    response = client.read_holding_registers(**poll_params)
+                elif func == 4:
+                    response = client.read_input_registers(**poll_params)
+                else:
+                    print('Exception')
         except pymodbus.exceptions.ConnectionException as e:  # pylint: disable=unused-variable
             print(f'Error: poll@modbus.py, result: {result}, type: {type(result)}')
             # print(f'{type(e).__name__} occurred, args={str(e.args)}\n{traceback.format_exc()}')
@@ -377,11 +609,11 @@ class Poller:
                     result = list(response.bits[:reg_qty])
                 if func in [3, 4]:
                     result = list(response.registers)
-                del response
                 return result
         return None
     
-    def writeSingleCoil(self, address: int, value: bool) -> ModbusResponse:
+    def writeSingleCoil(self, address: int, value: bool,
+                        slave: Optional[int] = None) -> ModbusResponse:
         """
         Write a single coil value to the specified address in the Modbus device.
 
@@ -389,15 +621,22 @@ class Poller:
         :type address: int
         :param value: The value to be written to the Modbus device (True for 1, False for 0).
         :type value: bool
+        :param slave: The unit id, the first polled unit if omitted.
+        :type slave: Optional[int]
         :return: A ModbusResponse object containing the status of the write operation.
         :rtype: ModbusResponse
         """
-        slave_id: int = self._config.address
-        return self._connection.write_coil(address=int(address), 
-                                           value=value, 
-                                           slave=slave_id)
+        slave_id: int = self.units[0] if slave is None else slave
+        with self._connection.client() as client:
+            response: ModbusResponse = client.write_coil(address=int(address),
+                                                         value=value,
+                                                         slave=slave_id)
+        # Shared reads of the written unit are no longer valid
+        self._connection.invalidate((slave_id, FN.DO.value))
+        return response
     
-    def writeRegisters(self, address: int, value: List) -> ModbusResponse:
+    def writeRegisters(self, address: int, value: List,
+                       slave: Optional[int] = None) -> ModbusResponse:
         """
         Write a list of values to holding registers with the specified address 
         in the Modbus device.
@@ -406,21 +645,146 @@ class Poller:
         :type address: int
         :param value: A list of values to be written to the Modbus device.
         :type value: List
+        :param slave: The unit id, the first polled unit if omitted.
+        :type slave: Optional[int]
+        :return: A ModbusResponse object containing the status of the write operation.
+        :rtype: ModbusResponse
+        """
+        slave_id: int = self.units[0] if slave is None else slave
+        with self._connection.client() as client:
+            response: ModbusResponse = client.write_registers(address=int(address),
+                                                              values=value,
+                                                              slave=slave_id)
+        # Shared reads of the written unit are no longer valid
+        self._connection.invalidate((slave_id, FN.AO.value))
+        return response
+
+    def writable(self, name: str) -> Optional[Tuple[int, int, Register, int]]:
+        """
+        Get a writable register (a coil or a holding register) by name.
+
+        :param name: The name as listed in :attr:`tags`.
+        :type name: str
+        :return: The function code, address, register and unit, or None if the register
+                 is read-only or not found.
+        :rtype: Optional[Tuple[int, int, Register, int]]
+        """
+        located: Optional[Tuple[int, Register]] = self.__locate(name)
+        if located is None:
+            return None
+        unit, register = located
+        found: Optional[Tuple[int, str, Register]] = self._config.registers.find(register.name)
+        # Derived tags, inputs, bits, strings and arrays are read-only
+        if found is None or found[0] not in (FN.DO.value, FN.AO.value) \
+                or register.format not in self.reg_len:
+            return None
+        return found[0], int(found[1]), register, unit
+
+    def write(self, values: Dict[str, Any]) -> Dict[str, Union[bool, str]]:
+        """
+        Write several values at once, addressed by register name.
+
+        Values are encoded according to the register map and reverse adjustments, then
+        registers with adjacent addresses are merged into Write Multiple Coils (FC15) and
+        Write Multiple Registers (FC16) requests within the PDU limits.
+
+        :param values: A dictionary of values keyed by register name.
+        :type values: Dict[str, Any]
+        :return: A dictionary keyed by register name holding True if the value was
+                 written, or the error description otherwise.
+        :rtype: Dict[str, Union[bool, str]]
+        """
+        result: Dict[str, Union[bool, str]] = {}
+        pending: Dict[Tuple[int, int], List] = {}
+        for name, value in values.items():
+            target: Optional[Tuple[int, int, Register, int]] = self.writable(name)
+            if target is None:
+                result[name] = f'Register {name} is read-only.' if self.tag(name) \
+                    else f'Register {name} is not found.'
+                continue
+            fn, address, register, unit = target
+            try:
+                if fn == FN.DO.value:
+                    words: Optional[List] = [bool(int(float(value)))] \
+                        if isNumerical(value=value) else None
+                else:
+                    words = self.encode_value(value=value, data_format=register.format,
+                                              adjustments=register.adjustments or [])
+            except (ValueError, OverflowError):
+                # 'nan' and 'inf' are numerical, but not valid values of a coil or an integer
+                words = None
+            if not words:
+                result[name] = f'Value {value} can not be encoded as {register.format}.'
+                continue
+            pending.setdefault((unit, fn), []).append((address, words, name))
+
+        for (unit, fn), items in pending.items():
+            limit: int = MAX_WRITE_COILS if fn == FN.DO.value else MAX_WRITE_REGISTERS
+            for address, words, names in self.__merge(items, limit):
+                try:
+                    if fn == FN.DO.value:
+                        response = self.writeCoils(address=address, value=words, slave=unit)
+                    else:
+                        response = self.writeRegisters(address=address, value=words,
+                                                       slave=unit)
+                    error: Optional[str] = str(response) if response is None or \
+                        response.isError() else None
+                except ModbusException as e:
+                    error = f'{type(e).__name__}: {e}'
+                for name in names:
+                    result[name] = error or True
+        return result
+
+    @staticmethod
+    def __merge(items: List, limit: int) -> List:
+        runs: List = []
+        for address, words, name in sorted(items, key=lambda item: item[0]):
+            if runs:
+                start, run, names = runs[-1]
+                if address == start + len(run) and len(run) + len(words) <= limit:
+                    run.extend(words)
+                    names.append(name)
+                    continue
+            runs.append((address, list(words), [name]))
+        return runs
+
+    def writeCoils(self, address: int, value: List[bool],
+                   slave: Optional[int] = None) -> ModbusResponse:
+        """
+        Write a list of coil values starting from the specified address in the Modbus device.
+
+        :param address: The address of the first coil.
+        :type address: int
+        :param value: A list of coil values to be written to the Modbus device.
+        :type value: List[bool]
+        :param slave: The unit id, the first polled unit if omitted.
+        :type slave: Optional[int]
         :return: A ModbusResponse object containing the status of the write operation.
         :rtype: ModbusResponse
         """
-        slave_id: int = self._config.address
-        return self._connection.write_registers(address=int(address),
-                                                values=value, 
-                                                slave=slave_id)
+        slave_id: int = self.units[0] if slave is None else slave
+        with self._connection.client() as client:
+            response: ModbusResponse = client.write_coils(address=int(address),
+                                                          values=value,
+                                                          slave=slave_id)
+        # Shared reads of the written unit are no longer valid
+        self._connection.invalidate((slave_id, FN.DO.value))
+        return response
 
     def disconnect(self) -> None:
         """
         Close connection to device and print status
         
         """
+        if self._executor:
+            self._executor.shutdown()
+            self._executor = None
+        if self._policy:
+            self._policy.close()
+            self._policy = None
         if self._connection:
-            self._connection.close()
+            self._connection.release()
             print(f'{self} successfully disconnected from {self._connection}.')
+            self._connection = None
         else:
             print(f'{self} already disconnected from {self._connection}.')
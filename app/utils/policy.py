@@ -0,0 +1,176 @@
+"""
+This module provides with timeout, retry and hedging policy of block requests.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from app.utils.pydantic.models import Policy
+
+
+class RequestPolicy:
+    """
+    Sends the block requests of a device with bounded timeouts, retries and hedging.
+
+    Every request gets the timeout of its function code. A request without a valid
+    response is retried up to ``retries`` times while the scan deadline (``deadline``
+    share of the scan period from the start of the scan) is not reached, and a retry
+    never waits past the deadline. With ``hedge`` set and several connections, a
+    request without a response after ``hedge`` milliseconds is sent again on an idle
+    connection and the first valid response wins; the slower request completes in the
+    background and is discarded.
+
+    Latencies of the successful requests (retries included) are kept per function code
+    for the last ``SAMPLES`` requests.
+
+    :param settings: Request policy settings of the device.
+    :type settings: Policy
+    :param concurrency: Number of connections to the device.
+    :type concurrency: int
+    """
+    SAMPLES: int = 1024
+
+    def __init__(self, settings: Policy, concurrency: int) -> None:
+        self._settings: Policy = settings
+        self._deadline: Optional[float] = None
+        self._hedger: Optional[ThreadPoolExecutor] = None
+        if settings.hedge > 0 and concurrency > 1:
+            self._hedger = ThreadPoolExecutor(max_workers=2 * concurrency,
+                                              thread_name_prefix='mbir-hedge')
+        self._latencies: Dict[int, Deque[float]] = {}
+        self._counters: Dict[str, int] = {'requests': 0, 'retries': 0, 'hedges': 0,
+                                          'hedge wins': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def timeout(self, fn: int) -> float:
+        """
+        Returns the response timeout of a function code.
+
+        :param fn: Modbus function code.
+        :type fn: int
+        :return: Timeout in seconds.
+        :rtype: float
+        """
+        return self._settings.timeouts.get(fn, self._settings.timeout) / 1000
+
+    def start(self, scan_rate: int) -> None:
+        """
+        Starts the deadline of a scan.
+
+        :param scan_rate: The scan period in milliseconds.
+        :type scan_rate: int
+        :return: nothing
+        :rtype: None
+        """
+        self._deadline = time.monotonic() + scan_rate / 1000 * self._settings.deadline
+
+    def execute(self, fn: int, poll: Callable[[float, bool], Optional[List]]) -> Optional[List]:
+        """
+        Sends a block request according to the policy.
+
+        :param fn: Modbus function code of the block.
+        :type fn: int
+        :param poll: Sends the request once with the given timeout in seconds, waiting
+                     for a free connection if the flag is set, and returns the values
+                     or None.
+        :type poll: Callable[[float, bool], Optional[List]]
+        :return: The values, or None if no attempt succeeded.
+        :rtype: Optional[List]
+        """
+        started: float = time.monotonic()
+        timeout: float = self.timeout(fn)
+        result: Optional[List] = None
+        retries: int = 0
+        for attempt in range(1 + max(0, self._settings.retries)):
+            limit: float = timeout
+            if attempt:
+                remaining: float = (self._deadline or started + timeout) - time.monotonic()
+                if remaining <= 0:
+                    break
+                limit = min(timeout, remaining)
+                retries += 1
+            result = self.__attempt(poll, limit)
+            if result is not None:
+                break
+        latency: float = time.monotonic() - started
+        with self._lock:
+            self._counters['requests'] += 1
+            self._counters['retries'] += retries
+            if result is None:
+                self._counters['failures'] += 1
+            else:
+                self._latencies.setdefault(fn, deque(maxlen=self.SAMPLES)).append(latency)
+        return result
+
+    def __attempt(self, poll: Callable[[float, bool], Optional[List]],
+                  timeout: float) -> Optional[List]:
+        if self._hedger is None:
+            return poll(timeout, True)
+        primary: Future = self._hedger.submit(poll, timeout, True)
+        delay: float = self._settings.hedge / 1000
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeout:
+            pass
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            return primary.result()
+        # The hedged request does not wait for a connection, it is sent on an idle one only
+        hedge: Future = self._hedger.submit(poll, timeout, False)
+        with self._lock:
+            self._counters['hedges'] += 1
+        pending: Set[Future] = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result: Optional[List] = future.result()
+                if result is not None:
+                    if future is hedge:
+                        with self._lock:
+                            self._counters['hedge wins'] += 1
+                    return result
+        return None
+
+    @staticmethod
+    def _percentile(samples: List[float], share: float) -> float:
+        return samples[min(len(samples) - 1, int(share * len(samples)))]
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters and the block latency percentiles.
+
+        :return: Numbers of requests, retries, hedged requests, hedged requests that
+                 won and failed requests, and p50/p99 latency in milliseconds per
+                 function code.
+        :rtype: Dict
+        """
+        with self._lock:
+            stats: Dict = dict(self._counters)
+            samples: Dict[int, List[float]] = {fn: sorted(latencies)
+                                               for fn, latencies in self._latencies.items()}
+        stats['latency'] = {fn: {'p50': round(self._percentile(values, 0.5) * 1000, 1),
+                                 'p99': round(self._percentile(values, 0.99) * 1000, 1),
+                                 'samples': len(values)}
+                            for fn, values in sorted(samples.items())}
+        return stats
+
+    def close(self) -> None:
+        """
+        Stops the hedging threads.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._hedger:
+            self._hedger.shutdown(wait=False)
+            self._hedger = None
@@ -0,0 +1,275 @@
+"""
+This module provides with switchable profiling of the polling hot path.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import cProfile
+import os
+import pstats
+import signal
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional
+
+
+class Profiler:
+    """
+    Process-wide profiling surface, idle until switched on.
+
+    * Stage spans: :meth:`span` accumulates the count, total and maximal duration of
+      the named stages (plan, poll, decode, adjust, write). When spans are disabled it
+      returns a shared no-op context, so the hooks cost a call per stage.
+    * Memory: a background thread takes a ``tracemalloc`` snapshot every ``interval``
+      seconds and prints the ``top`` allocation sites that grew since the previous one.
+    * CPU: the signal installed by :meth:`install` (SIGUSR1 by default) starts capturing
+      every scan with ``cProfile``; the next signal writes the merged statistics to
+      ``<directory>/mbir-<pid>-<time>.prof`` and stops capturing. The handler only
+      starts a thread doing so, since the interrupted thread may hold the lock of
+      the profiler.
+    """
+    FRAMES: int = 1
+
+    def __init__(self) -> None:
+        self.enabled: bool = False
+        self._spans: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        self._null: ContextManager = nullcontext()
+        self._memory: Optional[threading.Thread] = None
+        self._memory_running: bool = False
+        self._growth: List[str] = []
+        self._capturing: bool = False
+        self._profiles: Dict[int, cProfile.Profile] = {}
+        self._directory: str = '.'
+        self._toggle_lock = threading.Lock()
+
+    def configure(self, enabled: bool = False, memory_interval: float = 0,
+                  top: int = 10, directory: str = '.') -> None:
+        """
+        Switches the stage spans and the memory tracking on or off.
+
+        :param enabled: Whether the stage spans are collected.
+        :type enabled: bool
+        :param memory_interval: Seconds between memory snapshots, 0 disables tracking.
+        :type memory_interval: float
+        :param top: Number of allocation sites printed after each snapshot.
+        :type top: int
+        :param directory: Directory the CPU profiles are written to.
+        :type directory: str
+        :return: nothing
+        :rtype: None
+        """
+        self.enabled = enabled
+        self._directory = directory
+        self.stop_memory()
+        if memory_interval > 0:
+            self.start_memory(interval=memory_interval, top=top)
+
+    def span(self, stage: str) -> ContextManager:
+        """
+        Returns a context manager timing one pass through the stage.
+
+        :param stage: Name of the stage.
+        :type stage: str
+        :return: A timing context manager, or a no-op one if spans are disabled.
+        :rtype: ContextManager
+        """
+        if not self.enabled:
+            return self._null
+        return self._timed(stage)
+
+    @contextmanager
+    def _timed(self, stage: str) -> Iterator[None]:
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration: float = time.perf_counter() - started
+            with self._lock:
+                span: Optional[List[float]] = self._spans.get(stage)
+                if span is None:
+                    self._spans[stage] = [1, duration, duration]
+                else:
+                    span[0] += 1
+                    span[1] += duration
+                    span[2] = max(span[2], duration)
+
+    def spans(self, reset: bool = False) -> Dict[str, Dict]:
+        """
+        Returns the accumulated stage timings.
+
+        :param reset: Whether the timings are cleared after reading.
+        :type reset: bool
+        :return: Count, total, mean and maximal duration in milliseconds per stage.
+        :rtype: Dict[str, Dict]
+        """
+        with self._lock:
+            spans: Dict[str, List[float]] = self._spans
+            if reset:
+                self._spans = {}
+            else:
+                spans = {stage: list(span) for stage, span in spans.items()}
+        return {stage: {'count': int(count), 'total': total * 1000,
+                        'mean': total * 1000 / count, 'max': longest * 1000}
+                for stage, (count, total, longest) in spans.items()}
+
+    def start_memory(self, interval: float, top: int = 10) -> None:
+        """
+        Starts tracking memory allocations in a background thread.
+
+        :param interval: Seconds between snapshots.
+        :type interval: float
+        :param top: Number of allocation sites printed after each snapshot.
+        :type top: int
+        :return: nothing
+        :rtype: None
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.FRAMES)
+        self._memory_running = True
+        self._memory = threading.Thread(target=self._track, args=(interval, top),
+                                        name='mbir-tracemalloc', daemon=True)
+        self._memory.start()
+
+    def stop_memory(self) -> None:
+        """
+        Stops tracking memory allocations.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._memory is None:
+            return
+        self._memory_running = False
+        self._memory.join()
+        self._memory = None
+        tracemalloc.stop()
+
+    def _track(self, interval: float, top: int) -> None:
+        filters: List[tracemalloc.Filter] = [tracemalloc.Filter(False, tracemalloc.__file__),
+                                             tracemalloc.Filter(False, '<frozen importlib._bootstrap>')]
+        previous: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+        deadline: float = time.monotonic() + interval
+        while self._memory_running:
+            if time.monotonic() < deadline:
+                time.sleep(min(1.0, interval))
+                continue
+            deadline += interval
+            snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces(filters)
+            growth: List[str] = [str(stat) for stat in
+                                 snapshot.compare_to(previous, 'lineno')[:top]]
+            previous = snapshot
+            current, peak = tracemalloc.get_traced_memory()
+            print(f'Memory: {current / 2 ** 20:.1f} MiB traced, {peak / 2 ** 20:.1f} MiB peak, '
+                  f'top {top} changes since the previous snapshot:')
+            for line in growth:
+                print(f'  {line}')
+            self._growth = growth
+
+    @contextmanager
+    def profiled(self) -> Iterator[None]:
+        """
+        Captures the enclosed code with ``cProfile`` while a capture is in progress.
+
+        Each thread keeps a profile of its own; a pass that cannot be captured
+        (another profiler is active in this thread) simply runs unprofiled.
+
+        :return: A context manager.
+        :rtype: Iterator[None]
+        """
+        if not self._capturing:
+            yield
+            return
+        with self._lock:
+            profile: cProfile.Profile = self._profiles.setdefault(threading.get_ident(),
+                                                                  cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError:
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+
+    def toggle(self) -> Optional[str]:
+        """
+        Starts a CPU profile capture, or finishes the capture in progress.
+
+        :return: Path of the written profile when a capture is finished, None otherwise.
+        :rtype: Optional[str]
+        """
+        with self._toggle_lock:
+            if not self._capturing:
+                with self._lock:
+                    self._profiles = {}
+                self._capturing = True
+                print('CPU profile capture started.')
+                return None
+            return self.dump()
+
+    def _on_signal(self, signum: int, frame) -> None:
+        threading.Thread(target=self.toggle, name='mbir-profile', daemon=True).start()
+
+    def dump(self) -> Optional[str]:
+        """
+        Finishes the capture in progress and writes the merged statistics.
+
+        :return: Path of the written profile, None if nothing was captured.
+        :rtype: Optional[str]
+        """
+        self._capturing = False
+        with self._lock:
+            profiles: List[cProfile.Profile] = list(self._profiles.values())
+            self._profiles = {}
+        stats: Optional[pstats.Stats] = None
+        for profile in profiles:
+            profile.create_stats()
+            if not profile.stats:
+                continue
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is None:
+            print('CPU profile capture finished, nothing was captured.')
+            return None
+        path: str = os.path.join(self._directory, f'mbir-{os.getpid()}-{int(time.time())}.prof')
+        stats.dump_stats(path)
+        print(f'CPU profile written to {path}.')
+        return path
+
+    def install(self, signum: Optional[int] = None) -> None:
+        """
+        Installs a handler of the signal calling :meth:`toggle` in a new thread; must
+        be called from the main thread. Does nothing on platforms without SIGUSR1.
+
+        :param signum: The signal, SIGUSR1 if omitted.
+        :type signum: Optional[int]
+        :return: nothing
+        :rtype: None
+        """
+        signum = signum or getattr(signal, 'SIGUSR1', None)
+        if signum is not None:
+            signal.signal(signum, self._on_signal)
+
+    def stats(self) -> Dict:
+        """
+        Returns the state of the profiler.
+
+        :return: Stage timings, the last memory growth report and the capture state.
+        :rtype: Dict
+        """
+        return {'spans': self.spans(), 'memory': list(self._growth),
+                'capturing': self._capturing}
+
+
+profiler: Profiler = Profiler()
@@ -1,28 +1,255 @@
-import uuid
-from typing import Dict, Optional
+import itertools
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+
+from app.utils.coders import Format, parse_format
+from app.utils.enums import FN
+
+
+# Process-wide register ids, used as cache keys only
+_IDS = itertools.count()
+
+# Maximal number of coils or discrete inputs of a single read (FC1, FC2) request
+MAX_READ_BITS: int = 2000
+# Maximal number of registers of a single read (FC3, FC4) request
+MAX_READ_REGISTERS: int = 125
+
+
+def parse_address(key: Union[str, int]) -> Tuple[int, Optional[int]]:
+    """
+    Parses the key of a register map.
+
+    :param key: '40' for register 40, '40.3' for the bit 3 of register 40.
+    :type key: Union[str, int]
+    :raises ValueError: If the key is not an address or the bit is out of 0-15.
+    :return: The numeric address and the bit, None for a whole register.
+    :rtype: Tuple[int, Optional[int]]
+    """
+    key = str(key)
+    if key.isdigit():
+        return int(key), None
+    address, _, bit = key.partition('.')
+    if not address.isdigit() or bit and not (bit.isdigit() and 0 <= int(bit) <= 15):
+        raise ValueError('Error@parse_address.',
+                         f'Register {key}: expected <register> or <register>.<bit 0-15>.')
+    return int(address), int(bit) if bit else None
+
+
+def _key(address: int, bit: Optional[int]) -> str:
+    return str(address) if bit is None else f'{address}.{bit}'
+
+
+def _maps_values(adjustments: Any) -> bool:
+    # Adjustments are applied as a sequence of {operator: operand} mappings,
+    # a numeric operator maps that value to the operand
+    if isinstance(adjustments, dict):
+        adjustments = [adjustments]
+    return any(str(operator).isdigit() for adjustment in adjustments or ()
+               for operator in adjustment)
+
+
+class Alarm(BaseModel):
+    # upper and lower limits of the value
+    hi: Optional[float] = None
+    lo: Optional[float] = None
+    # maximal change of the value per second in either direction
+    rate: Optional[float] = None
+    # hysteresis: an alarm clears once the value, or its change per second for a rate
+    # alarm, is back within the limit by the deadband
+    deadband: float = 0
+    # seconds a condition must hold before the alarm is raised and before it is cleared
+    delay: float = 0
+    clear_delay: float = Field(alias='clear delay', default=0)
 
 
 class Register(BaseModel):
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    id: str = Field(default_factory=lambda: str(next(_IDS)))
     name: str
     active: bool
     format: str
     type: str
     adjustments: Optional[Dict]
+    priority: int = 0
+    # subtopic the register is published to, the device topic if omitted
+    topic: Optional[str] = None
+    alarm: Optional[Alarm] = None
+
+
+class Derived(Register):
+    # expression over the names of registers and other derived tags
+    expression: str
+    active: bool = True
+    # the format sets the column type only, derived values are never decoded
+    format: str = 'Double AB CD EF GH'
+    type: str = 'FLOAT'
+    adjustments: Optional[Dict] = None
 
 
 class Registers(BaseModel):
-    DO: Dict[str, Register] = Field(alias='01 Read Coils')
-    DI: Dict[str, Register] = Field(alias='02 Read Discrete Inputs')
-    AO: Dict[str, Register] = Field(alias='03 Read Holding Registers')
-    AI: Dict[str, Register] = Field(alias='04 Read Input Registers')
+    DO: Dict[str, Register] = Field(alias='01 Read Coils', default={})
+    DI: Dict[str, Register] = Field(alias='02 Read Discrete Inputs', default={})
+    AO: Dict[str, Register] = Field(alias='03 Read Holding Registers', default={})
+    AI: Dict[str, Register] = Field(alias='04 Read Input Registers', default={})
+    # function code and address of every register keyed by name
+    _names: Dict[str, Tuple[int, str]] = PrivateAttr(default_factory=dict)
+    # register keyed by function code, numeric address and bit
+    _addresses: Dict[Tuple[int, int, Optional[int]], Register] = PrivateAttr(default_factory=dict)
+
+    @model_validator(mode='after')
+    def _index(self) -> 'Registers':
+        # The maps are sorted by numeric address and keyed by canonical addresses,
+        # so contiguous blocks are found in one pass whatever the order of the file
+        names: Dict[str, Tuple[int, str]] = {}
+        addresses: Dict[Tuple[int, int, Optional[int]], Register] = {}
+        for fn in FN:
+            mapped: Dict[str, Register] = getattr(self, fn.name)
+            limit: int = MAX_READ_BITS if fn in (FN.DO, FN.DI) else MAX_READ_REGISTERS
+            try:
+                # A bit follows the whole register of its address
+                parsed_keys: List[Tuple[int, Optional[int], Register]] = \
+                    [(*parse_address(key), register) for key, register in mapped.items()]
+                keyed: List[Tuple[int, str, Register]] = \
+                    [(address * 17 + (0 if bit is None else bit + 1), _key(address, bit), register)
+                     for address, bit, register in parsed_keys]
+                formats: Dict[str, Format] = {data_format: parse_format(data_format)
+                                              for data_format in {register.format
+                                                                  for register in mapped.values()}}
+            except ValueError as e:
+                raise ValueError(e.args[-1]) from e
+            lengths: Dict[str, int] = {data_format: parsed.length
+                                       for data_format, parsed in formats.items()}
+            for key, register in mapped.items() if any(parsed.array for parsed in
+                                                       formats.values()) else ():
+                # Array items are numbers, a value map would turn them into labels
+                if formats[register.format].array and _maps_values(register.adjustments):
+                    raise ValueError(f'Register {key} ({register.name}) of {fn.name} maps the '
+                                     f'values of the array format {register.format}.')
+            for key, register in mapped.items() if max(lengths.values(), default=0) > limit else ():
+                if lengths[register.format] > limit:
+                    raise ValueError(f'Register {key} ({register.name}) of {fn.name} spans '
+                                     f'{lengths[register.format]} addresses, a read request '
+                                     f'is limited to {limit}.')
+            keyed.sort(key=lambda item: item[0])
+            registers: Dict[str, Register] = {}
+            for _, key, register in keyed:
+                if key in registers:
+                    raise ValueError(f'Register {key} of {fn.name} is declared twice.')
+                if register.name in names:
+                    raise ValueError(f'Register name {register.name} is used twice.')
+                registers[key] = register
+                names[register.name] = (fn.value, key)
+            addresses.update(((fn.value, address, bit), register)
+                             for address, bit, register in parsed_keys)
+            setattr(self, fn.name, registers)
+        self._names = names
+        self._addresses = addresses
+        return self
+
+    def find(self, name: str) -> Optional[Tuple[int, str, Register]]:
+        """
+        Looks a register up by name.
+
+        :param name: The register name.
+        :type name: str
+        :return: The function code, the address and the register, or None if not found.
+        :rtype: Optional[Tuple[int, str, Register]]
+        """
+        location: Optional[Tuple[int, str]] = self._names.get(name)
+        if location is None:
+            return None
+        return location[0], location[1], getattr(self, FN(location[0]).name)[location[1]]
+
+    def at(self, fn: int, address: Union[str, int],
+           bit: Optional[int] = None) -> Optional[Register]:
+        """
+        Looks a register up by function code and address.
+
+        :param fn: The Modbus read function code (1-4).
+        :type fn: int
+        :param address: 40 or '40' for register 40, '40.3' for the bit 3 of register 40.
+        :type address: Union[str, int]
+        :param bit: The bit of a numeric address, the whole register if omitted.
+        :type bit: Optional[int]
+        :raises ValueError: If the address is malformed.
+        :return: The register, or None if not found.
+        :rtype: Optional[Register]
+        """
+        if not isinstance(address, int):
+            address, bit = parse_address(address)
+        return self._addresses.get((fn, address, bit))
+
+
+class Storage(BaseModel):
+    type: str = 'postgres'
+    path: Optional[str] = None
+    batch: int = 100
+
+
+class Adaptive(BaseModel):
+    enabled: bool = False
+    # share of the scan period a scan may take before the device is considered slow
+    load: float = 0.8
+    # share of failed scans before the device is considered overloaded
+    errors: float = 0.2
+    # maximal stretch of the scan period
+    max_factor: float = Field(alias='max factor', default=8)
+    # shrink of the stretch after every healthy scan
+    recovery: float = 0.9
+    # largest priority number that is never shed
+    keep_priority: int = Field(alias='keep priority', default=0)
+
+
+class Policy(BaseModel):
+    # response timeout of a block request in milliseconds
+    timeout: int = 3000
+    # timeouts of the function codes that differ from the device one, e.g. {4: 500}
+    timeouts: Dict[int, int] = {}
+    # retries of a block request without a valid response
+    retries: int = 1
+    # share of the scan period after which no retry or hedged request is sent
+    deadline: float = 1.0
+    # milliseconds without a response after which the block is requested again
+    # on an idle connection (concurrency > 1), 0 disables hedged requests
+    hedge: int = 0
+
+
+class Publish(BaseModel):
+    enabled: bool = False
+    host: str = 'localhost'
+    port: int = 1883
+    # root topic of the device, '{table}' is replaced with the table name
+    topic: str = 'mbir/{table}'
+    qos: int = 1
+    # payload encoding, 'msgpack' or 'json'
+    format: str = 'msgpack'
+    # maximal number of scans per message and maximal age of a batch in milliseconds
+    batch: int = 50
+    linger: int = 1000
+    # maximal number of messages awaiting acknowledgement (QoS 1 and 2)
+    window: int = 20
+    # seconds a scan waits for the window before its batch is dropped
+    block: float = 5
+    # seconds between full snapshots, the other scans carry changed values only
+    keyframe: float = 60
 
 
 class Config(BaseModel):
     scan_rate: int = Field(alias='scan rate', default=1000)
     ip: str
-    address: int = 1
+    port: int = 502
+    # unit id of the device, or the unit ids of the devices behind a gateway
+    address: Union[int, List[int]] = 1
+    # number of concurrent requests (and connections) the endpoint accepts
+    concurrency: int = 1
+    # maximal age in milliseconds of a block read shared with the other configurations
+    # of the endpoint, 0 reads every block from the device
+    cache_age: int = Field(alias='cache age', default=0)
     table: str
     registers: Registers
+    # computed tags stored after the registers of every unit
+    derived: List[Derived] = []
+    storage: Storage = Field(default_factory=Storage)
+    adaptive: Adaptive = Field(default_factory=Adaptive)
+    policy: Policy = Field(default_factory=Policy)
+    publish: Publish = Field(default_factory=Publish)
@@ -0,0 +1,466 @@
+"""
+This module provides with base class for storage writers.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import asyncio
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.utils.alarms import Event
+from app.utils.coders import Format, parse_format
+from app.utils.pydantic.models import Config, Register
+
+
+SQL_TYPES: Dict[str, str] = {'Signed': 'SMALLINT', 'Unsigned': 'INTEGER',
+                             'Hex - ASCII': 'VARCHAR(6)', 'Binary': 'VARCHAR(19)',
+                             'Long AB CD': 'BIGINT', 'Long CD AB': 'BIGINT',
+                             'Long BA DC': 'BIGINT', 'Long DC BA': 'BIGINT',
+                             'Float AB CD': 'REAL', 'Float CD AB': 'REAL',
+                             'Float BA DC': 'REAL', 'Float DC BA': 'REAL',
+                             'Double AB CD EF GH': 'FLOAT', 'Double GH EF CD AB': 'FLOAT',
+                             'Double BA DC FE HG': 'FLOAT', 'Double HG FE DC BA': 'FLOAT', }
+
+
+def sql_type(data_format: str) -> str:
+    """
+    Returns the PostgreSQL column type of a register format.
+
+    Bits are stored as BOOLEAN, strings as VARCHAR of their length and arrays as
+    arrays of the type of their items.
+
+    :param data_format: The format of the register.
+    :type data_format: str
+    :raises ValueError: If the specified data format is unknown.
+    :return: The column type, e.g. 'REAL' or 'REAL[]'.
+    :rtype: str
+    """
+    if data_format in SQL_TYPES:
+        return SQL_TYPES[data_format]
+    parsed: Format = parse_format(data_format)
+    if parsed.base == 'Bit':
+        return 'BOOLEAN'
+    if parsed.base == 'String':
+        return f'VARCHAR({2 * parsed.count})'
+    return f'{SQL_TYPES[parsed.base]}[]'
+
+
+def column_name(register: Register) -> str:
+    """
+    Builds the table column name of the register.
+
+    :param register: The register to build the column name for.
+    :type register: Register
+    :return: Lower-cased column name in the form of '<name>_<format>', arrays as
+             '<name>_<format>_<length>'.
+    :rtype: str
+    """
+    data_format: str = register.format.replace(' ', '_').replace('-', '') \
+        .replace('[', '_').replace(']', '')
+    return f'{register.name}_{data_format}'.lower()
+
+
+def _to_int(value: Any) -> Optional[int]:
+    return None if value is None else int(float(value))
+
+
+def _to_float(value: Any) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _to_str(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _to_bool(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    return bool(int(float(value)))
+
+
+def _to_list(item: Callable[[Any], Any]) -> Callable[[Any], Optional[List]]:
+    def convert(value: Any) -> Optional[List]:
+        return None if value is None else [item(element) for element in value]
+    return convert
+
+
+def converter(data_format: str) -> Callable[[Any], Any]:
+    """
+    Returns the function converting a decoded register value to its storage type.
+
+    :param data_format: The format of the register.
+    :type data_format: str
+    :raises ValueError: If the specified data format is unknown.
+    :return: A callable converting a single value.
+    :rtype: Callable[[Any], Any]
+    """
+    try:
+        column_type: str = sql_type(data_format)
+    except ValueError as e:
+        raise ValueError('Error@storage.converter.',
+                         f'Unknown format {data_format}') from e
+    if column_type.endswith('[]'):
+        return _to_list(converter(parse_format(data_format).base))
+    if column_type in ('SMALLINT', 'INTEGER', 'BIGINT'):
+        return _to_int
+    if column_type in ('REAL', 'FLOAT'):
+        return _to_float
+    if column_type == 'BOOLEAN':
+        return _to_bool
+    return _to_str
+
+
+class _Layout:
+    """
+    Columns and value converters of a writer, compiled once for an ordered list of
+    registers (the read plan of the ``Poller``), so every scan is stored positionally
+    without any per-scan string building.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are stored.
+    :type tags: List[Register]
+
+    :ivar columns: Table column names in the order of ``tags``.
+    :type columns: List[str]
+    """
+    def __init__(self, config: Config, tags: List[Register]) -> None:
+        self._config: Config = config
+        self._tags: List[Register] = list(tags)
+        self.columns: List[str] = [column_name(tag) for tag in self._tags]
+        self._converters: List[Callable] = [converter(tag.format) for tag in self._tags]
+
+    @property
+    def schema_version(self) -> str:
+        """
+        Returns the short digest identifying the current table layout.
+
+        :return: Hex digest of the table name, column names and types.
+        :rtype: str
+        """
+        layout: str = ','.join(f'{column}:{tag.format}'
+                               for column, tag in zip(self.columns, self._tags))
+        return hashlib.md5(f'{self._config.table}|{layout}'.encode()).hexdigest()[:12]
+
+    def row(self, values: List) -> List:
+        """
+        Converts the list of decoded values into the list of storage values.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :return: Converted values in the order of ``columns``.
+        :rtype: List
+        """
+        return [convert(value) for convert, value in zip(self._converters, values)]
+
+
+class Writer(_Layout, ABC):
+    """
+    Base class of the storage writers.
+
+    Writers implement :meth:`prepare` and :meth:`write`; an incomplete writer can not
+    be instantiated.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+
+    :ivar columns: Table column names in the order of ``tags``.
+    :type columns: List[str]
+    """
+    @abstractmethod
+    def prepare(self) -> None:
+        """
+        Creates or migrates the storage schema and compiles the insert statement.
+
+        :return: nothing
+        :rtype: None
+        """
+
+    @abstractmethod
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Stores a single scan.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Stores several scans at once.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        timestamps = timestamps or [None] * len(scans)
+        for values, timestamp in zip(scans, timestamps):
+            self.write(values, timestamp)
+
+    def write_events(self, events: List[Event]) -> None:
+        """
+        Stores alarm events into the ``<table>_events`` table, writers without an event
+        table drop them.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+
+    def close(self) -> None:
+        """
+        Releases the resources held by the writer.
+
+        :return: nothing
+        :rtype: None
+        """
+
+
+class AsyncWriter(_Layout, ABC):
+    """
+    Base class of the storage writers whose methods are coroutines, so acquisition and
+    storage of many devices can share one event loop. :class:`SyncWriter` serves an
+    async writer behind the blocking :class:`Writer` interface.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+
+    :ivar columns: Table column names in the order of ``tags``.
+    :type columns: List[str]
+    """
+    @abstractmethod
+    async def prepare(self) -> None:
+        """
+        Creates or migrates the storage schema and compiles the insert statement.
+
+        :return: nothing
+        :rtype: None
+        """
+
+    @abstractmethod
+    async def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Stores a single scan.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+
+    async def write_many(self, scans: List[List],
+                         timestamps: Optional[List[float]] = None) -> None:
+        """
+        Stores several scans at once.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        timestamps = timestamps or [None] * len(scans)
+        for values, timestamp in zip(scans, timestamps):
+            await self.write(values, timestamp)
+
+    async def write_events(self, events: List[Event]) -> None:
+        """
+        Stores alarm events into the ``<table>_events`` table, writers without an event
+        table drop them.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+
+    async def close(self) -> None:
+        """
+        Releases the resources held by the writer.
+
+        :return: nothing
+        :rtype: None
+        """
+
+
+class _StorageLoop:
+    """
+    The event loop serving every :class:`SyncWriter` of the process in a thread of its
+    own, started by the first writer and stopped once the last one is closed.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._users: int = 0
+
+    def acquire(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name='mbir-storage', daemon=True)
+                self._thread.start()
+            self._users += 1
+            return self._loop
+
+    def release(self) -> None:
+        with self._lock:
+            self._users -= 1
+            if self._users or self._loop is None:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+_storage_loop: _StorageLoop = _StorageLoop()
+
+
+class SyncWriter(Writer):
+    """
+    Serves an :class:`AsyncWriter` behind the blocking :class:`Writer` interface.
+
+    The async writers of all devices run on one event loop in a thread of its own,
+    every call blocks until its coroutine completes and raises its exceptions. Single
+    scans are buffered and stored with :meth:`AsyncWriter.write_many` every ``batch``
+    scans (and on close), so a writer storing large batches with ``COPY`` gets them
+    from the collector too.
+
+    :param writer: The async writer.
+    :type writer: AsyncWriter
+    :param batch: Number of scans stored at once.
+    :type batch: int
+    """
+    def __init__(self, writer: AsyncWriter, batch: int = 1) -> None:
+        super().__init__(config=writer._config, tags=writer._tags)
+        self._writer: AsyncWriter = writer
+        self._batch: int = max(1, batch)
+        self._scans: List[List] = []
+        self._timestamps: List[Optional[float]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = _storage_loop.acquire()
+
+    @property
+    def writer(self) -> AsyncWriter:
+        return self._writer
+
+    def _run(self, method: Callable[..., Awaitable], *args: Any) -> Any:
+        if self._loop is None:
+            raise RuntimeError('Error@SyncWriter.', 'The writer is closed.')
+        return asyncio.run_coroutine_threadsafe(method(*args), self._loop).result()
+
+    def prepare(self) -> None:
+        """
+        Prepares the async writer.
+
+        :return: nothing
+        :rtype: None
+        """
+        self._run(self._writer.prepare)
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Buffers a single scan and stores the buffered scans once there are ``batch``
+        of them.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        if self._loop is None:
+            raise RuntimeError('Error@SyncWriter.', 'The writer is closed.')
+        self._scans.append(values)
+        self._timestamps.append(timestamp)
+        if len(self._scans) >= self._batch:
+            self.flush()
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Stores the buffered scans and then several scans at once with the async writer.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        self.flush()
+        self._run(self._writer.write_many, scans, timestamps)
+
+    def flush(self) -> None:
+        """
+        Stores the buffered scans with the async writer.
+
+        :return: nothing
+        :rtype: None
+        """
+        if not self._scans:
+            return
+        # A failed batch is not retried, the next scans get a clean buffer
+        scans, timestamps = self._scans, self._timestamps
+        self._scans, self._timestamps = [], []
+        self._run(self._writer.write_many, scans, timestamps)
+
+    def write_events(self, events: List[Event]) -> None:
+        """
+        Stores alarm events with the async writer.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+        self._run(self._writer.write_events, events)
+
+    def close(self) -> None:
+        """
+        Stores the buffered scans, closes the async writer and releases the event loop.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._loop is None:
+            return
+        try:
+            self.flush()
+        finally:
+            try:
+                self._run(self._writer.close)
+            finally:
+                self._loop = None
+                _storage_loop.release()
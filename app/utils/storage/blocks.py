@@ -0,0 +1,172 @@
+"""
+This module provides with compressed columnar files storage writer for edge deployments.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from app.utils import columnar
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer, sql_type
+
+
+# Column kinds of the block encoder of the PostgreSQL column types
+KINDS: Dict[str, str] = {'SMALLINT': 'int', 'INTEGER': 'int', 'BIGINT': 'int',
+                         'REAL': 'float', 'FLOAT': 'float', 'BOOLEAN': 'bool', }
+
+# Microseconds per day, the files are split by UTC days of the epoch
+DAY: int = 86400 * 10 ** 6
+
+
+def column_kinds(tags: List[Register]) -> List[str]:
+    """
+    Returns the block encoder kinds of the registers.
+
+    :param tags: Registers in the order of the columns.
+    :type tags: List[Register]
+    :return: Column kinds in the order of ``tags``, strings and arrays are 'str' and
+             'list'.
+    :rtype: List[str]
+    """
+    kinds: List[str] = []
+    for tag in tags:
+        column_type: str = sql_type(tag.format)
+        if column_type.endswith('[]'):
+            kinds.append('list')
+        elif column_type.startswith('VARCHAR'):
+            kinds.append('str')
+        else:
+            kinds.append(KINDS[column_type])
+    return kinds
+
+
+class BlockWriter(Writer):
+    """
+    Stores scans into daily files of compressed columnar blocks.
+
+    Scans are buffered and encoded as one block every ``batch`` scans, appended to
+    ``<path>/<table>/<YYYY-MM-DD>-<schema version>.mbc`` (the day of the scans, UTC;
+    a batch crossing midnight is split into a block per day). A file starts with a
+    header describing the columns, so it stays readable after the configuration
+    changes.
+
+    :param path: Root directory of the files.
+    :type path: str
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    :param batch: Number of scans encoded as one block.
+    :type batch: int
+    """
+    def __init__(self, path: str, config: Config, tags: List[Register], batch: int = 100) -> None:
+        super().__init__(config=config, tags=tags)
+        self._path: str = path
+        self._batch: int = max(1, batch)
+        self._kinds: List[str] = column_kinds(self._tags)
+        self._timestamps: List[int] = []
+        self._buffer: List[List] = []
+
+    @property
+    def header(self) -> Dict:
+        """
+        Returns the header of the files written by the writer.
+
+        :return: Table, schema version, columns, formats and encoder kinds.
+        :rtype: Dict
+        """
+        return {'table': self._config.table, 'version': self.schema_version,
+                'columns': self.columns, 'formats': [tag.format for tag in self._tags],
+                'kinds': self._kinds}
+
+    def prepare(self) -> None:
+        """
+        Creates the directory of the table.
+
+        :return: nothing
+        :rtype: None
+        """
+        os.makedirs(os.path.join(self._path, self._config.table), exist_ok=True)
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Buffers a single scan and writes a block once ``batch`` scans are buffered.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        self.write_many([values], [timestamp])
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Buffers several scans and writes the full blocks.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        now: float = time.time()
+        timestamps = timestamps or [None] * len(scans)
+        for timestamp, values in zip(timestamps, scans):
+            self._timestamps.append(int((now if timestamp is None else timestamp) * 1e6))
+            self._buffer.append(self.row(values))
+            if len(self._buffer) >= self._batch:
+                self.flush()
+
+    def flush(self) -> None:
+        """
+        Encodes the buffered scans as a block per day and appends them to their files.
+
+        :return: nothing
+        :rtype: None
+        """
+        if not self._buffer:
+            return
+        days: List[int] = [timestamp // DAY for timestamp in self._timestamps]
+        start: int = 0
+        # A batch crossing midnight is split into a block per daily file
+        for end in range(1, len(days) + 1):
+            if end < len(days) and days[end] == days[start]:
+                continue
+            block: bytes = columnar.encode_block(self._timestamps[start:end],
+                                                 [list(column) for column
+                                                  in zip(*self._buffer[start:end])],
+                                                 self._kinds)
+            day: str = datetime.fromtimestamp(days[start] * DAY / 1e6,
+                                              tz=timezone.utc).strftime('%Y-%m-%d')
+            path: str = os.path.join(self._path, self._config.table,
+                                     f'{day}-{self.schema_version}.mbc')
+            with open(path, 'ab') as stream:
+                if not stream.tell():
+                    columnar.write_header(stream, self.header)
+                columnar.write_block(stream, block)
+            start = end
+        self._timestamps = []
+        self._buffer = []
+
+    def close(self) -> None:
+        """
+        Writes the buffered scans.
+
+        :return: nothing
+        :rtype: None
+        """
+        self.flush()
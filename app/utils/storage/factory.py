@@ -0,0 +1,83 @@
+"""
+This module provides with the factory of storage writers.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+from typing import List
+
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer
+
+
+def create_writer(config: Config, tags: List[Register], connection=None) -> Writer:
+    """
+    Creates the storage writer selected by ``config.storage.type``.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to the writer.
+    :type tags: List[Register]
+    :param connection: An open psycopg2 connection used by the 'postgres' storage;
+                       a new one is opened if omitted. The 'postgres_async' storage
+                       opens its own psycopg 3 connection.
+    :raises ValueError: If the storage type is unknown or its settings are incomplete.
+    :return: A storage writer.
+    :rtype: Writer
+    """
+    storage = config.storage
+    if storage.type == 'postgres':
+        from app.utils.storage.postgres import PostgresWriter
+        if connection is None:
+            import psycopg2
+            from app.config import POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+            connection = psycopg2.connect(host=POSTGRES_HOST, database=POSTGRES_DB,
+                                          user=POSTGRES_USER, password=POSTGRES_PASSWORD)
+        return PostgresWriter(connection=connection, config=config, tags=tags)
+    if storage.type == 'postgres_async':
+        from psycopg.conninfo import make_conninfo
+        from app.config import POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+        from app.utils.storage.base import SyncWriter
+        from app.utils.storage.postgres_async import AsyncPostgresWriter
+        conninfo: str = make_conninfo(host=POSTGRES_HOST, dbname=POSTGRES_DB,
+                                      user=POSTGRES_USER, password=POSTGRES_PASSWORD)
+        # Scans of the collector reach the writer in batches, large ones are stored with COPY
+        return SyncWriter(AsyncPostgresWriter(connection=None, config=config, tags=tags,
+                                              conninfo=conninfo), batch=storage.batch)
+    if storage.type in ('sqlite', 'parquet', 'blocks') and not storage.path:
+        raise ValueError('Error@create_writer.',
+                         f'{storage.type} storage requires a path.')
+    if storage.type == 'sqlite':
+        from app.utils.storage.sqlite import SQLiteWriter
+        return SQLiteWriter(path=storage.path, config=config, tags=tags, batch=storage.batch)
+    if storage.type == 'parquet':
+        from app.utils.storage.parquet import ParquetWriter
+        return ParquetWriter(path=storage.path, config=config, tags=tags, batch=storage.batch)
+    if storage.type == 'blocks':
+        from app.utils.storage.blocks import BlockWriter
+        return BlockWriter(path=storage.path, config=config, tags=tags, batch=storage.batch)
+    if storage.type == 'mqtt':
+        return create_publisher(config=config, tags=tags)
+    raise ValueError('Error@create_writer.',
+                     f'Unknown storage type {storage.type}')
+
+
+def create_publisher(config: Config, tags: List[Register]) -> Writer:
+    """
+    Creates the writer publishing scans as selected by ``config.publish``.
+
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to the writer.
+    :type tags: List[Register]
+    :raises ImportError: If the MQTT client or the payload encoder is not installed.
+    :return: A publishing writer.
+    :rtype: Writer
+    """
+    from app.utils.storage.mqtt import MqttWriter
+    return MqttWriter(settings=config.publish, config=config, tags=tags)
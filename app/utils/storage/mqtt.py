@@ -0,0 +1,227 @@
+"""
+This module provides with writer publishing scans to an MQTT broker.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+try:
+    import paho.mqtt.client as mqtt
+except ImportError:  # pragma: no cover - optional dependency
+    mqtt = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+from app.utils.pydantic.models import Config, Publish, Register
+from app.utils.storage.base import Writer
+
+
+class _Topic:
+    """
+    Batch of scans pending for one topic.
+    """
+    __slots__ = ('name', 'indexes', 'last', 'keyframe', 'scans', 'started')
+
+    def __init__(self, name: str, indexes: List[int]) -> None:
+        self.name: str = name
+        self.indexes: List[int] = indexes
+        self.last: Optional[List] = None
+        self.keyframe: float = 0.0
+        self.scans: List = []
+        self.started: float = 0.0
+
+
+class MqttWriter(Writer):
+    """
+    Publishes scans to an MQTT broker in compact batches.
+
+    Registers are published to ``<topic>`` or to ``<topic>/<register topic>``, each
+    topic batching its own scans. A retained ``<topic>/schema`` message lists the
+    column names of every topic; a batch is ``[schema_version, [[timestamp_us,
+    {position: value}], ...]]`` where a scan carries the changed values only (scans
+    without changes are not published), except for a full snapshot every ``keyframe``
+    seconds.
+
+    A batch is published once it holds ``batch`` scans or is ``linger`` milliseconds
+    old. With QoS 1 and 2 at most ``window`` messages await acknowledgement; a scan
+    that finds the window full waits up to ``block`` seconds, which slows the
+    collector down to the speed of the broker, and then drops its batch.
+
+    :param settings: The publishing settings.
+    :type settings: Publish
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    :param client: A paho-mqtt compatible client; one is created on prepare if omitted.
+    """
+    def __init__(self, settings: Publish, config: Config, tags: List[Register],
+                 client=None) -> None:
+        if client is None and mqtt is None:
+            raise ImportError('Error@MqttWriter.',
+                              'paho-mqtt is required for the MQTT publishing.')
+        if settings.format == 'msgpack' and msgpack is None:
+            raise ImportError('Error@MqttWriter.',
+                              'msgpack is required for the msgpack payload format.')
+        super().__init__(config=config, tags=tags)
+        self._settings: Publish = settings
+        self._client = client
+        self._root: str = settings.topic.replace('{table}', config.table)
+        topics: Dict[str, List[int]] = {}
+        for index, tag in enumerate(self._tags):
+            name: str = f'{self._root}/{tag.topic}' if tag.topic else self._root
+            topics.setdefault(name, []).append(index)
+        self._topics: List[_Topic] = [_Topic(name, indexes) for name, indexes in topics.items()]
+        self._encode: Callable[[Any], bytes] = msgpack.packb if settings.format == 'msgpack' \
+            else lambda payload: json.dumps(payload, separators=(',', ':')).encode()
+        self._window = threading.Condition()
+        self._in_flight: Set[int] = set()
+        self._acknowledged: Set[int] = set()
+        self._counters: Dict[str, int] = {'messages': 0, 'scans': 0, 'dropped': 0}
+        self._version: str = self.schema_version
+
+    def prepare(self) -> None:
+        """
+        Connects to the broker and publishes the retained schema.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._client is None:
+            if hasattr(mqtt, 'CallbackAPIVersion'):
+                self._client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+            else:
+                self._client = mqtt.Client()
+            self._client.max_inflight_messages_set(self._settings.window)
+            self._client.connect(self._settings.host, self._settings.port)
+        self._client.on_publish = self._on_publish
+        self._client.loop_start()
+        schema: Dict = {'version': self._version,
+                        'topics': {topic.name: [self.columns[index] for index in topic.indexes]
+                                   for topic in self._topics}}
+        # The schema is tracked like the batches, so its acknowledgement is matched too
+        self._track(self._client.publish(f'{self._root}/schema', self._encode(schema),
+                                         qos=self._settings.qos, retain=True))
+
+    def _on_publish(self, client, userdata, mid: int, *args) -> None:
+        if not self._settings.qos:
+            return
+        # Acknowledgements may overtake the registration of the message
+        with self._window:
+            if mid in self._in_flight:
+                self._in_flight.discard(mid)
+                self._window.notify_all()
+            else:
+                self._acknowledged.add(mid)
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Adds a single scan to the batches and publishes the batches that are due.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        now: float = time.time()
+        timestamp = now if timestamp is None else timestamp
+        row: List = self.row(values)
+        for topic in self._topics:
+            current: List = [row[index] for index in topic.indexes]
+            if topic.last is None or now - topic.keyframe >= self._settings.keyframe:
+                changes: Dict[int, Any] = dict(enumerate(current))
+                topic.keyframe = now
+            else:
+                changes = {position: value for position, (value, previous)
+                           in enumerate(zip(current, topic.last)) if value != previous}
+            topic.last = current
+            if changes:
+                if not topic.scans:
+                    topic.started = now
+                topic.scans.append([int(timestamp * 1e6), changes])
+            # A pending batch lingers at most ``linger`` even if no value changes
+            if topic.scans and (len(topic.scans) >= self._settings.batch or
+                                (now - topic.started) * 1000 >= self._settings.linger):
+                self._flush(topic)
+        self._counters['scans'] += 1
+
+    def _flush(self, topic: _Topic) -> None:
+        scans, topic.scans = topic.scans, []
+        if not scans:
+            return
+        if self._settings.format == 'json':
+            # JSON objects only have string keys
+            scans = [[stamp, {str(position): value for position, value in changes.items()}]
+                     for stamp, changes in scans]
+        payload: bytes = self._encode([self._version, scans])
+        if self._settings.qos and not self._wait(self._settings.block):
+            self._counters['dropped'] += len(scans)
+            # The consumers must not apply the next changes to values they missed
+            topic.last = None
+            return
+        self._track(self._client.publish(topic.name, payload, qos=self._settings.qos))
+        self._counters['messages'] += 1
+
+    def _track(self, info) -> None:
+        if not self._settings.qos:
+            return
+        with self._window:
+            if info.mid in self._acknowledged:
+                self._acknowledged.discard(info.mid)
+            else:
+                self._in_flight.add(info.mid)
+
+    def _wait(self, timeout: float) -> bool:
+        with self._window:
+            return self._window.wait_for(lambda: len(self._in_flight) < self._settings.window,
+                                         timeout=timeout)
+
+    def flush(self) -> None:
+        """
+        Publishes all pending batches.
+
+        :return: nothing
+        :rtype: None
+        """
+        for topic in self._topics:
+            self._flush(topic)
+
+    def close(self) -> None:
+        """
+        Publishes the pending batches, waits for their acknowledgement and disconnects.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._client is None:
+            return
+        self.flush()
+        with self._window:
+            self._window.wait_for(lambda: not self._in_flight, timeout=self._settings.block)
+        self._client.disconnect()
+        self._client.loop_stop()
+
+    def stats(self) -> Dict:
+        """
+        Returns the counters of the writer.
+
+        :return: Numbers of published messages, scans and dropped scans, and of the
+                 messages awaiting acknowledgement.
+        :rtype: Dict
+        """
+        return {**self._counters, 'in_flight': len(self._in_flight)}
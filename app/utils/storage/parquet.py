@@ -0,0 +1,182 @@
+"""
+This module provides with Parquet files storage writer for edge deployments.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer, sql_type
+
+
+# Arrow types of the PostgreSQL column types
+ARROW_TYPES: Dict[str, str] = {'SMALLINT': 'int16', 'INTEGER': 'int32', 'BIGINT': 'int64',
+                               'REAL': 'float32', 'FLOAT': 'float64', 'BOOLEAN': 'bool_', }
+
+
+def arrow_type(data_format: str):
+    """
+    Returns the Arrow type of a register format.
+
+    :param data_format: The format of the register.
+    :type data_format: str
+    :return: The Arrow data type, a list type for arrays.
+    :rtype: pyarrow.DataType
+    """
+    column_type: str = sql_type(data_format)
+    scalar: str = column_type.removesuffix('[]')
+    result = pa.string() if scalar.startswith('VARCHAR') else getattr(pa, ARROW_TYPES[scalar])()
+    return pa.list_(result) if column_type.endswith('[]') else result
+
+
+class ParquetWriter(Writer):
+    """
+    Stores scans into hourly partitioned Parquet files.
+
+    Scans are buffered in memory and written as one row group every ``batch`` scans
+    to ``<path>/<table>/date=YYYY-MM-DD/hour=HH/part-<timestamp>.parquet``. Scans are
+    partitioned by their own timestamps, a new file is started whenever a scan falls
+    into another partition.
+
+    :param path: Root directory of the dataset.
+    :type path: str
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    :param batch: Number of scans written as one row group.
+    :type batch: int
+    """
+    def __init__(self, path: str, config: Config, tags: List[Register], batch: int = 100) -> None:
+        if pa is None:
+            raise ImportError('Error@ParquetWriter.',
+                              'pyarrow is required for the Parquet storage.')
+        super().__init__(config=config, tags=tags)
+        self._path: str = path
+        self._batch: int = max(1, batch)
+        self._timestamps: List[float] = []
+        self._buffer: List[List] = []
+        self._schema = None
+        self._file = None
+        self._partition: Optional[str] = None
+
+    def prepare(self) -> None:
+        """
+        Compiles the Arrow schema of the dataset.
+
+        :return: nothing
+        :rtype: None
+        """
+        fields: List = [pa.field('datetime', pa.timestamp('us', tz='UTC'))]
+        fields.extend(pa.field(column, arrow_type(tag.format))
+                      for column, tag in zip(self.columns, self._tags))
+        self._schema = pa.schema(fields)
+
+    def _partition_of(self, timestamp: float) -> str:
+        moment: datetime = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+        return os.path.join(self._path, self._config.table,
+                            f'date={moment:%Y-%m-%d}', f'hour={moment:%H}')
+
+    def _open(self, partition: str, timestamp: float) -> None:
+        if partition == self._partition and self._file is not None:
+            return
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(partition, exist_ok=True)
+        self._file = pq.ParquetWriter(os.path.join(partition, f'part-{int(timestamp * 1e6)}.parquet'),
+                                      self._schema, compression='zstd')
+        self._partition = partition
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Buffers a single scan and writes a row group once the buffer reaches ``batch``
+        scans.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        self.write_many([values], [timestamp])
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Buffers several scans and writes a row group once the buffer reaches ``batch``
+        scans.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        if not self._tags:
+            return
+        now: float = time.time()
+        timestamps = timestamps or [None] * len(scans)
+        for timestamp, values in zip(timestamps, scans):
+            self._timestamps.append(now if timestamp is None else timestamp)
+            self._buffer.append(self.row(values))
+        if len(self._buffer) >= self._batch:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered scans as a row group per partition.
+
+        :return: nothing
+        :rtype: None
+        """
+        if not self._buffer:
+            return
+        if self._schema is None:
+            self.prepare()
+        partitions: List[str] = [self._partition_of(timestamp) for timestamp in self._timestamps]
+        start: int = 0
+        # A batch crossing an hour boundary is split into a row group per partition
+        for end in range(1, len(partitions) + 1):
+            if end < len(partitions) and partitions[end] == partitions[start]:
+                continue
+            self._open(partitions[start], self._timestamps[start])
+            columns: List = [[datetime.fromtimestamp(timestamp, tz=timezone.utc)
+                              for timestamp in self._timestamps[start:end]]]
+            columns.extend(list(column) for column in zip(*self._buffer[start:end]))
+            self._file.write_table(pa.Table.from_arrays(columns, schema=self._schema),
+                                   row_group_size=end - start)
+            start = end
+        self._timestamps = []
+        self._buffer = []
+
+    def close(self) -> None:
+        """
+        Writes the buffered scans and closes the current file.
+
+        :return: nothing
+        :rtype: None
+        """
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+        self._file = None
+        self._partition = None
@@ -0,0 +1,79 @@
+"""
+This module provides with storage writer forwarding scans to another process.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import threading
+import time
+from typing import List, Optional
+
+from app.utils.alarms import Event
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer
+
+
+class PipeWriter(Writer):
+    """
+    Forwards scans through a ``multiprocessing`` pipe as ``(table, timestamp, values)``
+    tuples and alarm events as ``(table, events)`` tuples; the process reading the pipe
+    stores them with a real writer.
+
+    Sending blocks while the pipe buffer is full, which slows the polling process
+    down to the speed of the storage.
+
+    :param connection: The sending end of a ``multiprocessing.Pipe``.
+    :param lock: A lock shared by all writers sending through the same pipe.
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    """
+    def __init__(self, connection, lock: threading.Lock,
+                 config: Config, tags: List[Register]) -> None:
+        super().__init__(config=config, tags=tags)
+        self._connection = connection
+        self._lock: threading.Lock = lock
+
+    def prepare(self) -> None:
+        """
+        Does nothing, the schema is managed by the storing process.
+
+        :return: nothing
+        :rtype: None
+        """
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Sends a single scan through the pipe.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        item = (self._config.table, time.time() if timestamp is None else timestamp, values)
+        with self._lock:
+            self._connection.send(item)
+
+    def write_events(self, events: List[Event]) -> None:
+        """
+        Sends alarm events through the pipe as a ``(table, events)`` tuple.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+        if not events:
+            return
+        with self._lock:
+            self._connection.send((self._config.table, list(events)))
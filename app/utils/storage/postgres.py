@@ -0,0 +1,242 @@
+"""
+This module provides with PostgreSQL storage writer.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+from typing import List, Optional
+
+from app.utils.alarms import Event
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer, sql_type
+
+
+TABLE_EXISTS_QUERY: str = 'SELECT EXISTS (SELECT 1 FROM information_schema.tables ' \
+                          'WHERE table_name = %s);'
+COLUMNS_QUERY: str = 'SELECT column_name FROM information_schema.columns WHERE table_name = %s;'
+
+
+def create_table_query(table: str, columns: List[str], tags: List[Register]) -> str:
+    """
+    Builds the query creating the wide table of the collector.
+
+    :param table: The table name.
+    :type table: str
+    :param columns: Column names in the order of ``tags``.
+    :type columns: List[str]
+    :param tags: Registers stored in the table.
+    :type tags: List[Register]
+    :return: CREATE TABLE query.
+    :rtype: str
+    """
+    header: List[str] = [f'{column} {sql_type(tag.format)}' for column, tag in zip(columns, tags)]
+    return f'CREATE TABLE {table} (' \
+           f'id SERIAL PRIMARY KEY, ' \
+           f'datetime TIMESTAMPTZ DEFAULT NOW(), ' \
+           f'{", ".join(header)}' \
+           f');'
+
+
+def create_events_query(table: str) -> str:
+    """
+    Builds the query creating the alarm event table of the collector.
+
+    :param table: The table name of the collector.
+    :type table: str
+    :return: CREATE TABLE and CREATE INDEX queries.
+    :rtype: str
+    """
+    return f'CREATE TABLE IF NOT EXISTS {table}_events (' \
+           f'id SERIAL PRIMARY KEY, ' \
+           f'datetime TIMESTAMPTZ NOT NULL, ' \
+           f'tag VARCHAR(64) NOT NULL, ' \
+           f'kind VARCHAR(4) NOT NULL, ' \
+           f'active BOOLEAN NOT NULL, ' \
+           f'value FLOAT8, ' \
+           f'threshold FLOAT8' \
+           f'); ' \
+           f'CREATE INDEX IF NOT EXISTS {table}_events_datetime ON {table}_events (datetime);'
+
+
+def insert_events_query(table: str) -> str:
+    """
+    Builds the query storing an alarm event of the collector.
+
+    :param table: The table name of the collector.
+    :type table: str
+    :return: INSERT query taking the fields of an ``Event``.
+    :rtype: str
+    """
+    return f'INSERT INTO {table}_events (datetime, tag, kind, active, value, threshold) ' \
+           f'VALUES (TO_TIMESTAMP(%s), %s, %s, %s, %s, %s);'
+
+
+def add_columns_query(table: str, columns: List[str], tags: List[Register],
+                      existing: List[str]) -> str:
+    """
+    Builds the query adding the columns missing in the existing table.
+
+    :param table: The table name.
+    :type table: str
+    :param columns: Column names in the order of ``tags``.
+    :type columns: List[str]
+    :param tags: Registers stored in the table.
+    :type tags: List[Register]
+    :param existing: Column names already present in the table.
+    :type existing: List[str]
+    :return: ALTER TABLE query, or an empty string if nothing is missing.
+    :rtype: str
+    """
+    existing = [column.lower() for column in existing]
+    header: List[str] = [f'ADD COLUMN {column} {sql_type(tag.format)}'
+                         for column, tag in zip(columns, tags) if column not in existing]
+    return f'ALTER TABLE {table} {", ".join(header)};' if header else ''
+
+
+class PostgresWriter(Writer):
+    """
+    Stores scans into the wide ``config.table`` table using a server-side prepared
+    INSERT statement.
+
+    The statement is prepared once per schema version, so the server parses it only
+    when the register map changes, and each scan is sent as ``EXECUTE`` with
+    positional parameters.
+
+    :param connection: An open psycopg2 connection.
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    """
+    def __init__(self, connection, config: Config, tags: List[Register]) -> None:
+        super().__init__(config=config, tags=tags)
+        self._connection = connection
+        self._statement: Optional[str] = None
+        self._execute: Optional[str] = None
+
+    @property
+    def statement(self) -> str:
+        """
+        Returns the name of the prepared insert statement of the current schema version.
+
+        :return: Prepared statement name.
+        :rtype: str
+        """
+        return f'mbir_insert_{self.schema_version}'
+
+    def _table_exists(self, cursor) -> bool:
+        cursor.execute(TABLE_EXISTS_QUERY, (self._config.table,))
+        return cursor.fetchone()[0]
+
+    def _migrate(self, cursor) -> None:
+        cursor.execute(create_events_query(self._config.table))
+        if not self._table_exists(cursor):
+            cursor.execute(create_table_query(self._config.table, self.columns, self._tags))
+            return
+        cursor.execute(COLUMNS_QUERY, (self._config.table,))
+        query: str = add_columns_query(self._config.table, self.columns, self._tags,
+                                       existing=[result[0] for result in cursor.fetchall()])
+        if query:
+            cursor.execute(query)
+
+    def prepare(self) -> None:
+        """
+        Creates or migrates the table and prepares the insert statement on the server.
+
+        Calling it again for the same schema version is a no-op.
+
+        :return: nothing
+        :rtype: None
+        """
+        statement: str = self.statement
+        if self._statement == statement:
+            return
+        with self._connection.cursor() as cursor:
+            self._migrate(cursor)
+            if self._statement:
+                cursor.execute(f'DEALLOCATE {self._statement};')
+            types: str = ', '.join(['FLOAT8'] + [sql_type(tag.format) for tag in self._tags])
+            params: str = ', '.join(f'${index}' for index in range(2, len(self._tags) + 2))
+            cursor.execute(f'PREPARE {statement} ({types}) AS '
+                           f'INSERT INTO {self._config.table} (datetime, {", ".join(self.columns)}) '
+                           f'VALUES (COALESCE(TO_TIMESTAMP($1), NOW()), {params});')
+        self._connection.commit()
+        self._statement = statement
+        self._execute = f'EXECUTE {statement} ({", ".join(["%s"] * (len(self._tags) + 1))});'
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Stores a single scan by executing the prepared insert statement.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the insert time is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        self.write_many([values], [timestamp])
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Stores several scans in a single transaction, rolled back if any of them fails.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        if not self._tags or not scans:
+            return
+        if self._execute is None:
+            self.prepare()
+        timestamps = timestamps or [None] * len(scans)
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.executemany(self._execute, [[timestamp] + self.row(values)
+                                                   for timestamp, values in zip(timestamps, scans)])
+            self._connection.commit()
+        except Exception:
+            # A failed statement aborts the transaction, the next writes need a clean one
+            self._connection.rollback()
+            raise
+
+    def write_events(self, events: List[Event]) -> None:
+        """
+        Stores alarm events into the ``<table>_events`` table in a single transaction.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+        if not events:
+            return
+        try:
+            with self._connection.cursor() as cursor:
+                cursor.executemany(insert_events_query(self._config.table), events)
+            self._connection.commit()
+        except Exception:
+            self._connection.rollback()
+            raise
+
+    def close(self) -> None:
+        """
+        Closes the connection, which also releases the prepared statement.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._connection:
+            self._connection.close()
+        self._statement = None
+        self._execute = None
@@ -0,0 +1,228 @@
+"""
+This module provides with asynchronous PostgreSQL storage writer based on psycopg 3.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import psycopg
+except ImportError:  # pragma: no cover - optional dependency
+    psycopg = None
+
+from app.utils.alarms import Event
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import AsyncWriter, sql_type
+from app.utils.storage.postgres import (TABLE_EXISTS_QUERY, COLUMNS_QUERY,
+                                        create_table_query, add_columns_query,
+                                        create_events_query, insert_events_query)
+
+
+# psycopg type names used to dump values in the binary COPY format
+COPY_TYPES: Dict[str, str] = {'SMALLINT': 'int2', 'INTEGER': 'int4', 'BIGINT': 'int8',
+                              'REAL': 'float4', 'FLOAT': 'float8', 'BOOLEAN': 'bool', }
+
+
+def copy_type(data_format: str) -> str:
+    """
+    Returns the psycopg type name dumping the values of a register format.
+
+    :param data_format: The format of the register.
+    :type data_format: str
+    :return: The type name, e.g. 'float4' or 'float4[]'.
+    :rtype: str
+    """
+    column_type: str = sql_type(data_format)
+    scalar: str = column_type.removesuffix('[]')
+    name: str = 'varchar' if scalar.startswith('VARCHAR') else COPY_TYPES[scalar]
+    return f'{name}[]' if column_type.endswith('[]') else name
+
+
+class AsyncPostgresWriter(AsyncWriter):
+    """
+    Stores scans into the wide ``config.table`` table over a psycopg 3
+    ``AsyncConnection``.
+
+    Single scans are sent as a prepared INSERT together with the COMMIT in one
+    pipeline round trip, batches of scans are streamed with binary ``COPY``.
+    The methods mirror :class:`PostgresWriter` but are coroutines, so the storage of
+    many devices shares one event loop; the collector serves it through
+    :class:`SyncWriter`, which hands it the scans in batches.
+
+    :param connection: An open ``psycopg.AsyncConnection``, opened from ``conninfo``
+                       by :meth:`prepare` if omitted.
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    :param copy_threshold: Minimal number of scans stored with ``COPY`` instead of
+                           pipelined INSERT statements.
+    :type copy_threshold: int
+    :param conninfo: libpq connection string used when no connection is given.
+    :type conninfo: Optional[str]
+    """
+    def __init__(self, connection, config: Config, tags: List[Register],
+                 copy_threshold: int = 16, conninfo: Optional[str] = None) -> None:
+        if psycopg is None:
+            raise ImportError('Error@AsyncPostgresWriter.',
+                              'psycopg (version 3) is required for the async backend.')
+        super().__init__(config=config, tags=tags)
+        self._connection = connection
+        self._conninfo: Optional[str] = conninfo
+        self._copy_threshold: int = copy_threshold
+        self._insert: Optional[str] = None
+        self._copy: Optional[str] = None
+        self._copy_types: List[str] = ['timestamptz'] + [copy_type(tag.format)
+                                                         for tag in self._tags]
+
+    @classmethod
+    async def connect(cls, conninfo: str, config: Config, tags: List[Register],
+                      **kwargs) -> 'AsyncPostgresWriter':
+        """
+        Opens a new ``AsyncConnection`` and creates the writer on top of it.
+
+        :param conninfo: libpq connection string.
+        :type conninfo: str
+        :param config: The collector configuration.
+        :type config: Config
+        :param tags: Registers in the order their values are passed to :meth:`write`.
+        :type tags: List[Register]
+        :return: A prepared writer.
+        :rtype: AsyncPostgresWriter
+        """
+        if psycopg is None:
+            raise ImportError('Error@AsyncPostgresWriter.connect.',
+                              'psycopg (version 3) is required for the async backend.')
+        connection = await psycopg.AsyncConnection.connect(conninfo)
+        writer = cls(connection=connection, config=config, tags=tags, **kwargs)
+        await writer.prepare()
+        return writer
+
+    async def prepare(self) -> None:
+        """
+        Creates or migrates the table, creates the alarm event table and compiles the
+        insert and copy statements.
+
+        :raises ValueError: If neither a connection nor a connection string is given.
+        :return: nothing
+        :rtype: None
+        """
+        if self._connection is None:
+            if not self._conninfo:
+                raise ValueError('Error@AsyncPostgresWriter.prepare.',
+                                 'A connection or a connection string is required.')
+            self._connection = await psycopg.AsyncConnection.connect(self._conninfo)
+        async with self._connection.cursor() as cursor:
+            await cursor.execute(TABLE_EXISTS_QUERY, (self._config.table,))
+            if not (await cursor.fetchone())[0]:
+                await cursor.execute(create_table_query(self._config.table,
+                                                        self.columns, self._tags))
+            else:
+                await cursor.execute(COLUMNS_QUERY, (self._config.table,))
+                query: str = add_columns_query(self._config.table, self.columns, self._tags,
+                                               existing=[result[0]
+                                                         for result in await cursor.fetchall()])
+                if query:
+                    await cursor.execute(query)
+            await cursor.execute(create_events_query(self._config.table))
+        await self._connection.commit()
+        columns: str = ", ".join(self.columns)
+        self._insert = f'INSERT INTO {self._config.table} (datetime, {columns}) ' \
+                       f'VALUES (COALESCE(TO_TIMESTAMP(%s), NOW()), ' \
+                       f'{", ".join(["%s"] * len(self._tags))});'
+        self._copy = f'COPY {self._config.table} (datetime, {columns}) FROM STDIN (FORMAT BINARY);'
+
+    async def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Stores a single scan; the prepared INSERT and the COMMIT share one round trip.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the insert time is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        await self.write_many([values], [timestamp])
+
+    async def write_many(self, scans: List[List],
+                         timestamps: Optional[List[float]] = None) -> None:
+        """
+        Stores several scans at once, either with pipelined INSERT statements or,
+        for large batches, with a single binary ``COPY``.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        if not self._tags or not scans:
+            return
+        if self._insert is None:
+            await self.prepare()
+        timestamps = timestamps or [None] * len(scans)
+        try:
+            if len(scans) >= self._copy_threshold:
+                now: float = time.time()
+                async with self._connection.cursor() as cursor:
+                    async with cursor.copy(self._copy) as copy:
+                        copy.set_types(self._copy_types)
+                        for timestamp, values in zip(timestamps, scans):
+                            moment = datetime.fromtimestamp(timestamp or now, tz=timezone.utc)
+                            await copy.write_row([moment] + self.row(values))
+                await self._connection.commit()
+                return
+            async with self._connection.pipeline():
+                async with self._connection.cursor() as cursor:
+                    for timestamp, values in zip(timestamps, scans):
+                        await cursor.execute(self._insert, [timestamp] + self.row(values),
+                                             prepare=True)
+                await self._connection.commit()
+        except Exception:
+            # A failed statement aborts the transaction, the next writes need a clean one
+            await self._connection.rollback()
+            raise
+
+    async def write_events(self, events: List[Event]) -> None:
+        """
+        Stores alarm events into the ``<table>_events`` table in a single transaction.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+        if not events:
+            return
+        try:
+            async with self._connection.cursor() as cursor:
+                await cursor.executemany(insert_events_query(self._config.table), events)
+            await self._connection.commit()
+        except Exception:
+            await self._connection.rollback()
+            raise
+
+    async def close(self) -> None:
+        """
+        Closes the connection.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._connection:
+            await self._connection.close()
+        self._connection = None
+        self._insert = None
+        self._copy = None
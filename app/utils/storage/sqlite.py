@@ -0,0 +1,202 @@
+"""
+This module provides with SQLite storage writer for edge deployments.
+
+"""
+
+__author__ = "Ilya Molodkin"
+__date__ = "2023-04-22"
+__version__ = "1.0"
+__license__ = "MIT License"
+
+
+import json
+import sqlite3
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from app.utils.alarms import Event
+from app.utils.pydantic.models import Config, Register
+from app.utils.storage.base import Writer, sql_type
+
+
+# SQLite column affinities of the PostgreSQL column types
+SQLITE_TYPES: Dict[str, str] = {'SMALLINT': 'INTEGER', 'INTEGER': 'INTEGER', 'BIGINT': 'INTEGER',
+                                'REAL': 'REAL', 'FLOAT': 'REAL', 'BOOLEAN': 'INTEGER', }
+
+
+def sqlite_type(data_format: str) -> str:
+    """
+    Returns the SQLite column affinity of a register format, arrays are stored as
+    JSON text.
+
+    :param data_format: The format of the register.
+    :type data_format: str
+    :return: The column affinity.
+    :rtype: str
+    """
+    column_type: str = sql_type(data_format)
+    if column_type.endswith('[]') or column_type.startswith('VARCHAR'):
+        return 'TEXT'
+    return SQLITE_TYPES[column_type]
+
+
+def _to_json(convert: Callable[[Any], Any]) -> Callable[[Any], Optional[str]]:
+    def dump(value: Any) -> Optional[str]:
+        value = convert(value)
+        return None if value is None else json.dumps(value)
+    return dump
+
+
+class SQLiteWriter(Writer):
+    """
+    Stores scans into a local SQLite database in WAL mode.
+
+    Scans are buffered and committed in a single transaction every ``batch`` scans, so
+    the database file is synced once per batch instead of once per scan. Scans written
+    without a timestamp are stamped when they are passed to the writer.
+
+    :param path: Path to the database file.
+    :type path: str
+    :param config: The collector configuration.
+    :type config: Config
+    :param tags: Registers in the order their values are passed to :meth:`write`.
+    :type tags: List[Register]
+    :param batch: Number of scans committed in one transaction.
+    :type batch: int
+    """
+    def __init__(self, path: str, config: Config, tags: List[Register], batch: int = 100) -> None:
+        super().__init__(config=config, tags=tags)
+        self._path: str = path
+        self._batch: int = max(1, batch)
+        self._buffer: List[List] = []
+        self._connection: Optional[sqlite3.Connection] = None
+        self._insert: Optional[str] = None
+        self._converters = [_to_json(convert) if sql_type(tag.format).endswith('[]') else convert
+                            for convert, tag in zip(self._converters, self._tags)]
+
+    def prepare(self) -> None:
+        """
+        Opens the database in WAL mode, creates or migrates the table and compiles
+        the insert statement.
+
+        :return: nothing
+        :rtype: None
+        """
+        if self._connection is None:
+            self._connection = sqlite3.connect(self._path, check_same_thread=False)
+            self._connection.execute('PRAGMA journal_mode=WAL;')
+            self._connection.execute('PRAGMA synchronous=NORMAL;')
+        table: str = self._config.table
+        existing: List[str] = [result[1].lower() for result in
+                               self._connection.execute(f'PRAGMA table_info({table});')]
+        if not existing:
+            header: List[str] = [f'{column} {sqlite_type(tag.format)}'
+                                 for column, tag in zip(self.columns, self._tags)]
+            self._connection.execute(f'CREATE TABLE {table} ('
+                                     f'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                     f'datetime TEXT DEFAULT (STRFTIME(\'%Y-%m-%d %H:%M:%f\', \'NOW\')), '
+                                     f'{", ".join(header)}'
+                                     f');')
+        else:
+            for column, tag in zip(self.columns, self._tags):
+                if column not in existing:
+                    self._connection.execute(f'ALTER TABLE {table} ADD COLUMN '
+                                             f'{column} {sqlite_type(tag.format)};')
+        self._connection.execute(f'CREATE TABLE IF NOT EXISTS {table}_events ('
+                                 f'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                                 f'datetime TEXT NOT NULL, tag TEXT NOT NULL, kind TEXT NOT NULL, '
+                                 f'active INTEGER NOT NULL, value REAL, threshold REAL);')
+        self._connection.commit()
+        self._insert = f'INSERT INTO {table} (datetime, {", ".join(self.columns)}) ' \
+                       f'VALUES ({", ".join(["?"] * (len(self._tags) + 1))});'
+
+    @staticmethod
+    def _datetime(timestamp: Optional[float]) -> str:
+        moment: datetime = datetime.fromtimestamp(timestamp, tz=timezone.utc) \
+            if timestamp is not None else datetime.now(timezone.utc)
+        return moment.strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        """
+        Buffers a single scan and commits the buffer once it reaches ``batch`` scans.
+
+        :param values: Decoded values in the order of ``tags``.
+        :type values: List
+        :param timestamp: Acquisition time of the scan as epoch seconds,
+                          the time of writing is used if omitted.
+        :type timestamp: Optional[float]
+        :return: nothing
+        :rtype: None
+        """
+        if not self._tags:
+            return
+        self._buffer.append([self._datetime(timestamp)] + self.row(values))
+        if len(self._buffer) >= self._batch:
+            self.flush()
+
+    def write_many(self, scans: List[List], timestamps: Optional[List[float]] = None) -> None:
+        """
+        Buffers several scans and commits the buffer once it reaches ``batch`` scans.
+
+        :param scans: A list of scans, each one a list of decoded values in the order
+                      of ``tags``.
+        :type scans: List[List]
+        :param timestamps: Acquisition times of the scans as epoch seconds.
+        :type timestamps: Optional[List[float]]
+        :return: nothing
+        :rtype: None
+        """
+        if not self._tags:
+            return
+        timestamps = timestamps or [None] * len(scans)
+        self._buffer.extend([self._datetime(timestamp)] + self.row(values)
+                            for timestamp, values in zip(timestamps, scans))
+        if len(self._buffer) >= self._batch:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Commits all buffered scans in a single transaction.
+
+        :return: nothing
+        :rtype: None
+        """
+        if not self._buffer:
+            return
+        if self._insert is None:
+            self.prepare()
+        with self._connection:
+            self._connection.executemany(self._insert, self._buffer)
+        self._buffer = []
+
+    def write_events(self, events: List[Event]) -> None:
+        """
+        Commits alarm events into the ``<table>_events`` table right away.
+
+        :param events: Alarms raised or cleared by a scan.
+        :type events: List[Event]
+        :return: nothing
+        :rtype: None
+        """
+        if not events:
+            return
+        if self._insert is None:
+            self.prepare()
+        with self._connection:
+            self._connection.executemany(
+                f'INSERT INTO {self._config.table}_events '
+                f'(datetime, tag, kind, active, value, threshold) VALUES (?, ?, ?, ?, ?, ?);',
+                [(self._datetime(event.timestamp),) + tuple(event[1:]) for event in events])
+
+    def close(self) -> None:
+        """
+        Commits the buffered scans and closes the database.
+
+        :return: nothing
+        :rtype: None
+        """
+        self.flush()
+        if self._connection:
+            self._connection.close()
+        self._connection = None
+        self._insert = None
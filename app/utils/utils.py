@@ -9,9 +9,50 @@ __version__ = "1.0"
 __license__ = "MIT License"
 
 
+import time
 from typing import Any, Union
 
 
+# Offset of the monotonic performance counter from the epoch, re-anchored by resyncEpochTime
+_EPOCH_OFFSET: float = time.time() - time.perf_counter()
+
+# Largest correction of the offset per re-anchoring while the clocks drift apart, in seconds
+MAX_EPOCH_SLEW: float = 0.001
+# A larger difference is a step of the system clock (e.g. the first NTP sync), taken at once
+EPOCH_STEP: float = 0.5
+
+
+def epochTime() -> float:
+    """
+    Return the current time as epoch seconds derived from the monotonic performance
+    counter: sub-microsecond resolution and cheap to take. The offset from the system
+    clock is kept by :func:`resyncEpochTime`.
+
+    :return: A float representing the current time as epoch seconds
+    :rtype: float
+    """
+    return _EPOCH_OFFSET + time.perf_counter()
+
+
+def resyncEpochTime() -> float:
+    """
+    Re-anchor :func:`epochTime` against the system clock.
+
+    Drift between the performance counter and the system clock is corrected by at
+    most ``MAX_EPOCH_SLEW`` per call, so consecutive timestamps never jump; a step of
+    the system clock beyond ``EPOCH_STEP`` is followed at once.
+
+    :return: The correction applied to the offset, in seconds
+    :rtype: float
+    """
+    global _EPOCH_OFFSET
+    error: float = time.time() - time.perf_counter() - _EPOCH_OFFSET
+    if abs(error) <= EPOCH_STEP:
+        error = max(-MAX_EPOCH_SLEW, min(MAX_EPOCH_SLEW, error))
+    _EPOCH_OFFSET += error
+    return error
+
+
 def isNumerical(value: Any) -> bool:
     """Checks if the input value can be converted to a floating-point number
     :param value: The value to check
@@ -0,0 +1,68 @@
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from pymodbus.constants import Endian
+from pymodbus.payload import BinaryPayloadBuilder
+
+from app.utils.coders import FORMATS, Block, Decoder, Encoder
+
+
+parser = argparse.ArgumentParser(description='Measure the throughput of the register coders.')
+parser.add_argument('--values', type=int, default=100000, help='values coded per format')
+parser.add_argument('--formats', nargs='*', default=list(FORMATS), choices=list(FORMATS),
+                    metavar='FORMAT', help='numeric formats to measure, all of them if omitted')
+parser.add_argument('--seed', type=int, default=0)
+
+args = parser.parse_args()
+
+# Byte and word order of the pymodbus payload builder per order suffix of a format
+ORDERS = {'AB CD': (Endian.BIG, Endian.BIG), 'CD AB': (Endian.BIG, Endian.LITTLE),
+          'BA DC': (Endian.LITTLE, Endian.BIG), 'DC BA': (Endian.LITTLE, Endian.LITTLE),
+          'AB CD EF GH': (Endian.BIG, Endian.BIG), 'GH EF CD AB': (Endian.BIG, Endian.LITTLE),
+          'BA DC FE HG': (Endian.LITTLE, Endian.BIG), 'HG FE DC BA': (Endian.LITTLE, Endian.LITTLE)}
+
+
+def builder(data_format: str) -> Callable[[float], List[int]]:
+    kind, _, order = data_format.partition(' ')
+    byteorder, wordorder = ORDERS.get(order, (Endian.BIG, Endian.BIG))
+    method: str = {'Signed': 'add_16bit_int', 'Unsigned': 'add_16bit_uint',
+                   'Long': 'add_32bit_int', 'Float': 'add_32bit_float',
+                   'Double': 'add_64bit_float'}[kind]
+
+    def build(value: float) -> List[int]:
+        payload = BinaryPayloadBuilder(byteorder=byteorder, wordorder=wordorder)
+        getattr(payload, method)(value)
+        return payload.to_registers()
+    return build
+
+
+def rate(function: Callable, values: List) -> float:
+    start: float = time.perf_counter()
+    for value in values:
+        function(value)
+    return len(values) / (time.perf_counter() - start)
+
+
+random.seed(args.seed)
+encoder: Encoder = Encoder()
+decoder: Decoder = Decoder()
+print(f'{"format":<20}{"encode/s":>12}{"pymodbus/s":>12}{"decode/s":>12}{"array/s":>12}')
+for data_format in args.formats:
+    cast, limits = FORMATS[data_format][2:]
+    low, high = limits or (-2 ** 31, 2 ** 31 - 1)
+    values: List = [random.randint(low, high) if cast is int else random.uniform(-1e6, 1e6)
+                    for _ in range(args.values)]
+    encoded: List[int] = encoder.encode_many([data_format] * len(values), values)
+    length: int = len(encoded) // len(values)
+    block: Block = Block(encoded)
+    offsets: List[int] = list(range(0, len(encoded), length))
+    encode: float = rate(lambda value: encoder.encode(data_format, value), values)
+    reference: float = rate(builder(data_format), values)
+    decode: float = rate(lambda offset: decoder.decode_at(block, offset, data_format), offsets)
+    # A whole block decoded as a single array register
+    start: float = time.perf_counter()
+    decoder.decode_at(Block(encoded), 0, f'{data_format}[{len(values)}]')
+    array: float = len(values) / (time.perf_counter() - start)
+    print(f'{data_format:<20}{encode:>12,.0f}{reference:>12,.0f}{decode:>12,.0f}{array:>12,.0f}')
@@ -0,0 +1,76 @@
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+from app.utils.columnar import decode_block, encode_block
+
+
+parser = argparse.ArgumentParser(description='Measure the size and the throughput of the '
+                                             'columnar block encoding.')
+parser.add_argument('--scans', type=int, default=10000, help='scans per block')
+parser.add_argument('--seed', type=int, default=0)
+
+args = parser.parse_args()
+
+
+def walk(step: Callable[[float], float], start: float) -> List[float]:
+    values: List[float] = []
+    for _ in range(args.scans):
+        start = step(start)
+        values.append(start)
+    return values
+
+
+def runs(pick: Callable[[], object], length: int) -> List:
+    values: List = []
+    while len(values) < args.scans:
+        values.extend([pick()] * length)
+    return values[:args.scans]
+
+
+def columns() -> Dict[str, Tuple[str, List]]:
+    # Synthetic columns shaped like the register values they stand for
+    rng = random.Random(args.seed)
+    return {
+        'coil (RLE)': ('bool', runs(lambda: rng.random() < 0.5, 100)),
+        'counter (DELTA)': ('int', walk(lambda value: value + rng.randint(0, 3), 0)),
+        'setpoint (DELTA)': ('int', runs(lambda: rng.randint(0, 1000), 500)),
+        'adjusted (DECIMAL)': ('float', walk(lambda value: round(value + rng.gauss(0, 0.05), 2),
+                                             50.0)),
+        'raw float (XOR)': ('float', walk(lambda value: value + rng.gauss(0, 0.001), 20.0)),
+        'gaps (DECIMAL)': ('float', [None if rng.random() < 0.1 else round(rng.uniform(0, 5), 1)
+                                     for _ in range(args.scans)]),
+        'state (str)': ('str', runs(lambda: rng.choice(('RUN', 'STOP', 'FAULT')), 200)),
+        'array (list)': ('list', runs(lambda: [round(rng.uniform(0, 1), 2)] * 4, 50)),
+    }
+
+
+def measure(timestamps: List[int], data: List[List], kinds: List[str]) -> Tuple[int, float, float]:
+    start: float = time.perf_counter()
+    block: bytes = encode_block(timestamps, data, kinds)
+    encoded: float = time.perf_counter() - start
+    start = time.perf_counter()
+    decode_block(block, kinds)
+    decoded: float = time.perf_counter() - start
+    return len(block), encoded, decoded
+
+
+random.seed(args.seed)
+timestamps: List[int] = [1_700_000_000_000_000 + index * 1_000_000 + random.randint(-500, 500)
+                         for index in range(args.scans)]
+empty: int = len(encode_block(timestamps, [], []))
+print(f'{args.scans} scans per block, timestamps take {empty / args.scans:.2f} bytes/scan')
+print(f'{"column":<20}{"bytes/sample":>14}{"JSON bytes":>12}{"encode/s":>14}{"decode/s":>14}')
+selected: Dict[str, Tuple[str, List]] = columns()
+for name, (kind, column) in selected.items():
+    size, encoded, decoded = measure(timestamps, [column], [kind])
+    text: int = len(json.dumps(column, separators=(',', ':')))
+    print(f'{name:<20}{(size - empty) / args.scans:>14.3f}{text / args.scans:>12.2f}'
+          f'{args.scans / encoded:>14,.0f}{args.scans / decoded:>14,.0f}')
+kinds: List[str] = [kind for kind, _ in selected.values()]
+size, encoded, decoded = measure(timestamps, [column for _, column in selected.values()], kinds)
+samples: int = args.scans * len(kinds)
+print(f'{"all columns":<20}{size / samples:>14.3f}{"":>12}'
+      f'{samples / encoded:>14,.0f}{samples / decoded:>14,.0f}')
@@ -0,0 +1,110 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.utils.pydantic.models import Config
+from app.utils.storage.base import Writer
+
+
+parser = argparse.ArgumentParser(description='Compare the throughput and the size of the storages.')
+parser.add_argument('--scans', type=int, default=20000, help='number of stored scans')
+parser.add_argument('--tags', type=int, default=50, help='registers per scan')
+parser.add_argument('--batch', type=int, default=100, help='scans stored at once')
+parser.add_argument('--storages', nargs='*', default=['postgres', 'sqlite', 'parquet'],
+                    choices=['postgres', 'sqlite', 'parquet'])
+parser.add_argument('--seed', type=int, default=0)
+
+args = parser.parse_args()
+
+
+def make_config(table: str) -> Config:
+    registers: Dict = {str(2 * index): {'name': f'T{index}', 'active': True, 'format': 'Float AB CD',
+                                        'type': 'REAL', 'adjustments': None}
+                       for index in range(args.tags)}
+    return Config(**{'ip': '127.0.0.1', 'table': table,
+                     'registers': {'03 Read Holding Registers': registers}})
+
+
+def size_of(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+
+def postgres(config: Config, tags: List) -> Optional[Tuple[Writer, Callable[[], int]]]:
+    import psycopg2
+    from app.config import POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+    from app.utils.storage.postgres import PostgresWriter
+    try:
+        connection = psycopg2.connect(host=POSTGRES_HOST, database=POSTGRES_DB, user=POSTGRES_USER,
+                                      password=POSTGRES_PASSWORD, connect_timeout=2)
+    except psycopg2.OperationalError as e:
+        print(f'postgres: skipped, {str(e).strip()}')
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {config.table}; '
+                       f'DROP TABLE IF EXISTS {config.table}_events;')
+    connection.commit()
+
+    def measure() -> int:
+        check = psycopg2.connect(host=POSTGRES_HOST, database=POSTGRES_DB, user=POSTGRES_USER,
+                                 password=POSTGRES_PASSWORD)
+        try:
+            with check.cursor() as cursor:
+                cursor.execute('SELECT pg_total_relation_size(%s);', (config.table,))
+                size: int = cursor.fetchone()[0]
+                cursor.execute(f'DROP TABLE {config.table}; DROP TABLE {config.table}_events;')
+            check.commit()
+        finally:
+            check.close()
+        return size
+    return PostgresWriter(connection=connection, config=config, tags=tags), measure
+
+
+def local(storage: str, config: Config, tags: List,
+          directory: str) -> Tuple[Writer, Callable[[], int]]:
+    if storage == 'sqlite':
+        from app.utils.storage.sqlite import SQLiteWriter
+        path: str = os.path.join(directory, 'bench.db')
+        writer: Writer = SQLiteWriter(path=path, config=config, tags=tags, batch=args.batch)
+    else:
+        from app.utils.storage.parquet import ParquetWriter
+        path = os.path.join(directory, 'parquet')
+        writer = ParquetWriter(path=path, config=config, tags=tags, batch=args.batch)
+    return writer, lambda: size_of(path)
+
+
+random.seed(args.seed)
+# A slowly drifting process, so the values compress like real measurements
+levels: List[float] = [random.uniform(0, 100) for _ in range(args.tags)]
+scans: List[List] = []
+for _ in range(args.scans):
+    levels = [round(level + random.gauss(0, 0.1), 2) for level in levels]
+    scans.append([str(level) for level in levels])
+started: float = time.time() - args.scans
+timestamps: List[float] = [started + index for index in range(args.scans)]
+samples: int = args.scans * args.tags
+
+print(f'{args.scans} scans of {args.tags} REAL registers, batches of {args.batch} scans')
+for storage in args.storages:
+    with tempfile.TemporaryDirectory() as directory:
+        config: Config = make_config(f'mbir_bench_{storage}')
+        tags: List = list(config.registers.AO.values())
+        created = postgres(config, tags) if storage == 'postgres' \
+            else local(storage, config, tags, directory)
+        if created is None:
+            continue
+        writer, measure = created
+        writer.prepare()
+        start: float = time.perf_counter()
+        for index in range(0, args.scans, args.batch):
+            writer.write_many(scans[index:index + args.batch], timestamps[index:index + args.batch])
+        writer.close()
+        elapsed: float = time.perf_counter() - start
+        size: int = measure()
+        print(f'{storage}: {args.scans / elapsed:,.0f} rows/s, {samples / elapsed:,.0f} samples/s, '
+              f'{size / samples:.2f} bytes/sample')
@@ -0,0 +1,55 @@
+import argparse
+import time
+from typing import Dict
+
+import yaml
+
+from app.utils.discovery import ADDRESS_SPACE, Discovery, draft
+from app.utils.enums import FN
+
+
+parser = argparse.ArgumentParser(description='Probe a device and draft its configuration.')
+parser.add_argument('ip', help='IP address of the device')
+parser.add_argument('--port', type=int, default=502)
+parser.add_argument('--unit', type=int, default=1, help='unit id of the device')
+parser.add_argument('--functions', type=int, nargs='*', choices=[1, 2, 3, 4],
+                    default=[1, 2, 3, 4], help='function codes to probe')
+parser.add_argument('--start', type=int, default=0, help='first probed address')
+parser.add_argument('--end', type=int, default=ADDRESS_SPACE,
+                    help='address following the last probed one')
+parser.add_argument('--concurrency', type=int, default=4, help='concurrent probes')
+parser.add_argument('--rate', type=float, default=100, help='probes per second, 0 for no limit')
+parser.add_argument('--timeout', type=float, default=1, help='response timeout in seconds')
+parser.add_argument('--resolution', type=int, default=1,
+                    help='smallest refused block that is not split further')
+parser.add_argument('--format', default='Signed', help='format of the discovered registers')
+parser.add_argument('--type', default='SMALLINT', help='database type of the discovered registers')
+parser.add_argument('--table', default='', help='table of the drafted configuration')
+parser.add_argument('--output', help='path to the drafted configuration, printed if omitted')
+
+args = parser.parse_args()
+
+started: float = time.monotonic()
+with Discovery(ip=args.ip, port=args.port, unit=args.unit, concurrency=args.concurrency,
+               rate=args.rate, timeout=args.timeout,
+               resolution=args.resolution) as discovery:
+    spans = discovery.discover(functions=args.functions, start=args.start, end=args.end)
+    probes: int = discovery.probes
+
+for fn, fn_spans in spans.items():
+    print(f'{FN(fn).name} (FC{fn}):')
+    for span in fn_spans:
+        state: str = 'readable' if span.code is None else \
+            'no response' if span.code == 0 else f'exception {span.code}'
+        print(f'  {span.start}-{span.end - 1}: {state}')
+print(f'{probes} probes in {time.monotonic() - started:.1f} s')
+
+data: Dict = {'ip': args.ip, 'port': args.port, 'address': args.unit, 'scan rate': 1000,
+              'table': args.table,
+              'registers': draft(spans, data_format=args.format, data_type=args.type)}
+if args.output:
+    with open(args.output, 'w', encoding='utf8') as stream:
+        yaml.safe_dump(data, stream, allow_unicode=True, sort_keys=False)
+    print(f'Draft configuration written to {args.output}')
+else:
+    print(yaml.safe_dump(data, allow_unicode=True, sort_keys=False))
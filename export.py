@@ -0,0 +1,71 @@
+import argparse
+from datetime import datetime
+from typing import Optional
+
+import yaml
+import psycopg2
+
+from app.utils.export import (export_blocks, export_columns, export_csv, export_parquet,
+                              read_blocks, read_csv, read_parquet, replay)
+from app.utils.modbus import Poller
+from app.utils.loader import load_config
+from app.utils.pydantic.models import Config
+from app.utils.storage.factory import create_writer
+from app.config import POSTGRES_HOST, POSTGRES_DB, POSTGRES_USER, POSTGRES_PASSWORD
+
+
+parser = argparse.ArgumentParser(description='Export the collected data or replay an export.')
+parser.add_argument('--config', default='app/config.yml', help='path to the configuration file')
+subparsers = parser.add_subparsers(dest='command', required=True)
+
+export_parser = subparsers.add_parser('export', help='stream the collected table into a file')
+export_parser.add_argument('output', help='path to the output file')
+export_parser.add_argument('--format', choices=['csv', 'parquet', 'blocks'], default='csv')
+export_parser.add_argument('--start', type=datetime.fromisoformat, help='inclusive start time')
+export_parser.add_argument('--end', type=datetime.fromisoformat, help='exclusive end time')
+export_parser.add_argument('--tags', nargs='*', help='register names to export')
+export_parser.add_argument('--chunk', type=int, default=10000, help='rows fetched at once')
+
+replay_parser = subparsers.add_parser('replay', help='store an exported file again')
+replay_parser.add_argument('input', help='path to the exported file')
+replay_parser.add_argument('--format', choices=['csv', 'parquet', 'blocks'], default='csv')
+replay_parser.add_argument('--chunk', type=int, default=10000, help='rows stored at once')
+
+args = parser.parse_args()
+
+config: Optional[Config] = None
+try:
+    config = load_config(args.config)
+except (yaml.YAMLError, ValueError) as e:
+    print(e)
+
+if config:
+    tags = Poller(config).tags
+
+    conn = None
+    if args.command == 'export' or config.storage.type == 'postgres':
+        conn = psycopg2.connect(host=POSTGRES_HOST, database=POSTGRES_DB,
+                                user=POSTGRES_USER, password=POSTGRES_PASSWORD)
+    try:
+        if args.command == 'export':
+            if args.format == 'csv':
+                export_csv(conn, config.table, export_columns(tags, args.tags), args.output,
+                           start=args.start, end=args.end)
+            else:
+                exporter = export_parquet if args.format == 'parquet' else export_blocks
+                total = exporter(conn, config.table, tags, args.tags, args.output,
+                                 start=args.start, end=args.end, chunk=args.chunk)
+                print(f'{total} rows exported to {args.output}')
+        else:
+            writer = create_writer(config=config, tags=tags, connection=conn)
+            writer.prepare()
+            reader = {'csv': read_csv, 'parquet': read_parquet,
+                      'blocks': read_blocks}[args.format]
+            total = replay(reader(args.input, chunk=args.chunk), writer)
+            writer.close()
+            print(f'{total} rows replayed from {args.input}')
+    finally:
+        if conn and not conn.closed:
+            conn.close()
+else:
+    print('Configuration data should be provided')
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterator, List
+
+import pytest
+
+from app.utils.pydantic.models import Config
+
+
+@pytest.fixture
+def make_config() -> Callable[[str], Config]:
+    """Builds a configuration of two Float holding registers, A and B, stored in a table."""
+    def make(table: str) -> Config:
+        register = {'active': True, 'format': 'Float AB CD', 'type': 'REAL', 'adjustments': None}
+        return Config(**{'ip': '127.0.0.1', 'table': table,
+                         'registers': {'03 Read Holding Registers': {
+                             '0': {'name': 'A', **register}, '2': {'name': 'B', **register}}}})
+    return make
+
+
+@pytest.fixture
+def conninfo() -> str:
+    """Returns the connection string of the test PostgreSQL server, skips without one."""
+    import psycopg2
+    dsn: str = os.getenv('TEST_POSTGRES_DSN',
+                         'host=localhost dbname=postgres user=postgres connect_timeout=2')
+    try:
+        psycopg2.connect(dsn).close()
+    except psycopg2.OperationalError:
+        pytest.skip('no local PostgreSQL server')
+    return dsn
+
+
+@pytest.fixture
+def modbus_server() -> Iterator[Callable[[Dict], int]]:
+    """Starts in-process Modbus TCP servers of the given unit contexts, returns their ports."""
+    from pymodbus.datastore import ModbusServerContext
+    from pymodbus.server import ModbusTcpServer
+
+    servers: List = []
+
+    def serve(units: Dict) -> int:
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port: int = probe.getsockname()[1]
+        loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        async def run() -> None:
+            server = ModbusTcpServer(ModbusServerContext(slaves=units, single=False),
+                                     address=('127.0.0.1', port))
+            servers.append((loop, server))
+            started.set()
+            await server.serve_forever()
+
+        threading.Thread(target=loop.run_until_complete, args=(run(),), daemon=True).start()
+        started.wait(5)
+        # serve_forever binds the socket after the server object is created
+        deadline: float = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with socket.socket() as client:
+                if client.connect_ex(('127.0.0.1', port)) == 0:
+                    break
+            time.sleep(0.01)
+        return port
+
+    yield serve
+    for loop, server in servers:
+        asyncio.run_coroutine_threadsafe(server.shutdown(), loop).result(5)
@@ -0,0 +1,75 @@
+from typing import List, Optional
+
+import pytest
+
+from app.components.DataCollector import DataCollector
+from app.utils.adaptive import ScanGovernor
+from app.utils.pydantic.models import Adaptive
+
+
+class FakeWriter:
+    def __init__(self) -> None:
+        self.rows: List = []
+
+    def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        self.rows.append(values)
+
+    def write_events(self, events: List) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def overload(governor: ScanGovernor, scans: int = 20) -> None:
+    for _ in range(scans):
+        governor.record(duration=0.0, failed=1.0)
+
+
+def test_the_most_important_level_is_never_shed():
+    # Every level is above ``keep priority``, the most important one is still read
+    governor = ScanGovernor(settings=Adaptive(**{'keep priority': 0}), scan_rate=1000,
+                            priorities=[1, 2, 3])
+    overload(governor)
+    assert governor.interval == 8
+    assert governor.priority == 1
+
+
+def test_keep_priority():
+    governor = ScanGovernor(settings=Adaptive(**{'keep priority': 1}), scan_rate=1000,
+                            priorities=[0, 1, 2, 3])
+    overload(governor)
+    assert governor.priority == 1
+
+
+def test_partial_failures_are_weighted():
+    governor = ScanGovernor(settings=Adaptive(), scan_rate=1000, priorities=[0])
+    governor.record(duration=0.0, failed=0.5)
+    assert governor.stats()['errors'] == pytest.approx(ScanGovernor.ALPHA * 0.5)
+    assert governor.interval == 1
+
+
+def entry(name: str, address: Optional[int], **flags) -> dict:
+    return {'address': address, 'name': name, 'format': 'Float AB CD',
+            'value': None if flags else 1.0, 'timestamp': 1.0, **flags}
+
+
+@pytest.mark.parametrize('scan, rows, errors', [
+    # The block of B failed, half of the polled registers
+    ([entry('A', 0), entry('B', 2, failed=True)], 1, 0.5),
+    # Every block was skipped, nothing was polled
+    ([entry('A', 0, skipped=True), entry('B', 2, skipped=True)], 0, 1.0),
+    # Only derived tags and failed blocks
+    ([entry('A', 0, failed=True), entry('B', 2, failed=True), entry('D', None)], 0, 1.0),
+    (None, 0, 1.0),
+])
+def test_failed_blocks_are_reported_to_the_governor(make_config, scan, rows, errors):
+    config = make_config('t_adaptive')
+    config.adaptive.enabled = True
+    writer = FakeWriter()
+    collector = DataCollector(config=config, writer=writer)
+    collector.poller.scan = lambda priority=None: scan
+    collector.scan()
+    assert len(writer.rows) == rows
+    assert collector.stats()['errors'] == 1 - rows
+    assert collector.stats()['adaptive']['errors'] == pytest.approx(ScanGovernor.ALPHA * errors)
@@ -0,0 +1,60 @@
+from typing import List, Optional
+
+import pytest
+
+from app.utils.alarms import AlarmEngine, Event
+from app.utils.pydantic.models import Register
+
+
+def engine(**alarm) -> AlarmEngine:
+    return AlarmEngine([Register(name='T', active=True, format='Float AB CD', type='REAL',
+                                 adjustments=None, alarm=alarm)])
+
+
+def feed(alarms: AlarmEngine, values: List[Optional[float]], step: float = 1.0) -> List[List]:
+    # The alarm state changes after every value, as (kind, raised) pairs
+    return [[(event.kind, event.active)
+             for event in alarms.evaluate([{'value': value}], index * step)]
+            for index, value in enumerate(values)]
+
+
+def test_hi_alarm_clears_past_the_deadband():
+    alarms = engine(hi=10, deadband=2)
+    assert feed(alarms, [5, 11, 9, 8.5, 7.9, 9]) == \
+        [[], [('hi', True)], [], [], [('hi', False)], []]
+
+
+def test_lo_alarm_clears_past_the_deadband():
+    alarms = engine(lo=0, deadband=1)
+    assert feed(alarms, [2, -1, 0.5, 1.5]) == [[], [('lo', True)], [], [('lo', False)]]
+
+
+def test_rate_alarm_clears_past_the_deadband():
+    # Changes per second: +6, -4, +3.5, -2.5
+    alarms = engine(rate=5, deadband=2)
+    assert feed(alarms, [0, 6, 2, 5.5, 3]) == [[], [('rate', True)], [], [], [('rate', False)]]
+
+
+def test_rate_is_measured_per_second():
+    alarms = engine(rate=5, deadband=2)
+    assert feed(alarms, [0, 6, 12], step=2.0) == [[], [], []]
+
+
+def test_delays():
+    alarms = engine(hi=10, delay=2, **{'clear delay': 1})
+    assert feed(alarms, [11, 11, 11, 5, 11, 5, 5]) == \
+        [[], [], [('hi', True)], [], [], [], [('hi', False)]]
+
+
+def test_missing_values_keep_the_state():
+    alarms = engine(hi=10)
+    events: List[Event] = alarms.evaluate([{'value': 11}], 0.0)
+    assert events == [Event(0.0, 'T', 'hi', True, 11.0, 10.0)]
+    assert alarms.evaluate([{'value': None}], 1.0) == []
+    assert alarms.active() == [{'tag': 'T', 'kind': 'hi', 'threshold': 10.0}]
+
+
+def test_alarms_need_a_numeric_format():
+    with pytest.raises(ValueError):
+        AlarmEngine([Register(name='S', active=True, format='String', type='TEXT',
+                              adjustments=None, alarm={'hi': 1})])
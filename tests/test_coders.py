@@ -0,0 +1,86 @@
+import math
+import random
+import struct
+from typing import Any, List
+
+import pytest
+
+from app.utils.coders import FORMATS, Block, Decoder, Encoder
+
+SAMPLES: int = 500
+
+
+@pytest.fixture(scope='module')
+def encoder() -> Encoder:
+    return Encoder()
+
+
+@pytest.fixture(scope='module')
+def decoder() -> Decoder:
+    return Decoder()
+
+
+def sample(data_format: str, rng: random.Random) -> Any:
+    value, _, cast, limits = FORMATS[data_format]
+    if cast is int:
+        low, high = limits or (-2 ** 31, 2 ** 31 - 1)
+        return rng.randint(low, high)
+    # Random bit patterns cover subnormal, huge and tiny values of both signs
+    result: float = struct.unpack(value.format, rng.randbytes(value.size))[0]
+    return 0.0 if math.isnan(result) else result
+
+
+def stored(data_format: str, value: Any) -> Any:
+    # The value as the format holds it, floats are rounded to single precision
+    pack: struct.Struct = FORMATS[data_format][0]
+    return pack.unpack(pack.pack(value))[0]
+
+
+@pytest.mark.parametrize('data_format', list(FORMATS))
+def test_numeric_round_trip(encoder: Encoder, decoder: Decoder, data_format: str):
+    rng = random.Random(data_format)
+    for _ in range(SAMPLES):
+        value = sample(data_format, rng)
+        words: List[int] = encoder.encode(data_format, value)
+        assert words is not None and all(0 <= word <= 0xFFFF for word in words)
+        assert decoder.decode_at(Block(words), 0, data_format) == stored(data_format, value)
+
+
+@pytest.mark.parametrize('data_format', [data_format for data_format in FORMATS
+                                         if FORMATS[data_format][2] is float])
+def test_special_floats_round_trip(encoder: Encoder, decoder: Decoder, data_format: str):
+    for value in (math.inf, -math.inf, -0.0, 'nan', '1e-3'):
+        decoded = decoder.decode_at(Block(encoder.encode(data_format, value)), 0, data_format)
+        expected = stored(data_format, float(value))
+        assert math.isnan(decoded) if math.isnan(expected) else \
+            (decoded == expected and math.copysign(1, decoded) == math.copysign(1, expected))
+
+
+@pytest.mark.parametrize('data_format', list(FORMATS))
+def test_arrays_round_trip(encoder: Encoder, decoder: Decoder, data_format: str):
+    rng = random.Random(f'{data_format}[]')
+    values = [sample(data_format, rng) for _ in range(8)]
+    words: List[int] = encoder.encode_many([data_format] * len(values), values)
+    # One register in front checks decoding at an offset
+    block = Block([0xFFFF] + words)
+    assert decoder.decode_at(block, 1, f'{data_format}[{len(values)}]') == \
+        [stored(data_format, value) for value in values]
+
+
+def test_text_formats_round_trip(encoder: Encoder, decoder: Decoder):
+    rng = random.Random(0)
+    for _ in range(SAMPLES):
+        word: int = rng.randint(0, 0xFFFF)
+        for data_format in ('Hex - ASCII', 'Binary'):
+            text: str = decoder.decode_at(Block([word]), 0, data_format)
+            assert encoder.encode(data_format, text) == [word]
+
+
+@pytest.mark.parametrize('data_format, value', [('Signed', 32768), ('Signed', -32769),
+                                                ('Unsigned', -1), ('Unsigned', 65536),
+                                                ('Long AB CD', 2 ** 31), ('Signed', 'nan'),
+                                                ('Long DC BA', 'inf'), ('Float AB CD', 1e39),
+                                                ('Hex - ASCII', '0x10000'),
+                                                ('Binary', '0000 0000 0000 000')])
+def test_values_out_of_the_format(encoder: Encoder, data_format: str, value: Any):
+    assert encoder.encode(data_format, value) is None
@@ -0,0 +1,109 @@
+import io
+import math
+import random
+import struct
+from typing import Any, List
+
+import pytest
+
+from app.utils import columnar
+from app.utils.columnar import DECIMAL, DELTA, RLE, XOR, decode_block, encode_block
+
+
+def codecs(data: bytes) -> List[int]:
+    # Walks the block layout: counts, timestamps, then codec and length of every column
+    count, position = columnar._get_varint(data, 0)
+    width, position = columnar._get_varint(data, position)
+    for _ in range(count):
+        _, position = columnar._get_varint(data, position)
+    result: List[int] = []
+    for _ in range(width):
+        result.append(data[position])
+        length, position = columnar._get_varint(data, position + 1)
+        position += length
+    return result
+
+
+def same(left: Any, right: Any) -> bool:
+    # Floats are compared bit for bit, so NaN and -0.0 count
+    if isinstance(left, float) and isinstance(right, float):
+        return struct.pack('>d', left) == struct.pack('>d', right)
+    return left == right and type(left) is type(right)
+
+
+def round_trip(columns: List[List], kinds: List[str], timestamps: List[int] = None) -> List[int]:
+    timestamps = timestamps or [1_700_000_000_000_000 + index * 1_000_000
+                                for index in range(len(columns[0]))]
+    data: bytes = encode_block(timestamps, columns, kinds)
+    decoded_timestamps, decoded = decode_block(data, kinds)
+    assert decoded_timestamps == timestamps
+    for column, result in zip(columns, decoded):
+        assert len(result) == len(column)
+        assert all(same(value, item) for value, item in zip(column, result)), (column, result)
+    return codecs(data)
+
+
+def test_int_columns_of_bits_are_run_length_encoded():
+    assert round_trip([[0, 0, 1, 1, 1, 0], [0, 1, 2, 3, 1000, -5]], ['int', 'int']) == [RLE, DELTA]
+
+
+def test_bool_columns():
+    assert round_trip([[True, True, False, None, True, False]], ['bool']) == [RLE]
+
+
+def test_floats_with_few_decimals_are_scaled():
+    assert round_trip([[1.25, 1.5, 2.0, -3.75, 12345.6789]], ['float']) == [DECIMAL]
+
+
+@pytest.mark.parametrize('column', [[0.1 + 0.2, 1 / 3, 2.0],
+                                    [1.0, math.nan, 2.0],
+                                    [0.0, -0.0, 0.0],
+                                    [math.inf, -math.inf, 1.5],
+                                    [1.123456, 1.123456, 1.123457]])
+def test_other_floats_are_xor_encoded(column: List[float]):
+    assert round_trip([column], ['float']) == [XOR]
+
+
+def test_random_floats_round_trip():
+    rng = random.Random(0)
+    column: List[float] = [struct.unpack('>d', rng.randbytes(8))[0] for _ in range(1000)]
+    assert round_trip([column], ['float']) == [XOR]
+
+
+def test_missing_values_are_runs():
+    columns: List[List] = [[None, None, 1, 2, None, 3],
+                           [None, 1.5, None, None, 2.5, None],
+                           [None] * 6,
+                           ['a', None, 'a', 'b', 'b', None],
+                           [None, [1, 2], [1, 2], None, [3.5], []]]
+    assert round_trip(columns, ['int', 'float', 'float', 'str', 'list']) == \
+        [DELTA, DECIMAL, DECIMAL, RLE, RLE]
+
+
+def test_str_and_list_columns():
+    columns: List[List] = [['on', 'on', 'off', 'héllo', '', 'on'],
+                           [[1, 2], [1, 2], [1, 3], [0.5, -1.25], [], [1, 2]]]
+    assert round_trip(columns, ['str', 'list']) == [RLE, RLE]
+
+
+def test_irregular_timestamps():
+    timestamps: List[int] = [0, 5, 6, 1_000_000, 999_999, 2_000_000_000_000_000]
+    round_trip([[1, 2, 3, 4, 5, 6]], ['int'], timestamps)
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        encode_block([1], [[1]], ['complex'])
+
+
+def test_block_files():
+    stream = io.BytesIO()
+    columnar.write_header(stream, {'columns': ['a'], 'kinds': ['int']})
+    columnar.write_block(stream, encode_block([1, 2], [[1, 2]], ['int']))
+    columnar.write_block(stream, encode_block([3], [[None]], ['int']))
+    # A block cut short by an interrupted write ends the file
+    stream.write(b'\x10\x01')
+    stream.seek(0)
+    header, blocks = columnar.read_blocks(stream)
+    assert header['kinds'] == ['int']
+    assert list(blocks) == [([1, 2], [[1, 2]]), ([3], [[None]])]
@@ -0,0 +1,72 @@
+import random
+from typing import Any, Dict, List
+
+import pytest
+
+from app.utils.derived import DerivedTags, compile_expression
+from app.utils.pydantic.models import Derived
+
+
+def derived(name: str, expression: str) -> Derived:
+    return Derived(name=name, expression=expression)
+
+
+def unadjusted(value: Any, adjustments: List) -> Any:
+    return value
+
+
+@pytest.mark.parametrize('expression', [
+    'A.real',
+    '(1).__class__',
+    '__import__',
+    '__builtins__',
+    'open(A)',
+    'A(1)',
+    'round(A, ndigits=1)',
+    'abs(A).conjugate()',
+    '[A, B]',
+    '{A: B}',
+    'A[0]',
+    '"text"',
+    'lambda: A',
+    '(A := 1)',
+    'A if B else',
+])
+def test_rejected_expressions(expression: str):
+    with pytest.raises(ValueError):
+        compile_expression(derived('D', expression))
+
+
+def test_allowed_expressions():
+    tags: DerivedTags = DerivedTags([derived('D', 'max(A, B) * 2 if A > 0 and B else -1'),
+                                     derived('E', 'bit(D, 1) | word(A > 1, 1) << 2'),
+                                     derived('F', 'sqrt(B) + round(A / 3, 2)')], ['A', 'B'])
+    assert tags.evaluate({'A': '3', 'B': '4'}, unadjusted) == [8, 12, 3.0]
+
+
+@pytest.mark.parametrize('tags, registers', [
+    ([derived('D', 'A + C')], ['A']),
+    ([derived('A', 'B')], ['A', 'B']),
+    ([derived('D', 'E'), derived('E', 'D + A')], ['A']),
+])
+def test_invalid_tag_sets(tags: List[Derived], registers: List[str]):
+    with pytest.raises(ValueError):
+        DerivedTags(tags, registers)
+
+
+def test_incremental_evaluation_matches_full_recomputation():
+    rng = random.Random(0)
+    expressions: List[Derived] = [derived('S', 'A + B'),
+                                  derived('R', 'S / C'),
+                                  derived('M', 'max(R, A) if C > 1 else min(S, 0)'),
+                                  derived('W', 'word(bit(A, 0), B > 2, M > 1)')]
+    incremental: DerivedTags = DerivedTags(expressions, ['A', 'B', 'C'])
+    latest: Dict[str, Any] = {}
+    for _ in range(500):
+        # Every register may change, keep its value, be missing or be skipped (left out)
+        values: Dict[str, Any] = {name: rng.choice([None, '0', '1', '2', '3', '2.5'])
+                                  for name in ('A', 'B', 'C') if rng.random() < 0.7}
+        latest.update(values)
+        result: List[Any] = incremental.evaluate(values, unadjusted)
+        assert result == DerivedTags(expressions, ['A', 'B', 'C']).evaluate(dict(latest),
+                                                                              unadjusted)
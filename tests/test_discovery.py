@@ -0,0 +1,58 @@
+from typing import Dict, List
+
+import pytest
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext, \
+    ModbusSparseDataBlock
+
+from app.utils.discovery import Discovery, Span, draft
+from app.utils.pydantic.models import Registers
+
+ILLEGAL_ADDRESS: int = 2
+
+
+@pytest.fixture
+def port(modbus_server) -> int:
+    readable: Dict[int, int] = {**{address: address for address in range(10, 13)},
+                                **{address: address for address in range(200, 204)}}
+    # Unit 1 is sparse, unit 2 is readable from 0 to 249
+    return modbus_server({1: ModbusSlaveContext(hr=ModbusSparseDataBlock(readable),
+                                                zero_mode=True),
+                          2: ModbusSlaveContext(hr=ModbusSequentialDataBlock(0, [0] * 250),
+                                                zero_mode=True)})
+
+
+def test_readable_spans(port: int):
+    with Discovery('127.0.0.1', port=port, rate=0) as discovery:
+        spans: List[Span] = discovery.scan(3, start=0, end=300)
+    assert spans == [Span(0, 10, ILLEGAL_ADDRESS), Span(10, 13, None),
+                     Span(13, 200, ILLEGAL_ADDRESS), Span(200, 204, None),
+                     Span(204, 300, ILLEGAL_ADDRESS)]
+    probes: int = discovery.probes
+    with Discovery('127.0.0.1', port=port, rate=0, resolution=16) as discovery:
+        coarse: List[Span] = discovery.scan(3, start=0, end=300)
+    # A coarser resolution costs fewer requests and never reports a refused address
+    assert discovery.probes < probes / 4
+    assert all(10 <= span.start and span.end <= 13 or 200 <= span.start and span.end <= 204
+               for span in coarse if span.code is None)
+
+
+def test_contiguous_map_costs_one_request_per_block(port: int):
+    with Discovery('127.0.0.1', port=port, unit=2, rate=0) as discovery:
+        assert discovery.scan(3, start=0, end=250) == [Span(0, 250, None)]
+    assert discovery.probes == 2
+
+
+def test_unit_without_response(port: int):
+    with Discovery('127.0.0.1', port=port, unit=9, rate=0, timeout=0.2) as discovery:
+        assert discovery.probe(3, 10, 3) == 0
+
+
+def test_draft_steps_by_the_format_length(port: int):
+    with Discovery('127.0.0.1', port=port, rate=0) as discovery:
+        spans: Dict[int, List[Span]] = discovery.discover(functions=(3,), start=0, end=300)
+    section: Dict = draft(spans, data_format='Float AB CD', data_type='REAL')
+    registers = Registers(**section)
+    # The last address of 10-12 is too short for a Float
+    assert list(registers.AO) == ['10', '200', '202']
+    assert registers.AO['200'].name == 'AO_200' and registers.AO['200'].type == 'REAL'
+    assert not registers.DO and not registers.AI
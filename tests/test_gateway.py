@@ -0,0 +1,94 @@
+import threading
+import time
+from typing import List, Optional
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext
+
+from app.utils.gateway import Gateway
+from app.utils.modbus import Poller
+from app.utils.pydantic.models import Config
+
+
+class Reader:
+    """Counts the reads of a block of values equal to their addresses."""
+    def __init__(self, address: int, count: int, fail: bool = False,
+                 delay: float = 0) -> None:
+        self.values: List[int] = list(range(address, address + count))
+        self.fail: bool = fail
+        self.delay: float = delay
+        self.calls: int = 0
+
+    def __call__(self) -> Optional[List[int]]:
+        self.calls += 1
+        time.sleep(self.delay)
+        return None if self.fail else self.values
+
+
+def test_covered_blocks_are_sliced_from_a_fresh_read():
+    gateway = Gateway('127.0.0.1', port=1, concurrency=1)
+    reader = Reader(0, 10)
+    assert gateway.read((1, 3), 0, 10, max_age=60, reader=reader)[0] == reader.values
+    values, _ = gateway.read((1, 3), 2, 3, max_age=60, reader=Reader(2, 3))
+    assert values == [2, 3, 4]
+    # Another unit, function code or a block out of the read goes to the device
+    for key, address, count in [((2, 3), 0, 10), ((1, 4), 0, 10), ((1, 3), 8, 4)]:
+        other = Reader(address, count)
+        gateway.read(key, address, count, max_age=60, reader=other)
+        assert other.calls == 1
+    assert gateway.stats() == {'hits': 1, 'joins': 0, 'misses': 4}
+
+
+def test_stale_failed_and_invalidated_reads_are_not_shared():
+    gateway = Gateway('127.0.0.1', port=1, concurrency=1)
+    reader = Reader(0, 4)
+    gateway.read((1, 3), 0, 4, max_age=0.05, reader=reader)
+    time.sleep(0.1)
+    gateway.read((1, 3), 0, 4, max_age=0.05, reader=reader)
+    assert reader.calls == 2
+    gateway.invalidate((1, 3))
+    gateway.read((1, 3), 0, 4, max_age=60, reader=reader)
+    assert reader.calls == 3
+    failing = Reader(10, 4, fail=True)
+    assert gateway.read((1, 3), 10, 4, max_age=60, reader=failing)[0] is None
+    assert gateway.read((1, 3), 10, 4, max_age=60, reader=failing)[0] is None
+    assert failing.calls == 2
+
+
+def test_reads_in_flight_are_joined():
+    gateway = Gateway('127.0.0.1', port=1, concurrency=2)
+    reader = Reader(0, 10, delay=0.2)
+    results: List = []
+    first = threading.Thread(target=lambda: results.append(
+        gateway.read((1, 3), 0, 10, max_age=60, reader=reader)))
+    first.start()
+    time.sleep(0.05)
+    joined = Reader(5, 2)
+    values, timestamp = gateway.read((1, 3), 5, 2, max_age=60, reader=joined)
+    first.join()
+    assert joined.calls == 0 and reader.calls == 1
+    # The joined caller gets its slice and the receipt time of the shared read
+    assert values == [5, 6] and timestamp == results[0][1]
+    assert gateway.stats()['joins'] == 1
+
+
+def test_pollers_share_reads_through_the_cache(modbus_server):
+    port: int = modbus_server({1: ModbusSlaveContext(hr=ModbusSequentialDataBlock(0, [7] * 10),
+                                                     zero_mode=True)})
+    register = {'active': True, 'format': 'Signed', 'type': 'SMALLINT', 'adjustments': None}
+    pollers: List[Poller] = [
+        Poller(Config(**{'ip': '127.0.0.1', 'port': port, 'table': table, 'cache age': 60000,
+                         'registers': {'03 Read Holding Registers': {
+                             str(address): {'name': f'R{address}', **register}
+                             for address in addresses}}}))
+        for table, addresses in [('t_wide', range(10)), ('t_narrow', (3, 4))]]
+    for poller in pollers:
+        poller.connect()
+    try:
+        scans = [poller.scan() for poller in pollers]
+        assert [entry['value'] for entry in scans[1]] == ['7.00', '7.00']
+        # The narrow block is served from the wide read, with its receipt time
+        assert scans[1][0]['timestamp'] == scans[0][0]['timestamp']
+        assert pollers[0].gateway.stats() == {'hits': 1, 'joins': 0, 'misses': 1}
+    finally:
+        for poller in pollers:
+            poller.disconnect()
@@ -0,0 +1,89 @@
+from typing import Dict, List
+
+from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext
+
+from app.utils.gateway import Gateway
+from app.utils.modbus import Poller
+from app.utils.pydantic.models import Config
+
+
+def unit(registers: List[int]) -> ModbusSlaveContext:
+    return ModbusSlaveContext(hr=ModbusSequentialDataBlock(0, registers), zero_mode=True)
+
+
+def config(port: int, table: str, registers: Dict, **settings) -> Config:
+    return Config(**{'ip': '127.0.0.1', 'port': port, 'table': table,
+                     'registers': {'03 Read Holding Registers': {
+                         address: {'active': True, 'type': 'SMALLINT', 'adjustments': None,
+                                   **register}
+                         for address, register in registers.items()}},
+                     **settings})
+
+
+def values(scan: List[Dict]) -> Dict:
+    return {entry['name']: entry['value'] for entry in scan}
+
+
+def test_units_behind_one_gateway(modbus_server):
+    port: int = modbus_server({1: unit([10, 11]), 2: unit([20, 21])})
+    poller = Poller(config(port, 't_units', {'0': {'name': 'A', 'format': 'Signed'},
+                                             '1': {'name': 'B', 'format': 'Signed'}},
+                           address=[1, 2, 3], policy={'timeout': 300, 'retries': 0}))
+    assert [tag.name for tag in poller.tags] == ['U1_A', 'U1_B', 'U2_A', 'U2_B',
+                                                 'U3_A', 'U3_B']
+    poller.connect()
+    try:
+        scan: List[Dict] = poller.scan()
+        # Unit 3 is missing, its block fails without losing the others
+        assert values(scan) == {'U1_A': '10.00', 'U1_B': '11.00', 'U2_A': '20.00',
+                                'U2_B': '21.00', 'U3_A': None, 'U3_B': None}
+        assert [entry.get('failed', False) for entry in scan] == [False] * 4 + [True] * 2
+        # Writes go to the unit of the named register
+        assert poller.write({'U2_B': 5}) == {'U2_B': True}
+        assert values(poller.scan())['U2_B'] == '5.00'
+        assert values(poller.scan())['U1_B'] == '11.00'
+    finally:
+        poller.disconnect()
+
+
+def test_pollers_of_an_endpoint_share_the_gateway(modbus_server):
+    port: int = modbus_server({1: unit([1, 2])})
+    pollers: List[Poller] = [Poller(config(port, f't_shared_{index}',
+                                           {'0': {'name': 'A', 'format': 'Signed'}},
+                                           concurrency=2))
+                             for index in range(2)]
+    for poller in pollers:
+        poller.connect()
+    gateway: Gateway = pollers[0].gateway
+    assert pollers[1].gateway is gateway and gateway.concurrency == 2
+    assert [values(poller.scan()) for poller in pollers] == [{'A': '1.00'}, {'A': '1.00'}]
+    pollers[0].disconnect()
+    # The connections stay open for the remaining poller
+    assert gateway.is_connected
+    assert values(pollers[1].scan()) == {'A': '1.00'}
+    pollers[1].disconnect()
+    # The last user closed the connections, the next one opens a new gateway
+    assert not gateway.is_connected
+    assert ('127.0.0.1', port) not in Gateway._gateways
+
+
+def test_bits_strings_and_arrays(modbus_server):
+    # 'OK' padded with spaces, 0b1001 and the signed array -1, 2, -3
+    port: int = modbus_server({1: unit([0x4F4B, 0x2020, 0b1001, 0xFFFF, 2, 0xFFFD])})
+    poller = Poller(config(port, 't_formats', {
+        '0': {'name': 'S', 'format': 'String 2', 'type': 'VARCHAR(4)'},
+        '2.0': {'name': 'B0', 'format': 'Bit', 'type': 'BOOLEAN'},
+        '2.1': {'name': 'B1', 'format': 'Bit', 'type': 'BOOLEAN'},
+        '2.3': {'name': 'B3', 'format': 'Bit', 'type': 'BOOLEAN'},
+        '3': {'name': 'L', 'format': 'Signed[3]', 'type': 'SMALLINT[]'}}))
+    # The bits share their register, so the map is read in one block
+    assert [request['quantity'] for request in poller.plan[3].values()] == [6]
+    poller.connect()
+    try:
+        assert values(poller.scan()) == {'S': 'OK', 'B0': True, 'B1': False, 'B3': True,
+                                         'L': [-1, 2, -3]}
+        # Bits, strings and arrays are read-only
+        assert poller.write({'B0': 0, 'S': 'NO', 'L': 1}) == \
+            {name: f'Register {name} is read-only.' for name in ('B0', 'S', 'L')}
+    finally:
+        poller.disconnect()
@@ -0,0 +1,58 @@
+import pytest
+
+from app.utils.pydantic.models import Registers
+
+
+def register(name: str, data_format: str = 'Signed') -> dict:
+    return {'name': name, 'active': True, 'format': data_format, 'type': 'INTEGER',
+            'adjustments': None}
+
+
+@pytest.fixture
+def registers() -> Registers:
+    # Declared out of order, with a bit of register 10 and a bigger address after it
+    return Registers(**{'01 Read Coils': {'7': register('coil')},
+                        '03 Read Holding Registers': {'100': register('C'),
+                                                      '10.3': register('bit'),
+                                                      '10': register('A'),
+                                                      '2': register('B')}})
+
+
+def test_maps_are_sorted_by_address(registers: Registers):
+    assert list(registers.AO) == ['2', '10', '10.3', '100']
+
+
+def test_find_by_name(registers: Registers):
+    assert registers.find('bit') == (3, '10.3', registers.AO['10.3'])
+    assert registers.find('coil') == (1, '7', registers.DO['7'])
+    assert registers.find('missing') is None
+
+
+def test_at_by_address(registers: Registers):
+    assert registers.at(3, 10).name == 'A'
+    assert registers.at(3, '10').name == 'A'
+    assert registers.at(3, '10.3').name == 'bit'
+    assert registers.at(3, 10, 3).name == 'bit'
+    assert registers.at(1, 7).name == 'coil'
+    # Same address, other function code or bit
+    assert registers.at(4, 10) is None
+    assert registers.at(3, 10, 4) is None
+    with pytest.raises(ValueError):
+        registers.at(3, '10.16')
+
+
+def test_duplicate_addresses_and_names():
+    with pytest.raises(ValueError, match='declared twice'):
+        Registers(**{'03 Read Holding Registers': {'10': register('A'), '010': register('B')}})
+    with pytest.raises(ValueError, match='used twice'):
+        Registers(**{'03 Read Holding Registers': {'10': register('A'), '11': register('A')}})
+
+
+def test_array_formats_are_checked():
+    with pytest.raises(ValueError, match='maps the values'):
+        Registers(**{'03 Read Holding Registers': {
+            '0': {**register('L', 'Signed[4]'), 'adjustments': {'1': 'on'}}}})
+    with pytest.raises(ValueError, match='spans 126 addresses'):
+        Registers(**{'03 Read Holding Registers': {'0': register('L', 'Signed[126]')}})
+    with pytest.raises(ValueError, match='Unknown format'):
+        Registers(**{'03 Read Holding Registers': {'0': register('L', 'Bit[2]')}})
@@ -0,0 +1,75 @@
+import time
+from typing import List, Optional, Tuple
+
+from app.utils.policy import RequestPolicy
+from app.utils.pydantic.models import Policy
+
+
+class Device:
+    """Answers after ``delays`` seconds of the successive attempts, None for no response."""
+    def __init__(self, *delays: Optional[float]) -> None:
+        self.delays: List[Optional[float]] = list(delays)
+        self.attempts: List[Tuple[float, bool]] = []
+
+    def __call__(self, timeout: float, wait: bool) -> Optional[List[int]]:
+        self.attempts.append((timeout, wait))
+        delay: Optional[float] = self.delays.pop(0) if self.delays else 0
+        if delay is None:
+            return None
+        time.sleep(delay)
+        return [len(self.attempts)]
+
+
+def test_timeouts_per_function_code():
+    policy = RequestPolicy(Policy(timeout=500, timeouts={4: 100}), concurrency=1)
+    assert policy.timeout(3) == 0.5 and policy.timeout(4) == 0.1
+    device = Device()
+    policy.execute(4, device)
+    assert device.attempts == [(0.1, True)]
+
+
+def test_retries_until_a_response():
+    policy = RequestPolicy(Policy(retries=2), concurrency=1)
+    policy.start(1000)
+    assert policy.execute(3, Device(None, None, 0)) == [3]
+    assert policy.execute(3, Device(None, None, None)) is None
+    stats = policy.stats()
+    assert {key: stats[key] for key in ('requests', 'retries', 'failures')} == \
+        {'requests': 2, 'retries': 4, 'failures': 1}
+    assert stats['latency'][3]['samples'] == 1
+
+
+def test_retries_stop_at_the_scan_deadline():
+    policy = RequestPolicy(Policy(timeout=1000, retries=5, deadline=0.5), concurrency=1)
+    policy.start(100)
+    time.sleep(0.06)
+    device = Device(None, None)
+    assert policy.execute(3, device) is None
+    # The deadline has passed, the request is not retried
+    assert len(device.attempts) == 1
+    policy.start(200)
+    device = Device(None, None)
+    policy.execute(3, device)
+    # A retry never waits past the 100 ms deadline
+    assert len(device.attempts) == 3 and device.attempts[1][0] <= 0.1
+
+
+def test_hedged_request_wins_over_a_slow_one():
+    policy = RequestPolicy(Policy(hedge=20), concurrency=2)
+    policy.start(1000)
+    device = Device(0.3, 0)
+    started: float = time.monotonic()
+    assert policy.execute(3, device) == [2]
+    assert time.monotonic() - started < 0.25
+    # The hedged request is sent on an idle connection only
+    assert device.attempts[1][1] is False
+    assert {key: policy.stats()[key] for key in ('hedges', 'hedge wins')} == \
+        {'hedges': 1, 'hedge wins': 1}
+    policy.close()
+
+
+def test_no_hedging_on_a_single_connection():
+    policy = RequestPolicy(Policy(hedge=20), concurrency=1)
+    device = Device(0.05)
+    assert policy.execute(3, device) == [1]
+    assert len(device.attempts) == 1 and policy.stats()['hedges'] == 0
@@ -0,0 +1,37 @@
+import os
+import signal
+import time
+from typing import Callable
+
+import pytest
+
+from app.utils.profiling import Profiler
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> bool:
+    deadline: float = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR1'), reason='no SIGUSR1')
+def test_signal_while_the_lock_is_held(tmp_path):
+    profiler = Profiler()
+    profiler.configure(enabled=True, directory=str(tmp_path))
+    previous = signal.getsignal(signal.SIGUSR1)
+    profiler.install()
+    try:
+        # The signal interrupts the main thread while it holds the lock, as in spans()
+        with profiler._lock:
+            os.kill(os.getpid(), signal.SIGUSR1)
+            time.sleep(0.1)
+            assert not profiler._capturing
+        assert wait_for(lambda: profiler.stats()['capturing'])
+        with profiler.profiled():
+            sum(range(1000))
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert wait_for(lambda: any(name.endswith('.prof') for name in os.listdir(tmp_path)))
+        assert not profiler.stats()['capturing']
+    finally:
+        signal.signal(signal.SIGUSR1, previous)
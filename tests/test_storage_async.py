@@ -0,0 +1,140 @@
+import asyncio
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+import pytest
+
+from app.utils.alarms import Event
+from app.utils.pydantic.models import Config
+from app.utils.storage.base import AsyncWriter, SyncWriter, Writer
+
+
+class MemoryWriter(AsyncWriter):
+    def __init__(self, config: Config, tags: List) -> None:
+        super().__init__(config=config, tags=tags)
+        self.rows: List = []
+        self.batches: List[int] = []
+        self.threads: set = set()
+        self.events: List = []
+        self.prepared: bool = False
+        self.closed: bool = False
+
+    async def prepare(self) -> None:
+        self.prepared = True
+
+    async def write(self, values: List, timestamp: Optional[float] = None) -> None:
+        await asyncio.sleep(0)
+        self.rows.append((timestamp, self.row(values)))
+
+    async def write_many(self, scans: List[List],
+                         timestamps: Optional[List[float]] = None) -> None:
+        self.batches.append(len(scans))
+        self.threads.add(threading.current_thread().name)
+        await super().write_many(scans, timestamps)
+
+    async def write_events(self, events: List) -> None:
+        self.events.extend(events)
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+def test_sync_writer_runs_the_async_writer(make_config):
+    config = make_config('t_memory')
+    tags = list(config.registers.AO.values())
+    memory = MemoryWriter(config, tags)
+    writer = SyncWriter(memory)
+    assert isinstance(writer, Writer) and not isinstance(memory, Writer)
+    assert writer.columns == memory.columns
+    writer.prepare()
+    writer.write(['1.5', '2'], 10.0)
+    writer.write_many([['3', None], ['4', '5']], [11.0, 12.0])
+    writer.write_events(['event'])
+    writer.close()
+    assert memory.prepared and memory.closed
+    assert memory.rows == [(10.0, [1.5, 2.0]), (11.0, [3.0, None]), (12.0, [4.0, 5.0])]
+    assert memory.events == ['event']
+    with pytest.raises(RuntimeError):
+        writer.write(['1', '2'])
+    writer.close()
+
+
+def storage_threads() -> List[str]:
+    return [thread.name for thread in threading.enumerate() if thread.name == 'mbir-storage']
+
+
+def test_writers_share_one_event_loop(make_config):
+    config = make_config('t_shared')
+    tags = list(config.registers.AO.values())
+    memories = [MemoryWriter(config, tags) for _ in range(3)]
+    writers = [SyncWriter(memory) for memory in memories]
+    assert storage_threads() == ['mbir-storage']
+    for writer in writers:
+        writer.write(['1', '2'], 1.0)
+    writers[0].close()
+    # The loop serves the other writers until the last one is closed
+    writers[1].write(['3', '4'], 2.0)
+    for writer in writers[1:]:
+        writer.close()
+    assert {name for memory in memories for name in memory.threads} == {'mbir-storage'}
+    assert storage_threads() == []
+
+
+def test_scans_are_stored_in_batches(make_config):
+    config = make_config('t_batch')
+    memory = MemoryWriter(config, list(config.registers.AO.values()))
+    writer = SyncWriter(memory, batch=3)
+    for index in range(4):
+        writer.write([str(index), None], float(index))
+    assert memory.batches == [3]
+    writer.write_many([['9', '9']], [9.0])
+    writer.write(['5', None], 5.0)
+    writer.close()
+    assert memory.batches == [3, 1, 1, 1]
+    assert [timestamp for timestamp, _ in memory.rows] == [0.0, 1.0, 2.0, 3.0, 9.0, 5.0]
+
+
+def test_incomplete_writers_can_not_be_created(make_config):
+    class Incomplete(AsyncWriter):
+        async def prepare(self) -> None:
+            pass
+
+    config = make_config('t_incomplete')
+    with pytest.raises(TypeError):
+        Incomplete(config, list(config.registers.AO.values()))
+
+
+def test_async_postgres_writer(conninfo: str, make_config):
+    psycopg = pytest.importorskip('psycopg')
+    from app.utils.storage.postgres_async import AsyncPostgresWriter
+
+    table: str = f't_async_{uuid.uuid4().hex[:8]}'
+    config = make_config(table)
+    tags = list(config.registers.AO.values())
+    writer = SyncWriter(AsyncPostgresWriter(connection=None, config=config, tags=tags,
+                                            copy_threshold=4, conninfo=conninfo), batch=4)
+    now: float = time.time()
+    try:
+        writer.prepare()
+        writer.write(['1.5', '2'], now)
+        # A batch above the threshold is stored with binary COPY
+        writer.write_many([[str(i), None] for i in range(5)], [now + i for i in range(5)])
+        # and so are the single scans, stored every ``batch`` scans
+        for index in range(4):
+            writer.write([str(10 + index), '1'], now + 10 + index)
+        writer.write_events([Event(now, 'A', 'hi', True, 1.5, 1.0)])
+        writer.close()
+        with psycopg.connect(conninfo) as connection:
+            rows = connection.execute(f'SELECT {", ".join(writer.columns)} FROM {table} '
+                                      f'ORDER BY datetime, {writer.columns[0]}').fetchall()
+            events = connection.execute(f'SELECT tag, kind, active, value, threshold '
+                                        f'FROM {table}_events').fetchall()
+        assert rows[0] == (0.0, None) and (1.5, 2.0) in rows and len(rows) == 10
+        assert (13.0, 1.0) in rows
+        assert events == [('A', 'hi', True, 1.5, 1.0)]
+    finally:
+        with psycopg.connect(conninfo, autocommit=True) as connection:
+            connection.execute(f'DROP TABLE IF EXISTS {table}')
+            connection.execute(f'DROP TABLE IF EXISTS {table}_events')
@@ -0,0 +1,24 @@
+import os
+from datetime import datetime, timezone
+
+from app.utils import columnar
+from app.utils.storage.blocks import BlockWriter
+
+
+def test_batches_are_split_per_day(tmp_path, make_config):
+    config = make_config('t_blocks')
+    writer = BlockWriter(str(tmp_path), config, list(config.registers.AO.values()), batch=10)
+    writer.prepare()
+    midnight: float = datetime(2024, 1, 2, tzinfo=timezone.utc).timestamp()
+    writer.write_many([[str(i), None] for i in range(4)],
+                      [midnight - 2, midnight - 1, midnight, midnight + 1])
+    writer.close()
+    directory = os.path.join(str(tmp_path), 't_blocks')
+    names = sorted(os.listdir(directory))
+    assert [name[:10] for name in names] == ['2024-01-01', '2024-01-02']
+    values = []
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as stream:
+            _, blocks = columnar.read_blocks(stream)
+            values.append([column[0] for _, column in blocks])
+    assert values == [[[0.0, 1.0]], [[2.0, 3.0]]]
@@ -0,0 +1,127 @@
+import json
+from types import SimpleNamespace
+from typing import List, Tuple
+
+import pytest
+
+from app.utils.pydantic.models import Publish
+from app.utils.storage.mqtt import MqttWriter
+
+
+class FakeClient:
+    """An in-process stand-in of the paho-mqtt client and its broker.
+
+    Messages published while disconnected are queued and delivered on reconnection,
+    acknowledgements of QoS 1 and 2 messages are sent by :meth:`ack`, or at once from
+    within ``publish`` with ``eager`` set, before the writer learns the message id."""
+    def __init__(self, eager: bool = False) -> None:
+        self.eager: bool = eager
+        self.connected: bool = True
+        self.delivered: List[Tuple[str, bytes, int, bool]] = []
+        self.queued: List[Tuple[str, bytes, int, bool]] = []
+        self.unacknowledged: List[int] = []
+        self.on_publish = None
+        self._mid: int = 0
+
+    def loop_start(self) -> None:
+        pass
+
+    def loop_stop(self) -> None:
+        pass
+
+    def disconnect(self) -> None:
+        self.connected = False
+
+    def publish(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        self._mid += 1
+        (self.delivered if self.connected else self.queued).append((topic, payload, qos, retain))
+        if qos:
+            if self.eager and self.connected:
+                self.on_publish(self, None, self._mid)
+            else:
+                self.unacknowledged.append(self._mid)
+        return SimpleNamespace(mid=self._mid)
+
+    def ack(self) -> None:
+        mids, self.unacknowledged = self.unacknowledged, []
+        for mid in mids:
+            self.on_publish(self, None, mid)
+
+    def reconnect(self) -> None:
+        self.connected = True
+        self.delivered.extend(self.queued)
+        self.queued = []
+        self.ack()
+
+
+def make_writer(make_config, client: FakeClient, **settings) -> MqttWriter:
+    config = make_config('t_mqtt')
+    writer = MqttWriter(settings=Publish(**{'format': 'json', 'linger': 60000, **settings}),
+                        config=config, tags=list(config.registers.AO.values()), client=client)
+    writer.prepare()
+    return writer
+
+
+def batches(client: FakeClient) -> List:
+    return [json.loads(payload) for topic, payload, _, _ in client.delivered
+            if topic == 'mbir/t_mqtt']
+
+
+def test_publish_changes_in_batches(make_config):
+    client = FakeClient()
+    writer = make_writer(make_config, client, qos=0, batch=3)
+    topic, payload, _, retain = client.delivered[0]
+    assert topic == 'mbir/t_mqtt/schema' and retain
+    assert json.loads(payload)['topics'] == {'mbir/t_mqtt': writer.columns}
+    writer.write(['1', '2'], 1.0)
+    writer.write(['1', '3'], 2.0)
+    # A scan without changes is not published
+    writer.write(['1', '3'], 3.0)
+    writer.write(['4', '3'], 4.0)
+    assert batches(client) == [[writer.schema_version, [[1000000, {'0': 1.0, '1': 2.0}],
+                                                        [2000000, {'1': 3.0}],
+                                                        [4000000, {'0': 4.0}]]]]
+    writer.close()
+
+
+def test_msgpack_payloads(make_config):
+    msgpack = pytest.importorskip('msgpack')
+    client = FakeClient()
+    writer = make_writer(make_config, client, qos=0, batch=1, format='msgpack')
+    writer.write(['1', '2'], 1.0)
+    assert msgpack.unpackb(client.delivered[1][1], strict_map_key=False) == \
+        [writer.schema_version, [[1000000, {0: 1.0, 1: 2.0}]]]
+
+
+@pytest.mark.parametrize('eager', [False, True])
+def test_acknowledgements_free_the_window(make_config, eager: bool):
+    client = FakeClient(eager=eager)
+    writer = make_writer(make_config, client, qos=1, batch=1, window=3, block=0.05)
+    for index in range(5):
+        writer.write([str(index), '0'], float(index))
+        client.ack()
+    assert writer.stats() == {'messages': 5, 'scans': 5, 'dropped': 0, 'in_flight': 0}
+    # The schema acknowledgement is matched as well, nothing is left behind
+    assert not writer._acknowledged
+    writer.close()
+
+
+def test_buffering_while_disconnected(make_config):
+    client = FakeClient()
+    writer = make_writer(make_config, client, qos=1, batch=1, window=2, block=0.05)
+    client.ack()
+    client.disconnect()
+    writer.write(['1', '2'], 1.0)
+    writer.write(['3', '2'], 2.0)
+    # The window is full, the batch is dropped after waiting ``block`` seconds
+    writer.write(['5', '2'], 3.0)
+    assert writer.stats() == {'messages': 2, 'scans': 3, 'dropped': 1, 'in_flight': 2}
+    client.reconnect()
+    assert writer.stats()['in_flight'] == 0
+    writer.write(['5', '2'], 4.0)
+    # The consumers missed a change, so the next scan is a full snapshot
+    assert [batch[1] for batch in batches(client)] == [[[1000000, {'0': 1.0, '1': 2.0}]],
+                                                       [[2000000, {'0': 3.0}]],
+                                                       [[4000000, {'0': 5.0, '1': 2.0}]]]
+    client.ack()
+    writer.close()
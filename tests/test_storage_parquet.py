@@ -0,0 +1,23 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+pq = pytest.importorskip('pyarrow.parquet')
+
+from app.utils.storage.parquet import ParquetWriter  # noqa: E402
+
+
+def test_batches_are_split_per_hour(tmp_path, make_config):
+    config = make_config('t_parquet')
+    writer = ParquetWriter(str(tmp_path), config, list(config.registers.AO.values()), batch=10)
+    writer.prepare()
+    boundary: float = datetime(2024, 1, 1, 11, tzinfo=timezone.utc).timestamp()
+    timestamps = [boundary - 2, boundary - 1, boundary, boundary + 1]
+    writer.write_many([[str(i), None] for i in range(4)], timestamps)
+    writer.close()
+    root = os.path.join(str(tmp_path), 't_parquet', 'date=2024-01-01')
+    assert sorted(os.listdir(root)) == ['hour=10', 'hour=11']
+    rows = {hour: pq.read_table(os.path.join(root, hour)).column(1).to_pylist()
+            for hour in ('hour=10', 'hour=11')}
+    assert rows == {'hour=10': [0.0, 1.0], 'hour=11': [2.0, 3.0]}
@@ -0,0 +1,98 @@
+import time
+import uuid
+from typing import List
+
+import pytest
+
+from app.utils.alarms import Event
+from app.utils.storage.postgres import PostgresWriter
+
+
+class AbortedTransaction(Exception):
+    pass
+
+
+class FakeConnection:
+    """A psycopg2 connection stand-in: a failed statement aborts the transaction until
+    it is rolled back, like the server does."""
+    def __init__(self) -> None:
+        self.rows: List = []
+        self.pending: List = []
+        self.aborted: bool = False
+        self.fail: bool = False
+
+    def cursor(self) -> 'FakeConnection':
+        return self
+
+    def __enter__(self) -> 'FakeConnection':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+    def execute(self, query: str, params=None) -> None:
+        if self.aborted:
+            raise AbortedTransaction(query)
+
+    def executemany(self, query: str, rows: List) -> None:
+        self.execute(query)
+        if self.fail:
+            self.fail = False
+            self.aborted = True
+            raise OverflowError('smallint out of range')
+        self.pending.extend(rows)
+
+    def commit(self) -> None:
+        if self.aborted:
+            raise AbortedTransaction('COMMIT')
+        self.rows.extend(self.pending)
+        self.pending = []
+
+    def rollback(self) -> None:
+        self.aborted = False
+        self.pending = []
+
+
+def test_write_after_a_failed_write(make_config):
+    config = make_config('t_fake')
+    connection = FakeConnection()
+    writer = PostgresWriter(connection=connection, config=config,
+                            tags=list(config.registers.AO.values()))
+    writer._execute = 'EXECUTE mbir_insert_1 (%s, %s, %s);'
+    writer.write(['1', '2'], 10.0)
+    connection.fail = True
+    with pytest.raises(OverflowError):
+        writer.write_many([['3', '4'], ['5', '6']], [11.0, 12.0])
+    writer.write(['7', '8'], 13.0)
+    connection.fail = True
+    with pytest.raises(OverflowError):
+        writer.write_events([Event(13.0, 'A', 'hi', True, 7.0, 5.0)])
+    writer.write_events([Event(14.0, 'A', 'hi', False, 1.0, 5.0)])
+    assert [row[0] for row in connection.rows] == [10.0, 13.0, 14.0]
+
+
+def test_postgres_write_after_an_overflow(conninfo: str, make_config):
+    import psycopg2
+
+    table: str = f't_sync_{uuid.uuid4().hex[:8]}'
+    config = make_config(table)
+    # An adjusted value that does not fit the SMALLINT column fails the whole batch
+    config.registers.AO['0'].format = 'Signed'
+    connection = psycopg2.connect(conninfo)
+    writer = PostgresWriter(connection=connection, config=config,
+                            tags=list(config.registers.AO.values()))
+    now: float = time.time()
+    try:
+        writer.prepare()
+        with pytest.raises(psycopg2.DataError):
+            writer.write_many([['1', '2'], ['100000', '3']], [now, now + 1])
+        writer.write(['4', '5'], now + 2)
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT {", ".join(writer.columns)} FROM {table};')
+            assert cursor.fetchall() == [(4, 5.0)]
+    finally:
+        connection.rollback()
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}; DROP TABLE IF EXISTS {table}_events;')
+        connection.commit()
+        writer.close()
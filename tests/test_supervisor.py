@@ -0,0 +1,47 @@
+import json
+from types import SimpleNamespace
+from typing import List
+from urllib.request import urlopen
+
+from app.components.Api import Api
+from app.components.Supervisor import Supervisor
+
+
+class FakeWriter:
+    def __init__(self) -> None:
+        self.scans: List = []
+
+    def write_many(self, scans: List[List], timestamps: List[float]) -> None:
+        self.scans.extend(zip(timestamps, scans))
+
+
+def test_stored_scans_are_served_by_the_api():
+    supervisor = Supervisor(paths=[], processes=1)
+    writer = FakeWriter()
+    supervisor._add('t_worker', writer, ['A', 'B'])
+    supervisor._tables = [['t_worker']]
+    supervisor._store([('t_worker', 1.0, [1.5, 2]), ('t_worker', 2.0, [1.5, None])])
+    assert writer.scans == [(1.0, [1.5, 2]), (2.0, [1.5, None])]
+    api = Api(caches=supervisor.caches, port=0)
+    api.start()
+    try:
+        host, port = api.address
+        with urlopen(f'http://{host}:{port}/t_worker/values') as response:
+            body = json.load(response)
+    finally:
+        api.stop()
+    assert body['sequence'] == 2
+    assert body['values'] == {'A': {'value': 1.5, 'quality': 'good', 'timestamp': 2.0,
+                                    'sequence': 1},
+                              'B': {'value': None, 'quality': 'bad', 'timestamp': 2.0,
+                                    'sequence': 2}}
+
+
+def test_a_dead_worker_invalidates_its_caches():
+    supervisor = Supervisor(paths=[], processes=1)
+    supervisor._add('t_worker', FakeWriter(), ['A'])
+    supervisor._tables = [['t_worker']]
+    supervisor._failures, supervisor._started, supervisor._restart_at = [0], [0.0], [None]
+    supervisor._store([('t_worker', 1.0, [3])])
+    supervisor._restart(0, SimpleNamespace(name='mbir-worker-0', exitcode=1))
+    assert supervisor.caches['t_worker'].get()['A'].quality == 'bad'
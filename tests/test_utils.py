@@ -0,0 +1,30 @@
+import time
+
+import pytest
+
+from app.utils import utils
+
+
+@pytest.fixture
+def wall_clock(monkeypatch):
+    """Moves the system clock by the given seconds from the current one."""
+    shift = {'seconds': 0.0}
+    real = time.time
+    monkeypatch.setattr(utils.time, 'time', lambda: real() + shift['seconds'])
+    monkeypatch.setattr(utils, '_EPOCH_OFFSET', real() - time.perf_counter())
+    return shift
+
+
+def test_drift_is_slewed_by_a_bounded_correction(wall_clock):
+    wall_clock['seconds'] = 0.0035
+    corrections = [utils.resyncEpochTime() for _ in range(5)]
+    assert corrections[:3] == [utils.MAX_EPOCH_SLEW] * 3
+    assert 0 < corrections[3] < utils.MAX_EPOCH_SLEW
+    # time.time is the shifted system clock
+    assert abs(utils.epochTime() - time.time()) < 1e-4
+
+
+def test_clock_steps_are_followed_at_once(wall_clock):
+    wall_clock['seconds'] = -3600.0
+    assert utils.resyncEpochTime() == pytest.approx(-3600.0, abs=1e-3)
+    assert abs(utils.epochTime() - time.time()) < 1e-3